@@ -3,11 +3,12 @@
 
 import os
 import sys
+import argparse
 import logging
-from rich.logging import RichHandler
-from tqdm import tqdm
 
-from config import load_config
+# Nur leichte Importe auf Modulebene – der Geo-Stack (geopandas,
+# matplotlib, pyproj, …) wird erst in der Phase geladen, die ihn braucht.
+from config import load_config, setup_logging
 from cli import (
     choose_mode,
     choose_region,
@@ -16,152 +17,331 @@ from cli import (
     choose_background_option,
     choose_export_formats,
 )
-from io_utils import find_gpkg_files
-from layer_selector import get_layers_interactive
-from data_processing.layers import (
-    merge_hauptland_layers,
-    apply_ausblenden,
-    select_highlights,
-)
-from data_processing.crs import reproject, compute_bbox
-from plotting import plot_map, save_map
 
 
-def main():
-    # 1) Konfiguration laden
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mymaptool",
+        description="Karten aus GeoPackages erzeugen (ohne Befehl: interaktiv).",
+    )
+    parser.add_argument("--profil", metavar="DATEI",
+                        help="Laufzeit/Speicher je Stufe als JSON-Lines in DATEI schreiben")
+    parser.add_argument("--cprofile", metavar="STUFE",
+                        help="Stufe (z. B. zeichnen, savefig) zusätzlich mit cProfile erfassen")
+    parser.add_argument("--neu", action="store_true",
+                        help="alle Karten neu rendern, auch wenn sie laut Manifest unverändert sind")
+    sub = parser.add_subparsers(dest="befehl")
+
+    p_batch = sub.add_parser("batch", help="Jobdatei ohne Rückfragen abarbeiten")
+    p_batch.add_argument("jobdatei", help="JSON-Datei mit einer Liste von Jobs")
+
+    p_tiles = sub.add_parser("tiles", help="XYZ-Kacheln (EPSG:3857) einer Region erzeugen")
+    p_tiles.add_argument("region", help="Region aus config.json (regionen)")
+    p_tiles.add_argument("--zoom", help="Zoomstufen, z. B. 3-7 (Standard: kacheln.zoom)")
+    p_tiles.add_argument("--worker", type=int, help="Anzahl Prozesse (Standard: kacheln.worker bzw. CPU-Kerne)")
+
+    p_atlas = sub.add_parser("atlas", help="eine Karte je Region (NAME_1), jeweils hervorgehoben")
+    p_atlas.add_argument("region", help="Region aus config.json (regionen)")
+    p_atlas.add_argument("--crs", help="Ziel-CRS, kommagetrennt (Standard: alle der Region)")
+    p_atlas.add_argument("--namen", help="NAME_1-Werte, kommagetrennt (Standard: atlas.namen bzw. alle)")
+    p_atlas.add_argument("--formate", help="Ausgabeformate, kommagetrennt (Standard: atlas.formate)")
+
+    p_serve = sub.add_parser("serve", help="lokalen Render-Dienst (HTTP) starten")
+    p_serve.add_argument("--port", type=int, help="Port (Standard: dienst.port)")
+    p_serve.add_argument("--worker", type=int, help="gleichzeitige Renderings (Standard: dienst.worker)")
+
+    p_compile = sub.add_parser("compile", help="GeoPackages in den kompilierten Geometrie-Store umwandeln")
+    p_compile.add_argument("--vorprojizieren", action="store_true",
+                           help="Hauptland zusätzlich für alle Regionen-CRS vorprojizieren (Standard: kompiliert.vorprojizieren)")
+
+    sub.add_parser("clear-cache", help="Reprojektions-Cache leeren")
+
+    sub.add_parser("regions", help="Regionen und ihre CRS auflisten")
+    sub.add_parser("layers", help="Layer der Hauptland-GPKG auflisten")
+
+    p_imp = sub.add_parser("importtime", help="Importzeiten messen (-X importtime)")
+    p_imp.add_argument("module", nargs="*", help="zu messende Module (Standard: Start- und Render-Pfad)")
+    p_imp.add_argument("--top", type=int, default=15, help="Anzahl gelisteter Module")
+    p_imp.add_argument("--json", dest="json_path", help="Ergebnis zusätzlich als JSON speichern")
+    p_imp.add_argument("--max-ms", type=float, help="Exit-Code 1, wenn die Gesamtzeit darüber liegt")
+
+    return parser.parse_args(argv)
+
+
+def run_light_command(args, config, base_dir) -> int:
+    """Befehle ohne Geo-Stack: regions, layers, importtime."""
+    if args.befehl == "regions":
+        for name, crs_list in config.get("regionen", {}).items():
+            print(f"{name:15s} {', '.join(crs_list)}")
+        return 0
+
+    if args.befehl == "layers":
+        from io_utils import find_haupt_gpkg, list_layers
+        haupt_gpkg_path = find_haupt_gpkg(os.path.join(base_dir, "hauptland"))
+        print(os.path.basename(haupt_gpkg_path))
+        for layer in list_layers(haupt_gpkg_path):
+            print(f"  {layer}")
+        return 0
+
+    if args.befehl == "importtime":
+        import import_report
+        summary = import_report.summarize(
+            import_report.measure(args.module or import_report.DEFAULT_MODULES, base_dir),
+            top=args.top,
+        )
+        import_report.print_report(summary)
+        if args.json_path:
+            import_report.write_json(summary, args.json_path)
+        if args.max_ms is not None and summary["gesamt_ms"] > args.max_ms:
+            print(f"Importzeit über Grenze: {summary['gesamt_ms']:.1f} ms > {args.max_ms:.1f} ms")
+            return 1
+        return 0
+
+    raise ValueError(f"Unbekannter Befehl: {args.befehl}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # 1) Konfiguration laden (einmal, ohne Seiteneffekte)
     config = load_config("config.json")
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    if args.befehl in ("regions", "layers", "importtime"):
+        sys.exit(run_light_command(args, config, base_dir))
 
     # 2) Logging konfigurieren
-    log_level_str = config.get("logging", {}).get("level", "INFO").upper()
-    log_level = getattr(logging, log_level_str, logging.INFO)
-    handlers = [RichHandler(rich_tracebacks=True)]
-    if logfile := config.get("logging", {}).get("file"):
-        fh = logging.FileHandler(logfile, encoding="utf-8")
-        fh.setFormatter(
-            logging.Formatter(
-                "%(asctime)s | %(levelname)s | %(message)s",
-                datefmt="%H:%M:%S",
-            )
-        )
-        handlers.append(fh)
+    setup_logging(config["logging"])
+    logger = logging.getLogger("mymaptool.main")
 
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s | %(levelname)s | %(message)s",
-        datefmt="%H:%M:%S",
-        handlers=handlers,
+    from profiling import Profiler, set_profiler
+    profiler = set_profiler(
+        Profiler.from_config(config, base_dir, path=args.profil, cprofile_stufe=args.cprofile)
     )
-    logger = logging.getLogger("mymaptool.main")
 
     try:
-        # 3) Basis-Pfade anlegen
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        hauptland_dir = os.path.join(base_dir, "hauptland")
-        nebenlaender_dir = os.path.join(base_dir, "nebenlaender")
-        output_dir = os.path.join(base_dir, config.get("output_dir", "output"))
-        os.makedirs(output_dir, exist_ok=True)
-
-        # 4) Modus wählen
-        spezialmodus = choose_mode()
-
-        # 5) Region wählen
-        region, ziel_crs_list = choose_region(config)
-
-        # 6) Kartengröße bestimmen
-        breite_px, hoehe_px = choose_dimensions(spezialmodus, config)
-
-        # 7) Scalebar konfigurieren
-        scalebar_cfg = config.get("scalebar", {})
-        if spezialmodus:
-            scalebar_cfg = choose_scalebar_option()
-
-        # 7) Background-Konfiguration
-        background_cfg = config.get(
-            "background", {"color": "#2896BA", "transparent": False}
+        with profiler.stage("gesamt", befehl=args.befehl or "interaktiv"):
+            exit_code = run_command(args, config, base_dir)
+    except Exception as e:
+        logger.exception("Fehler in main(): %s", e)
+        exit_code = 1
+    finally:
+        profiler.close()
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def run_command(args, config, base_dir) -> int:
+    """clear-cache, batch oder der interaktive Ablauf. Rückgabe: Exit-Code."""
+    logger = logging.getLogger("mymaptool.main")
+
+    # 3) Basis-Pfade anlegen
+    hauptland_dir = os.path.join(base_dir, "hauptland")
+    nebenlaender_dir = os.path.join(base_dir, "nebenlaender")
+    output_dir = os.path.join(base_dir, config.get("output_dir", "output"))
+    os.makedirs(output_dir, exist_ok=True)
+    if args.neu:
+        config = {**config, "ausgabe": {**config.get("ausgabe", {}), "ueberspringen": False}}
+
+    from data_processing.reproj_cache import ReprojCache
+    from data_processing.geostore import GeoStore
+    from layer_store import get_store
+    reproj_cache = ReprojCache.from_config(config, base_dir)
+    geostore = get_store().compiled = GeoStore.from_config(config, base_dir)
+
+    if args.befehl != "clear-cache":
+        # alle CRS der Regionen vorab prüfen statt mitten im Lauf zu scheitern
+        from data_processing.crs_registry import validate_regionen
+        validate_regionen(config)
+
+    if args.befehl == "compile":
+        return run_compile(args, config, hauptland_dir, nebenlaender_dir, geostore, reproj_cache)
+
+    if args.befehl == "clear-cache":
+        if reproj_cache is None:
+            logger.info("Reprojektions-Cache ist deaktiviert.")
+            return 0
+        anzahl = reproj_cache.clear()
+        logger.info(f"Reprojektions-Cache geleert: {anzahl} Einträge entfernt.")
+        return 0
+
+    if args.befehl == "batch":
+        from batch import load_jobs, run_batch
+        jobs = load_jobs(args.jobdatei)
+        results = run_batch(
+            jobs, config, hauptland_dir, nebenlaender_dir, output_dir,
+            reproj_cache=reproj_cache,
         )
-        if spezialmodus:
-            background_cfg = choose_background_option()
+        return 0 if all(r["ok"] for r in results) else 1
 
-        # 8) GPKG-Dateien finden
+    if args.befehl == "atlas":
+        from atlas import run_atlas
+        run_atlas(
+            config, args.region, hauptland_dir, nebenlaender_dir, output_dir,
+            namen=args.namen.split(",") if args.namen else None,
+            crs_list=args.crs.split(",") if args.crs else None,
+            formate=args.formate.split(",") if args.formate else None,
+            reproj_cache=reproj_cache,
+        )
+        return 0
+
+    if args.befehl == "serve":
+        from server import serve
+        serve(
+            config, hauptland_dir, nebenlaender_dir, reproj_cache=reproj_cache,
+            port=args.port, worker=args.worker,
+        )
+        return 0
+
+    if args.befehl == "tiles":
+        from tiles import parse_zoom, run_tiles
+        zooms = parse_zoom(args.zoom or config.get("kacheln", {}).get("zoom", [2, 6]))
+        run_tiles(
+            config, args.region, zooms, hauptland_dir, nebenlaender_dir, output_dir,
+            reproj_cache=reproj_cache, worker=args.worker,
+        )
+        return 0
+
+    run_interactive(config, hauptland_dir, nebenlaender_dir, output_dir, reproj_cache)
+    logger.info("Alle Karten wurden erfolgreich erstellt.")
+    return 0
+
+
+def run_compile(args, config, hauptland_dir, nebenlaender_dir, geostore, reproj_cache) -> int:
+    """GeoPackages kompilieren, optional das Hauptland vorprojizieren."""
+    import time
+    from data_processing.geostore import compile_all, preproject
+    from io_utils import find_haupt_gpkg
+    from styling import attribut_spalten
+    logger = logging.getLogger("mymaptool.main")
+
+    if geostore is None:
+        logger.error("Kompilierter Store ist deaktiviert (kompiliert.aktiv).")
+        return 1
+    start = time.perf_counter()
+    stats = compile_all(
+        geostore, hauptland_dir, nebenlaender_dir, config.get("nebenlaender", "ADM_ADM_0"),
+        attribut_spalten(config),
+    )
+    logger.info(
+        f"{stats['layer']} Layer kompiliert ({stats['bytes'] / 1e6:.1f} MB) "
+        f"in {time.perf_counter() - start:.2f} s → {geostore.directory}"
+    )
+    if args.vorprojizieren or config.get("kompiliert", {}).get("vorprojizieren", False):
+        if reproj_cache is None:
+            logger.warning("Vorprojektion übersprungen: Reprojektions-Cache ist deaktiviert.")
+        else:
+            preproject(config, find_haupt_gpkg(hauptland_dir), reproj_cache)
+    return 0
+
+
+def run_interactive(config, hauptland_dir, nebenlaender_dir, output_dir, reproj_cache=None):
+    """Bisheriger Ablauf: alle Einstellungen per Rückfrage, eine Region."""
+    logger = logging.getLogger("mymaptool.main")
+
+    # 4) Modus wählen
+    spezialmodus = choose_mode()
+
+    # 5) Region wählen
+    region, ziel_crs_list = choose_region(config)
+
+    # 6) Kartengröße bestimmen
+    breite_px, hoehe_px = choose_dimensions(spezialmodus, config)
+
+    # 7) Scalebar konfigurieren
+    scalebar_cfg = config.get("scalebar", {})
+    if spezialmodus:
+        scalebar_cfg = choose_scalebar_option()
+
+    # 7) Background-Konfiguration
+    background_cfg = config.get(
+        "background", {"color": "#2896BA", "transparent": False}
+    )
+    if spezialmodus:
+        background_cfg = choose_background_option()
+
+    # ab hier wird der Geo-Stack gebraucht
+    from io_utils import find_gpkg_files
+    from layer_selector import get_layers_interactive
+    from layer_store import get_store
+    from profiling import get_profiler
+    from styling import attribut_spalten
+    from data_processing.layers import (
+        merge_hauptland_layers,
+        apply_ausblenden,
+        select_highlights,
+    )
+
+    profiler = get_profiler()
+
+    # 8) GPKG-Dateien finden (Nachbarländer als LayerHandles, gelesen erst beim Rendern)
+    nachbarn_cfg = config.get("nachbarn", {})
+    with profiler.stage("nachbarn_laden") as st:
         haupt_gpkg_path, neben_gdfs = find_gpkg_files(
             hauptland_dir,
             nebenlaender_dir,
             config.get("nebenlaender", []),
+            lazy=nachbarn_cfg.get("lazy", True),
+            worker=nachbarn_cfg.get("worker") or None,
         )
+        st.set(anzahl=len(neben_gdfs))
 
-        # 9) Layer-Auswahl
-        if spezialmodus:
-            haupt_layers = get_layers_interactive(haupt_gpkg_path)
-        else:
-            haupt_layers = config.get("hauptland", [])
-
-        # 10) Geodaten verarbeiten
-        gdf_haupt = merge_hauptland_layers(haupt_gpkg_path, haupt_layers)
-        gdf_haupt, ausgeblendet_namen = apply_ausblenden(
-            gdf_haupt,
-            haupt_gpkg_path,
-            haupt_layers,
-            spezialmodus,
-        )
-        logger.debug(f"Ausgeblendete Regionen: {ausgeblendet_namen}")
-
-        highlight_cfg = select_highlights(
-            haupt_gpkg_path,
-            config,
-            haupt_layers,
-            spezialmodus,
-            ausgeblendet_namen,
+    # 9) Layer-Auswahl
+    if spezialmodus:
+        haupt_layers = get_layers_interactive(haupt_gpkg_path)
+    else:
+        haupt_layers = config.get("hauptland", [])
+
+    # 10) Geodaten verarbeiten
+    with profiler.stage("hauptland_laden", layer=haupt_layers) as st:
+        gdf_haupt = merge_hauptland_layers(
+            haupt_gpkg_path, haupt_layers, attribut_spalten(config),
+            kompakt=config.get("daten", {}).get("kompakt", False),
         )
+        st.geo(gdf_haupt)
+    gdf_haupt, ausgeblendet_namen = apply_ausblenden(
+        gdf_haupt,
+        haupt_gpkg_path,
+        haupt_layers,
+        spezialmodus,
+    )
+    logger.debug("Ausgeblendete Regionen: %s", ausgeblendet_namen)
 
-        # 11) Export-Formate wählen (erst jetzt, am Ende der Interaktion)
-        export_formats = {"png"}
-        if spezialmodus:
-            export_formats = choose_export_formats()
-
-        # 12) Karten erstellen & speichern
-        aspect_ratio = breite_px / hoehe_px
-
-        for ziel_crs in tqdm(ziel_crs_list, desc="Projektionen"):
-            # reprojiziere
-            haupt_proj = reproject(gdf_haupt, ziel_crs)
-            neben_proj = [reproject(g, ziel_crs) for g in neben_gdfs]
-
-            # Bounding Box passend zum Seitenverhältnis
-            bbox = compute_bbox(haupt_proj, aspect_ratio)
-
-            # Plotten
-            fig, ax = plot_map(
-                haupt_proj,
-                neben_proj,
-                highlight_cfg,
-                config["farben"],
-                bbox,
-                breite_px,
-                hoehe_px,
-                src_crs=ziel_crs,
-                label_text=None,
-                scalebar_cfg=scalebar_cfg,
-                background_cfg=background_cfg,
-                linien_cfg=config.get("linien"),
-            )
-
-            # Speichern
-            save_map(
-                fig,
-                output_dir,
-                region,
-                ziel_crs,
-                breite_px,
-                hoehe_px,
-                export_formats,
-                background_cfg=background_cfg,
-            )
-
-        logger.info("Alle Karten wurden erfolgreich erstellt.")
+    highlight_cfg = select_highlights(
+        haupt_gpkg_path,
+        config,
+        haupt_layers,
+        spezialmodus,
+        ausgeblendet_namen,
+    )
 
-    except Exception as e:
-        logger.exception("Fehler in main(): %s", e)
-        sys.exit(1)
+    # Rohlayer des Hauptlands werden ab hier nicht mehr gebraucht
+    store = get_store()
+    logger.debug("Layer-Store: %d Lesezugriffe, %.1f MB", store.reads, store.memory_bytes() / 1e6)
+    store.release(haupt_gpkg_path)
+
+    # 11) Export-Formate wählen (erst jetzt, am Ende der Interaktion)
+    export_formats = {"png"}
+    if spezialmodus:
+        export_formats = choose_export_formats()
+
+    # 12) Karten erstellen & speichern
+    from pipeline import render_region
+    render_region(
+        gdf_haupt,
+        neben_gdfs,
+        region,
+        ziel_crs_list,
+        config,
+        breite_px,
+        hoehe_px,
+        output_dir,
+        highlight_cfg,
+        scalebar_cfg=scalebar_cfg,
+        background_cfg=background_cfg,
+        export_formats=export_formats,
+        reproj_cache=reproj_cache,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+# atlas.py
+
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+from tqdm import tqdm
+
+from encoding import BackgroundEncoder, Grundbild
+from manifest import OutputManifest, map_fingerprint
+from pipeline import manifest_eintrag, render_figure, reuse_existing
+from plotting import RenderSession, save_map
+from profiling import get_profiler
+
+logger = logging.getLogger("mymaptool.atlas")
+
+
+def atlas_namen(gdf_haupt, namen: Optional[List[str]] = None) -> List[str]:
+    """
+    NAME_1-Werte, für die eine Karte entsteht: namen (in dieser Reihenfolge,
+    ohne im Hauptland fehlende) oder alle des Hauptlands, sortiert.
+    """
+    vorhanden = [str(n) for n in pd.unique(gdf_haupt["NAME_1"].dropna())]
+    if not namen:
+        return sorted(vorhanden)
+    bekannt = set(vorhanden)
+    unbekannt = [n for n in namen if n not in bekannt]
+    if unbekannt:
+        logger.warning("Atlas: %d unbekannte Region(en) übersprungen: %s", len(unbekannt), ", ".join(unbekannt))
+    return list(dict.fromkeys(n for n in namen if n in bekannt))
+
+
+def _dateiname(name: str) -> str:
+    """Regionsname als Teil eines Dateinamens."""
+    return re.sub(r"[^\w-]+", "_", name).strip("_") or "region"
+
+
+def render_atlas(
+    gdf_haupt,
+    neben_gdfs,
+    region: str,
+    ziel_crs_list: List[str],
+    namen: List[str],
+    config: dict,
+    breite_px: int,
+    hoehe_px: int,
+    output_dir: str,
+    scalebar_cfg: dict = None,
+    background_cfg: dict = None,
+    export_formats: set[str] = {"png"},
+    show_progress: bool = True,
+    reproj_cache=None,
+    manifest: OutputManifest = None,
+) -> int:
+    """
+    Eine Karte je NAME_1 in namen, jeweils nur diese Region hervorgehoben –
+    pixelgleich zu einzelnen render_region-Aufrufen (auch Fingerabdrücke
+    und Manifest sind dieselben). Je CRS wird die Karte einmal vorbereitet
+    (Reprojektion, Vereinfachung, Nachbarländer) und gezeichnet; je Region
+    wird nur das Hauptland neu gestylt (RenderSession.hervorheben), und
+    Rasterformate setzen nur den Vordergrund auf das einmal gerasterte
+    Grundbild (encoding.Grundbild).
+    Dateiname: {region}_{NAME_1}_{crs}_{…}.{ext}. Rückgabe: Anzahl Karten.
+    """
+    scalebar_cfg = {**config.get("scalebar", {}), **(scalebar_cfg or {})}
+    layer = (config.get("hervorhebung") or {}).get("layer", "")
+    export_cfg = config.get("export")
+    kompakt = (config.get("daten") or {}).get("kompakt", False)
+    profiler = get_profiler()
+
+    eigenes_manifest = manifest is None
+    if eigenes_manifest:
+        manifest = OutputManifest.from_config(config, output_dir)
+    session = RenderSession()
+    encoder = BackgroundEncoder.from_config(config)
+
+    karten = 0
+    try:
+        for ziel_crs in ziel_crs_list:
+            # Karten mit bekanntem Fingerabdruck übernehmen, nur die übrigen rendern
+            offen = []
+            for name in namen:
+                highlight_cfg = {"aktiv": True, "layer": layer, "namen": [name]}
+                fingerprint = map_fingerprint(
+                    gdf_haupt, neben_gdfs, ziel_crs, config, breite_px, hoehe_px,
+                    highlight_cfg, scalebar_cfg, background_cfg,
+                )
+                titel = f"{region}_{_dateiname(name)}"
+                basename = manifest.basename(titel, ziel_crs, fingerprint)
+                fehlend = reuse_existing(manifest, fingerprint, basename, export_formats, output_dir, export_cfg)
+                if fehlend:
+                    offen.append((titel, highlight_cfg, fingerprint, basename, fehlend))
+            karten += len(namen)
+            if not offen:
+                continue
+
+            with profiler.stage("atlas", region=region, crs=ziel_crs, karten=len(offen)):
+                fig = render_figure(
+                    gdf_haupt, neben_gdfs, ziel_crs, config, breite_px, hoehe_px,
+                    offen[0][1], scalebar_cfg, background_cfg, reproj_cache, session,
+                )
+                grundbild = Grundbild(session.vordergrund)
+                schritte = tqdm(offen, desc=ziel_crs) if show_progress else offen
+                for i, (titel, highlight_cfg, fingerprint, basename, fehlend) in enumerate(schritte):
+                    if i:
+                        with profiler.stage("hervorheben"):
+                            session.hervorheben(highlight_cfg)
+                    save_map(
+                        fig, output_dir, titel, ziel_crs, breite_px, hoehe_px, fehlend,
+                        background_cfg=background_cfg,
+                        close=False,
+                        basename=basename,
+                        export_cfg=export_cfg,
+                        encoder=encoder,
+                        on_written=manifest_eintrag(
+                            manifest, fingerprint, export_cfg, titel, ziel_crs, breite_px, hoehe_px,
+                        ),
+                        grundbild=grundbild,
+                    )
+                logger.debug("Atlas %s: Grundbild %d× wiederverwendet", ziel_crs, grundbild.treffer)
+            if kompakt:
+                session.reset()
+    finally:
+        try:
+            encoder.close()
+        finally:
+            session.close()
+            if eigenes_manifest:
+                manifest.save()
+    return karten
+
+
+def run_atlas(
+    config: dict,
+    region: str,
+    hauptland_dir: str,
+    nebenlaender_dir: str,
+    output_dir: str,
+    namen: Optional[List[str]] = None,
+    crs_list: Optional[List[str]] = None,
+    formate: Optional[List[str]] = None,
+    reproj_cache=None,
+) -> Dict[str, object]:
+    """
+    Lädt die Daten wie der Batch-Modus (Layer und Ausblenden aus der
+    Konfiguration) und rendert den Atlas einer Region nach
+    config["atlas"]; namen, crs_list und formate überschreiben die
+    Konfiguration. Rückgabe: {"karten", "regionen", "sekunden"}.
+    """
+    from io_utils import find_gpkg_files
+    from layer_store import get_store
+    from styling import attribut_spalten
+    from data_processing.crs_registry import check_crs
+    from data_processing.layers import merge_hauptland_layers, filter_ausgeblendet
+
+    if region not in config.get("regionen", {}):
+        raise ValueError(f"Ungültige Region: {region}")
+    atlas_cfg = config.get("atlas", {})
+    crs_list = crs_list or config["regionen"][region]
+    for crs in crs_list:
+        meldung = check_crs(crs)
+        if meldung:
+            raise ValueError(meldung)
+    formate = set(formate or atlas_cfg.get("formate", ["png"]))
+
+    start = time.perf_counter()
+    nachbarn_cfg = config.get("nachbarn", {})
+    haupt_gpkg_path, neben_gdfs = find_gpkg_files(
+        hauptland_dir, nebenlaender_dir, config.get("nebenlaender", []),
+        lazy=nachbarn_cfg.get("lazy", True), worker=nachbarn_cfg.get("worker") or None,
+    )
+    gdf_haupt = merge_hauptland_layers(
+        haupt_gpkg_path, config.get("hauptland", []), attribut_spalten(config),
+        kompakt=config.get("daten", {}).get("kompakt", False),
+    )
+    gdf_haupt, _ = filter_ausgeblendet(gdf_haupt, config.get("ausblenden", {}))
+    get_store().release(haupt_gpkg_path)
+
+    namen = atlas_namen(gdf_haupt, namen or atlas_cfg.get("namen"))
+    if not namen:
+        raise ValueError(f"Atlas {region}: keine Regionen (NAME_1) im Hauptland.")
+    logger.info("Atlas %s: %d Regionen × %d CRS (%s)", region, len(namen), len(crs_list), ", ".join(sorted(formate)))
+
+    atlas_dir = os.path.join(output_dir, atlas_cfg.get("verzeichnis", "atlas"))
+    os.makedirs(atlas_dir, exist_ok=True)
+    karten = render_atlas(
+        gdf_haupt, neben_gdfs, region, crs_list, namen, config,
+        config["karte"]["breite"], config["karte"]["hoehe"], atlas_dir,
+        background_cfg=config.get("background", {"color": "#2896BA", "transparent": False}),
+        export_formats=formate,
+        reproj_cache=reproj_cache,
+    )
+    get_store().clear()
+    sekunden = time.perf_counter() - start
+    logger.info("Atlas %s: %d Karten in %.2f s", region, karten, sekunden)
+    return {"karten": karten, "regionen": len(namen), "sekunden": sekunden}
@@ -1,4 +1,4 @@
-import geopandas as gpd
+from layer_store import get_store
 
 def select_ausblendbereiche(gpkg_path, verwendete_layer):
     """Interaktive Auswahl von Bereichen, die ausgeblendet werden sollen."""
@@ -24,8 +24,7 @@ def select_ausblendbereiche(gpkg_path, verwendete_layer):
         except Exception:
             raise ValueError("Ungültige Layer-Auswahl für Ausblendung.")
 
-    gdf = gpd.read_file(gpkg_path, layer=layer)
-    region_names = sorted(gdf["NAME_1"].dropna().unique())
+    region_names = get_store().names(gpkg_path, layer, "NAME_1")
 
     print("\n🚫 Verfügbare Regionen zum Ausblenden:")
     for i, name in enumerate(region_names, 1):
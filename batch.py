@@ -0,0 +1,205 @@
+# batch.py
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from encoding import BackgroundEncoder
+from io_utils import find_gpkg_files
+from data_processing.crs_registry import cache_info, check_crs
+from data_processing.layers import merge_hauptland_layers, filter_ausgeblendet
+from layer_store import get_store
+from manifest import OutputManifest
+from pipeline import render_region
+from plotting import RenderSession
+from profiling import get_profiler, rss_mb
+from styling import attribut_spalten
+
+logger = logging.getLogger("mymaptool.batch")
+
+
+def load_jobs(path: str) -> List[dict]:
+    """
+    Liest eine Jobdatei (JSON). Erlaubt ist entweder eine Liste von Jobs
+    oder ein Objekt mit dem Schlüssel "jobs". Jeder Job braucht mindestens
+    "region"; alle anderen Felder fallen auf die config.json zurück:
+
+      {"region": "europa", "crs": ["EPSG:3035"], "breite": 1240, "hoehe": 485,
+       "scalebar": {...}, "background": {...}, "hervorhebung": {...},
+       "ausblenden": {...}, "hauptland": [...], "formate": ["png"], "name": "..."}
+    """
+    job_path = Path(path)
+    if not job_path.exists():
+        raise FileNotFoundError(f"Jobdatei nicht gefunden: {job_path}")
+
+    data = json.loads(job_path.read_text(encoding="utf-8"))
+    jobs = data.get("jobs", []) if isinstance(data, dict) else data
+    if not isinstance(jobs, list) or not jobs:
+        raise ValueError(f"Keine Jobs in {job_path} gefunden.")
+
+    for idx, job in enumerate(jobs, 1):
+        if not isinstance(job, dict) or "region" not in job:
+            raise ValueError(f"Job {idx}: Feld 'region' fehlt.")
+    return jobs
+
+
+def resolve_job(job: dict, config: dict, idx: int) -> dict:
+    """Ergänzt einen Job um die Standardwerte aus der Konfiguration."""
+    region = job["region"]
+    if "crs" in job:
+        crs_list = job["crs"]
+    elif region in config.get("regionen", {}):
+        crs_list = config["regionen"][region]
+    else:
+        raise ValueError(f"Ungültige Region: {region}")
+    if isinstance(crs_list, str):
+        crs_list = [crs_list]
+    for crs in crs_list:
+        meldung = check_crs(crs)
+        if meldung:
+            raise ValueError(meldung)
+
+    return {
+        "name": job.get("name") or f"{idx:03d}_{region}",
+        "region": region,
+        "crs": crs_list,
+        "breite": int(job.get("breite", config["karte"]["breite"])),
+        "hoehe": int(job.get("hoehe", config["karte"]["hoehe"])),
+        "hauptland": job.get("hauptland", config.get("hauptland", [])),
+        "scalebar": job.get("scalebar", config.get("scalebar", {})),
+        "background": job.get(
+            "background", config.get("background", {"color": "#2896BA", "transparent": False})
+        ),
+        "hervorhebung": job.get("hervorhebung", {"aktiv": False, "layer": "", "namen": []}),
+        "ausblenden": job.get("ausblenden", {"aktiv": False, "bereiche": {}}),
+        "formate": set(job.get("formate", ["png"])),
+    }
+
+
+def run_batch(
+    jobs: List[dict],
+    config: dict,
+    hauptland_dir: str,
+    nebenlaender_dir: str,
+    output_dir: str,
+    reproj_cache=None,
+) -> List[Dict[str, object]]:
+    """
+    Arbeitet alle Jobs in einem Prozess ab. Alle Layer werden über den
+    Layer-Store einmal gelesen (Nachbarländer erst, wenn eine Karte sie
+    braucht, und bis zum Ende des Laufs behalten), zusammengeführte Hauptland-Layer je
+    Layer-Kombination nur einmal erzeugt, und alle Karten teilen sich
+    eine Figure (RenderSession). Karten, deren Fingerabdruck im Manifest des
+    Ausgabeordners steht, werden nicht neu gerendert. Fehler eines Jobs
+    brechen den Lauf nicht ab.
+    Rückgabe: Ergebnisliste je Job (name, ok, sekunden, karten, fehler).
+    """
+    profiler = get_profiler()
+    nachbarn_cfg = config.get("nachbarn", {})
+    with profiler.stage("nachbarn_laden") as st:
+        haupt_gpkg_path, neben_gdfs = find_gpkg_files(
+            hauptland_dir,
+            nebenlaender_dir,
+            config.get("nebenlaender", []),
+            lazy=nachbarn_cfg.get("lazy", True),
+            worker=nachbarn_cfg.get("worker") or None,
+        )
+        st.set(anzahl=len(neben_gdfs))
+    merged: Dict[Tuple[str, ...], object] = {}
+    session = RenderSession()
+    manifest = OutputManifest.from_config(config, output_dir)
+    encoder = BackgroundEncoder.from_config(config)
+
+    results = []
+    for idx, raw_job in enumerate(jobs, 1):
+        start = time.perf_counter()
+        result = {"name": raw_job.get("name") or raw_job.get("region"), "ok": False,
+                  "sekunden": 0.0, "karten": 0, "fehler": None}
+        try:
+            job = resolve_job(raw_job, config, idx)
+            result["name"] = job["name"]
+
+            layer_key = tuple(job["hauptland"])
+            if layer_key not in merged:
+                with profiler.stage("hauptland_laden", layer=job["hauptland"]) as st:
+                    merged[layer_key] = merge_hauptland_layers(
+                        haupt_gpkg_path, job["hauptland"], attribut_spalten(config),
+                        kompakt=config.get("daten", {}).get("kompakt", False),
+                    )
+                    st.geo(merged[layer_key])
+            gdf_haupt, ausgeblendet = filter_ausgeblendet(merged[layer_key], job["ausblenden"])
+
+            highlight_cfg = dict(job["hervorhebung"])
+            if ausgeblendet:
+                highlight_cfg["namen"] = [
+                    n for n in highlight_cfg.get("namen", []) if n not in ausgeblendet
+                ]
+
+            logger.info("Job %d/%d: %s (%s)", idx, len(jobs), job["name"], ", ".join(job["crs"]))
+            result["karten"] = render_region(
+                gdf_haupt,
+                neben_gdfs,
+                job["name"],
+                job["crs"],
+                config,
+                job["breite"],
+                job["hoehe"],
+                output_dir,
+                highlight_cfg,
+                scalebar_cfg=job["scalebar"],
+                background_cfg=job["background"],
+                export_formats=job["formate"],
+                show_progress=False,
+                reproj_cache=reproj_cache,
+                session=session,
+                manifest=manifest,
+                neben_freigeben=False,
+                encoder=encoder,
+            )
+            result["ok"] = True
+        except Exception as e:
+            logger.exception(f"Job {idx} fehlgeschlagen: {e}")
+            result["fehler"] = str(e)
+        finally:
+            manifest.save()
+        result["sekunden"] = time.perf_counter() - start
+        results.append(result)
+
+    logger.debug("Render-Session: %d Karten in einer Figure", session.karten)
+    logger.info(
+        f"Manifest: {manifest.uebersprungen} Dateien unverändert übersprungen, "
+        f"{manifest.verlinkt} verlinkt"
+    )
+    session.close()
+    encoder.close()
+    store = get_store()
+    logger.debug("Layer-Store: %d Lesezugriffe, %.1f MB", store.reads, store.memory_bytes() / 1e6)
+    store.clear()
+    info = cache_info()
+    logger.debug(
+        "CRS-Registry: %d CRS, %d Transformer, %d Treffer",
+        info["crs"]["eintraege"], info["transformer"]["eintraege"], info["transformer"]["treffer"],
+    )
+    rss, rss_peak = rss_mb()
+    if rss_peak is not None:
+        logger.info(
+            "Speicher: %.0f MB RSS, Spitze %.0f MB (kompakt: %s)",
+            rss or 0.0, rss_peak, "an" if config.get("daten", {}).get("kompakt") else "aus",
+        )
+
+    log_summary(results)
+    return results
+
+
+def log_summary(results: List[Dict[str, object]]):
+    """Schreibt die Zusammenfassung (Zeit und Status je Job) ins Log."""
+    ok = sum(1 for r in results if r["ok"])
+    total = sum(r["sekunden"] for r in results)
+    logger.info("Batch-Zusammenfassung:")
+    for r in results:
+        status = "OK    " if r["ok"] else "FEHLER"
+        detail = f"{r['karten']} Karte(n)" if r["ok"] else r["fehler"]
+        logger.info(f"  {status} {r['sekunden']:7.2f} s  {r['name']} – {detail}")
+    logger.info(f"{ok}/{len(results)} Jobs erfolgreich, {total:.2f} s gesamt.")
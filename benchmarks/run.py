@@ -0,0 +1,428 @@
+# benchmarks/run.py
+"""
+Benchmark aller Pipeline-Stufen auf synthetischen GeoPackages.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --features 5000 --vertices 400 --sizes 1240x485,4000x3000 --formats png,svg
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+
+Gemessen werden Lesen, Reprojektion, Bounding Box, Vereinfachung,
+Nachbarländer (LOD, Culling, Reprojektion), Zeichnen und Speichern je
+CRS/Größe/Format sowie der gesamte Ablauf (Lesen + render_region).
+Zeiten: Minimum und Median über --repeat Läufe. peak_mb: Spitzenwert
+der Python-/NumPy-Allokationen (tracemalloc) in einem zusätzlichen Lauf;
+Speicher von GEOS/GDAL ist darin nicht enthalten, dafür steht die
+maximale RSS des Prozesses in der Zusammenfassung.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from config import load_config
+from benchmarks.synth import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: Byte
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1024
+
+
+class Bench:
+    """Sammelt Messwerte je Stufe."""
+
+    def __init__(self, repeat: int = 3, memory: bool = True):
+        self.repeat = repeat
+        self.memory = memory
+        self.rows: List[Dict[str, object]] = []
+
+    def measure(
+        self,
+        stufe: str,
+        fn: Callable[[], object],
+        setup: Optional[Callable[[], None]] = None,
+        crs: str = None,
+        groesse: str = None,
+        format: str = None,
+    ):
+        """Misst fn (setup läuft vor jedem Aufruf, ungemessen). Rückgabe: Ergebnis des letzten Aufrufs."""
+        zeiten = []
+        result = None
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            result = fn()
+            zeiten.append(time.perf_counter() - start)
+
+        peak_mb = None
+        if self.memory:
+            if setup:
+                setup()
+            tracemalloc.start()
+            try:
+                result = fn()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            finally:
+                tracemalloc.stop()
+
+        row = {
+            "stufe": stufe,
+            "crs": crs,
+            "groesse": groesse,
+            "format": format,
+            "min_s": min(zeiten),
+            "median_s": statistics.median(zeiten),
+            "peak_mb": peak_mb,
+        }
+        self.rows.append(row)
+        print(_format_row(row), flush=True)
+        return result
+
+
+def row_key(row: Dict[str, object]) -> str:
+    return "|".join(str(row.get(k) or "-") for k in ("stufe", "crs", "groesse", "format"))
+
+
+def _format_row(row: Dict[str, object], extra: str = "") -> str:
+    peak = f"{row['peak_mb']:8.1f} MB" if row.get("peak_mb") is not None else "        –  "
+    return f"  {row['median_s'] * 1000:10.1f} ms  (min {row['min_s'] * 1000:9.1f})  {peak}  {row_key(row)}{extra}"
+
+
+def parse_sizes(text: str) -> List[tuple]:
+    sizes = []
+    for part in text.split(","):
+        w, h = part.lower().split("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def run(args) -> Dict[str, object]:
+    # Geo-Stack erst hier laden (Importzeit gehört nicht zur Messung)
+    from io_utils import ATTRIBUT_SPALTEN, find_gpkg_files
+    from layer_store import get_store
+    from data_processing.geostore import GeoStore, compile_all
+    from data_processing.layers import merge_hauptland_layers
+    from data_processing.crs import reproject, bbox_for_bounds, view_bounds
+    from data_processing.culling import clip_to_viewport, cull_to_extent, cull_to_viewport, viewport_rect
+    from data_processing.simplify import map_units_per_pixel, simplify_for_output, select_lod
+    from data_processing.topology import topology_output
+    from plotting import RenderSession, save_map
+    from pipeline import render_region
+
+    config = load_config(os.path.join(ROOT, "config.json"))
+    if args.engine:
+        config["render"] = {**config.get("render", {}), "engine": args.engine}
+    if args.topologie:
+        config["render"] = {**config.get("render", {}), "topologie": True}
+    if args.kompakt:
+        config["daten"] = {**config.get("daten", {}), "kompakt": True}
+    if args.zoom:
+        config["karte"] = {**config.get("karte", {}),
+                           "zoomlevel_horizontal": args.zoom, "zoomlevel_vertikal": args.zoom}
+    kompakt = config.get("daten", {}).get("kompakt", False)
+    simpl_cfg = config.get("vereinfachung", {})
+    toleranz_px = simpl_cfg.get("toleranz_px", 0.5)
+    min_flaeche_px = simpl_cfg.get("min_flaeche_px", 0.25)
+
+    daten_dir = args.daten or tempfile.mkdtemp(prefix="mymaptool_bench_")
+    output_dir = tempfile.mkdtemp(prefix="mymaptool_bench_out_")
+    bench = Bench(repeat=args.repeat, memory=not args.no_memory)
+    store = get_store()
+
+    try:
+        info = generate(
+            daten_dir,
+            features=args.features,
+            vertices=args.vertices,
+            layers=args.layers,
+            nachbarn=args.nachbarn,
+            nachbar_vertices=args.nachbar_vertices,
+        )
+        szenario = {
+            "features": info["features"],
+            "vertices": args.vertices,
+            "layers": args.layers,
+            "nachbarn": info["nachbarn"],
+            "nachbar_vertices": args.nachbar_vertices,
+            "crs": args.crs,
+            "sizes": args.sizes,
+            "formats": args.formats,
+            "engine": config.get("render", {}).get("engine", "geopandas"),
+            "topologie": bool(config.get("render", {}).get("topologie", False)),
+            "kompakt": bool(kompakt),
+            "zoom": args.zoom,
+            "atlas": args.atlas,
+        }
+        print(f"Synthetische Daten: {info['features']} Features in {len(info['layers'])} Layern, "
+              f"{info['nachbarn']} Nachbarländer ({daten_dir})")
+
+        crs_list = args.crs.split(",")
+        sizes = parse_sizes(args.sizes)
+        formats = args.formats.split(",")
+        nebenlayer = config.get("nebenlaender", "ADM_ADM_0")
+        highlight_cfg = {"aktiv": True, "layer": info["layers"][-1],
+                         "namen": [f"Region_{len(info['layers']) - 1}_{k}" for k in range(5)]}
+
+        # Lesen
+        _, neben_gdfs = bench.measure(
+            "lesen_nachbarn",
+            lambda: find_gpkg_files(info["hauptland_dir"], info["nebenlaender_dir"], nebenlayer),
+            setup=store.clear,
+        )
+        gdf_haupt = bench.measure(
+            "lesen_hauptland",
+            lambda: merge_hauptland_layers(info["haupt_gpkg"], info["layers"], kompakt=kompakt),
+            setup=lambda: store.release(info["haupt_gpkg"]),
+        )
+        geostore = GeoStore(os.path.join(daten_dir, "compiled"))
+        compile_all(geostore, info["hauptland_dir"], info["nebenlaender_dir"], nebenlayer, ATTRIBUT_SPALTEN)
+        bench.measure(
+            "lesen_kompiliert",
+            lambda: [geostore.load(info["haupt_gpkg"], layer, ATTRIBUT_SPALTEN) for layer in info["layers"]],
+        )
+
+        session = RenderSession()
+        for ziel_crs in crs_list:
+            haupt_proj = bench.measure(
+                "reprojektion", lambda: reproject(gdf_haupt, ziel_crs), crs=ziel_crs,
+            )
+            for breite, hoehe in sizes:
+                groesse = f"{breite}x{hoehe}"
+                kw = {"crs": ziel_crs, "groesse": groesse}
+                bbox = bench.measure(
+                    "bbox",
+                    lambda: bbox_for_bounds(
+                        view_bounds(haupt_proj.total_bounds, ziel_crs, config.get("karte")), breite / hoehe,
+                    ),
+                    **kw,
+                )
+                units_per_px = map_units_per_pixel(bbox, breite, hoehe)
+                rect = viewport_rect(bbox, 3 * units_per_px)
+                grenzen = None
+                if szenario["topologie"]:
+                    haupt_simpl, grenzen = bench.measure(
+                        "topologie",
+                        lambda: topology_output(
+                            gdf_haupt, ziel_crs, units_per_px, toleranz_px, min_flaeche_px, rect=rect,
+                        ),
+                        **kw,
+                    )
+                else:
+                    haupt_simpl = bench.measure(
+                        "vereinfachung",
+                        lambda: clip_to_viewport(simplify_for_output(
+                            cull_to_viewport(haupt_proj, rect), units_per_px, toleranz_px, min_flaeche_px,
+                        ), rect),
+                        **kw,
+                    )
+
+                def nachbarn():
+                    out = []
+                    for g in neben_gdfs:
+                        g = select_lod(g, bbox, ziel_crs, breite, hoehe,
+                                       toleranz_px, simpl_cfg.get("stufen", 5))
+                        sichtbar = cull_to_extent(g, bbox, ziel_crs)
+                        if not sichtbar.empty:
+                            proj = reproject(sichtbar, ziel_crs)
+                            out.append(simplify_for_output(proj, units_per_px, toleranz_px, min_flaeche_px))
+                    return out
+
+                neben_proj = bench.measure("nachbarn", nachbarn, **kw)
+
+                def zeichnen():
+                    return session.render(
+                        haupt_simpl, neben_proj, highlight_cfg, config["farben"], bbox,
+                        breite, hoehe, src_crs=ziel_crs,
+                        scalebar_cfg=config.get("scalebar"),
+                        background_cfg=config.get("background"),
+                        linien_cfg=config.get("linien"),
+                        render_cfg=config.get("render"),
+                        grenzen=grenzen,
+                    )[0]
+
+                fig = bench.measure("zeichnen", zeichnen, **kw)
+                for fmt in formats:
+                    bench.measure(
+                        "speichern",
+                        lambda: save_map(fig, output_dir, "bench", ziel_crs, breite, hoehe,
+                                         {fmt}, background_cfg=config.get("background"), close=False),
+                        format=fmt, **kw,
+                    )
+        session.close()
+
+        # Gesamter Ablauf je Größe und Format: Lesen + alle CRS rendern
+        for breite, hoehe in sizes:
+            for fmt in formats:
+                def gesamt():
+                    haupt_path, neben = find_gpkg_files(
+                        info["hauptland_dir"], info["nebenlaender_dir"], nebenlayer,
+                    )
+                    haupt = merge_hauptland_layers(haupt_path, info["layers"], kompakt=kompakt)
+                    return render_region(
+                        haupt, neben, "bench", crs_list, config, breite, hoehe, output_dir,
+                        highlight_cfg, export_formats={fmt}, show_progress=False,
+                    )
+
+                bench.measure("gesamt", gesamt, setup=store.clear,
+                              groesse=f"{breite}x{hoehe}", format=fmt)
+
+        # Atlas: eine Karte je Region, einzeln gerendert bzw. mit gemeinsamem Grundbild
+        if args.atlas:
+            from atlas import render_atlas
+            atlas_config = {**config, "ausgabe": {**config.get("ausgabe", {}), "ueberspringen": False}}
+            layer = info["layers"][-1]
+            namen = [f"Region_{len(info['layers']) - 1}_{k}" for k in range(args.atlas)]
+            for breite, hoehe in sizes:
+                for fmt in formats:
+                    kw = {"groesse": f"{breite}x{hoehe}", "format": fmt}
+                    bench.measure(
+                        "atlas_einzeln",
+                        lambda: [
+                            render_region(
+                                gdf_haupt, neben_gdfs, f"bench_{name}", crs_list, atlas_config, breite, hoehe,
+                                output_dir, {"aktiv": True, "layer": layer, "namen": [name]},
+                                export_formats={fmt}, show_progress=False,
+                            )
+                            for name in namen
+                        ],
+                        **kw,
+                    )
+                    bench.measure(
+                        "atlas",
+                        lambda: render_atlas(
+                            gdf_haupt, neben_gdfs, "bench", crs_list, namen, atlas_config, breite, hoehe,
+                            output_dir, export_formats={fmt}, show_progress=False,
+                        ),
+                        **kw,
+                    )
+
+        ausgabe_bytes = sum(
+            os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir)
+        )
+    finally:
+        store.clear()
+        shutil.rmtree(output_dir, ignore_errors=True)
+        if not args.daten:
+            shutil.rmtree(daten_dir, ignore_errors=True)
+
+    import geopandas, matplotlib, shapely
+    return {
+        "szenario": szenario,
+        "umgebung": {
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "geopandas": geopandas.__version__,
+            "shapely": shapely.__version__,
+            "matplotlib": matplotlib.__version__,
+        },
+        "max_rss_mb": _max_rss_mb(),
+        "ausgabe_bytes": ausgabe_bytes,
+        "ergebnisse": bench.rows,
+    }
+
+
+def compare(report: Dict[str, object], baseline: Dict[str, object],
+            threshold: float, min_ms: float) -> List[Dict[str, object]]:
+    """
+    Vergleicht die Mediane mit der Baseline. Regression: langsamer um mehr
+    als threshold (relativ) und mehr als min_ms (absolut, gegen Rauschen).
+    """
+    if baseline.get("szenario") != report["szenario"]:
+        print("Warnung: Szenario weicht von der Baseline ab – Vergleich nur bedingt aussagekräftig.")
+    base_rows = {row_key(r): r for r in baseline.get("ergebnisse", [])}
+    regressions = []
+    print(f"\nVergleich mit Baseline (Schwelle +{threshold:.0%}, mindestens {min_ms:.0f} ms):")
+    for row in report["ergebnisse"]:
+        base = base_rows.get(row_key(row))
+        if base is None:
+            print(_format_row(row, "  (neu)"))
+            continue
+        ratio = row["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        regression = (
+            ratio > 1 + threshold
+            and (row["median_s"] - base["median_s"]) * 1000 > min_ms
+        )
+        marker = "  REGRESSION" if regression else ""
+        print(_format_row(row, f"  {ratio:5.2f}×{marker}"))
+        if regression:
+            regressions.append({"stufe": row_key(row), "faktor": ratio})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Pipeline-Benchmark auf synthetischen GeoPackages.",
+    )
+    parser.add_argument("--features", type=int, default=400, help="Features im feinsten Hauptland-Layer")
+    parser.add_argument("--vertices", type=int, default=200, help="Stützpunkte je Hauptland-Feature")
+    parser.add_argument("--layers", type=int, default=2, help="Anzahl Hauptland-Layer (ADM_ADM_0 …)")
+    parser.add_argument("--nachbarn", type=int, default=6, help="Anzahl Nachbarland-GPKGs (max. 7)")
+    parser.add_argument("--nachbar-vertices", type=int, default=2000, help="Stützpunkte je Nachbarland")
+    parser.add_argument("--crs", default="EPSG:3035,EPSG:3857", help="Ziel-CRS, kommagetrennt")
+    parser.add_argument("--sizes", default="1240x485,4000x3000", help="Ausgabegrößen BxH, kommagetrennt")
+    parser.add_argument("--formats", default="png,svg", help="Ausgabeformate, kommagetrennt")
+    parser.add_argument("--engine", choices=["geopandas", "batched"], help="Render-Engine (Standard: config.json)")
+    parser.add_argument("--topologie", action="store_true",
+                        help="gemeinsame Grenzen einmal zeichnen (render.topologie)")
+    parser.add_argument("--kompakt", action="store_true",
+                        help="speicherarmer Datenmodus (daten.kompakt)")
+    parser.add_argument("--atlas", type=int, default=0,
+                        help="Atlas mit so vielen Regionen messen (einzeln vs. gemeinsames Grundbild)")
+    parser.add_argument("--zoom", type=float, default=0.0,
+                        help="Zoomstufe beider Achsen (karte.zoomlevel_*), 1 = halbe Breite und Höhe")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Messung")
+    parser.add_argument("--no-memory", action="store_true", help="ohne tracemalloc-Lauf")
+    parser.add_argument("--daten", help="Verzeichnis für die synthetischen Daten (bleibt erhalten)")
+    parser.add_argument("--json", dest="json_path", help="Ergebnis als JSON speichern")
+    parser.add_argument("--save-baseline", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--baseline", help="Baseline-JSON zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.2, help="erlaubte Verlangsamung (0.2 = 20 %%)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="Differenzen darunter gelten nicht als Regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    if report["max_rss_mb"] is not None:
+        print(f"\nMaximale RSS: {report['max_rss_mb']:.0f} MB")
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"Ergebnis gespeichert: {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"{len(regressions)} Regression(en) gegenüber {args.baseline}.")
+            return 1
+        print("Keine Regressionen.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
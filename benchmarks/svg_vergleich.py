@@ -0,0 +1,204 @@
+# benchmarks/svg_vergleich.py
+"""
+Vergleich des SVG-Exports: matplotlib (savefig) gegen den kompakten
+Writer (svg_export) als svg und svgz, auf synthetischen GeoPackages.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python -m benchmarks.svg_vergleich
+    python -m benchmarks.svg_vergleich --features 5000 --vertices 400 --sizes 4000x3000
+
+Gemessen werden Dateigröße und Schreibzeit je Variante. Für die
+Bildgleichheit werden das savefig-SVG und das kompakte SVG derselben
+Karte (mit Maßstab) von einem unabhängigen SVG-Renderer gerastert
+(cairosvg oder rsvg-convert) und verglichen; savefig schreibt dafür Text
+ebenfalls als Schrift (svg.fonttype "none"), sodass beide Seiten dieselbe
+Schriftdarstellung haben. Rückgabe 1, wenn mehr als --max-abweichung der
+Pixel sichtbar (> 64 von 255) abweichen, 3 (UEBERSPRUNGEN), wenn kein
+SVG-Renderer installiert ist – Größen und Zeiten werden trotzdem ausgegeben.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import load_config
+from benchmarks.run import ROOT, parse_sizes
+from benchmarks.synth import generate
+
+# Rückgabe von main, wenn nur gemessen und nicht verglichen werden konnte
+UEBERSPRUNGEN = 3
+
+
+def _cairosvg(svg: bytes, breite: int, hoehe: int) -> bytes:
+    import cairosvg
+    return cairosvg.svg2png(bytestring=svg, output_width=breite, output_height=hoehe)
+
+
+def _rsvg_convert(svg: bytes, breite: int, hoehe: int) -> bytes:
+    return subprocess.run(
+        [shutil.which("rsvg-convert"), "-w", str(breite), "-h", str(hoehe), "-f", "png"],
+        input=svg, capture_output=True, check=True,
+    ).stdout
+
+
+def svg_rasterer() -> Optional[Callable[[bytes, int, int], np.ndarray]]:
+    """
+    SVG-Renderer unabhängig von matplotlib und vom kompakten Writer:
+    cairosvg oder, falls nicht installiert, rsvg-convert; None, wenn
+    keiner verfügbar ist. Der Renderer liefert RGBA (hoehe × breite × 4).
+    """
+    from PIL import Image
+
+    try:
+        import cairosvg  # noqa: F401
+        zu_png = _cairosvg
+    except ImportError:
+        if shutil.which("rsvg-convert") is None:
+            return None
+        zu_png = _rsvg_convert
+
+    def rastern(svg: bytes, breite: int, hoehe: int) -> np.ndarray:
+        return np.asarray(Image.open(io.BytesIO(zu_png(svg, breite, hoehe))).convert("RGBA"))
+    return rastern
+
+
+def _messen(fn, repeat: int) -> float:
+    zeiten = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        zeiten.append(time.perf_counter() - start)
+    return statistics.median(zeiten)
+
+
+def run(args) -> List[Dict[str, object]]:
+    from matplotlib import rc_context
+    from io_utils import find_gpkg_files
+    from data_processing.layers import merge_hauptland_layers
+    from layer_store import get_store
+    from pipeline import render_figure
+    from plotting import RenderSession, save_map
+
+    config = load_config(os.path.join(ROOT, "config.json"))
+    if args.engine:
+        config["render"] = {**config.get("render", {}), "engine": args.engine}
+    if args.topologie:
+        config["render"] = {**config.get("render", {}), "topologie": True}
+    daten_dir = tempfile.mkdtemp(prefix="mymaptool_svg_")
+    output_dir = os.path.join(daten_dir, "ausgabe")
+    os.makedirs(output_dir)
+    ergebnisse = []
+    try:
+        info = generate(daten_dir, features=args.features, vertices=args.vertices, layers=2,
+                        nachbarn=args.nachbarn, nachbar_vertices=args.nachbar_vertices)
+        haupt_path, neben = find_gpkg_files(info["hauptland_dir"], info["nebenlaender_dir"],
+                                            config.get("nebenlaender", "ADM_ADM_0"))
+        gdf_haupt = merge_hauptland_layers(haupt_path, info["layers"])
+        highlight_cfg = {"aktiv": True, "layer": info["layers"][-1],
+                         "namen": [f"Region_1_{k}" for k in range(5)]}
+        background_cfg = config.get("background")
+        scalebar_cfg = {**config.get("scalebar", {}), "show": True}
+        svg_cfg = {**(config.get("export", {}).get("svg") or {}), "kompakt": True}
+        varianten = {
+            "savefig": ("svg", {"svg": {"kompakt": False}}),
+            "kompakt": ("svg", {"svg": svg_cfg}),
+            "kompakt_gz": ("svgz", {"svg": svg_cfg}),
+        }
+
+        rastern = svg_rasterer()
+        if rastern is None:
+            print("Bildvergleich übersprungen: kein SVG-Renderer (cairosvg oder rsvg-convert).", flush=True)
+
+        session = RenderSession()
+        for ziel_crs in args.crs.split(","):
+            for breite, hoehe in parse_sizes(args.sizes):
+                fig = render_figure(
+                    gdf_haupt, neben, ziel_crs, config, breite, hoehe, highlight_cfg,
+                    scalebar_cfg, background_cfg, None, session,
+                )
+                pfade = {}
+                for name, (ext, export_cfg) in varianten.items():
+                    def speichern():
+                        pfade[name] = save_map(
+                            fig, output_dir, name, ziel_crs, breite, hoehe, {ext},
+                            background_cfg=background_cfg, close=False,
+                            basename=f"{name}_{breite}x{hoehe}", export_cfg=export_cfg,
+                        )[ext]
+                    dauer = _messen(speichern, args.repeat)
+                    ergebnisse.append({
+                        "variante": name, "crs": ziel_crs, "groesse": f"{breite}x{hoehe}",
+                        "ms": dauer * 1000, "bytes": os.path.getsize(pfade[name]),
+                    })
+
+                for r in ergebnisse[-3:]:
+                    print(f"  {r['ms']:9.1f} ms  {r['bytes'] / 1e3:10.1f} kB  "
+                          f"{r['variante']}|{r['crs']}|{r['groesse']}", flush=True)
+                if rastern is None:
+                    continue
+
+                with rc_context({"svg.fonttype": "none"}):
+                    referenz = save_map(
+                        fig, output_dir, "referenz", ziel_crs, breite, hoehe, {"svg"},
+                        background_cfg=background_cfg, close=False,
+                        basename=f"referenz_{breite}x{hoehe}", export_cfg={"svg": {"kompakt": False}},
+                    )["svg"]
+                raster = []
+                for pfad in (referenz, pfade["kompakt"]):
+                    with open(pfad, "rb") as f:
+                        raster.append(rastern(f.read(), breite, hoehe).astype(int))
+                abweichung = (np.abs(raster[0] - raster[1]).max(axis=2) > 64).mean()
+                ergebnisse[-1]["abweichung"] = ergebnisse[-2]["abweichung"] = abweichung
+                print(f"  Pixelabweichung kompakt/savefig: {abweichung * 100:.3f} %", flush=True)
+        session.close()
+    finally:
+        get_store().clear()
+        shutil.rmtree(daten_dir, ignore_errors=True)
+    return ergebnisse
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.svg_vergleich",
+        description="SVG-Export: savefig gegen kompakten Writer (Größe, Zeit, Bildgleichheit).",
+    )
+    parser.add_argument("--features", type=int, default=400, help="Features im feinsten Hauptland-Layer")
+    parser.add_argument("--vertices", type=int, default=200, help="Stützpunkte je Hauptland-Feature")
+    parser.add_argument("--nachbarn", type=int, default=6, help="Anzahl Nachbarland-GPKGs (max. 7)")
+    parser.add_argument("--nachbar-vertices", type=int, default=2000, help="Stützpunkte je Nachbarland")
+    parser.add_argument("--crs", default="EPSG:3035", help="Ziel-CRS, kommagetrennt")
+    parser.add_argument("--sizes", default="1240x485,4000x3000", help="Ausgabegrößen BxH, kommagetrennt")
+    parser.add_argument("--engine", choices=["geopandas", "batched"], help="Render-Engine (Standard: config.json)")
+    parser.add_argument("--topologie", action="store_true",
+                        help="gemeinsame Grenzen einmal zeichnen (render.topologie)")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Messung")
+    parser.add_argument("--max-abweichung", type=float, default=0.005,
+                        help="erlaubter Anteil sichtbar abweichender Pixel (0.005 = 0,5 %%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    ergebnisse = run(args)
+    if not any("abweichung" in r for r in ergebnisse):
+        print("Bildgleichheit nicht geprüft (kein SVG-Renderer).")
+        return UEBERSPRUNGEN
+    schlecht = [r for r in ergebnisse if r.get("abweichung", 0) > args.max_abweichung]
+    if schlecht:
+        print(f"{len(schlecht) // 2} Karte(n) mit sichtbarer Abweichung über "
+              f"{args.max_abweichung * 100:.2f} %.")
+        return 1
+    print("Kompaktes SVG bildgleich (im Rahmen der Kantenglättung).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/synth.py
+
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+# Ausdehnung des synthetischen Hauptlands (lon/lat, etwa Mitteleuropa)
+EXTENT = (6.0, 47.0, 15.0, 55.0)
+
+
+def _edge(p0: np.ndarray, p1: np.ndarray, n: int, amplitude: float) -> np.ndarray:
+    """
+    n Punkte von p0 (inklusive) bis p1 (exklusive), senkrecht gewellt.
+    Die Auslenkung hängt nur von der Lage der Kante ab und ist an den
+    Ecken null – benachbarte Zellen teilen sich damit exakt dieselbe Grenze.
+    """
+    t = np.linspace(0.0, 1.0, n, endpoint=False)
+    lo, hi = (p0, p1) if tuple(p0) <= tuple(p1) else (p1, p0)
+    s = t if lo is p0 else 1.0 - t
+    phase = (lo[0] * 12.9898 + lo[1] * 78.233) % (2 * np.pi)
+    offset = amplitude * np.sin(np.pi * s) * np.sin(7 * np.pi * s + phase)
+    d = p1 - p0
+    richtung = hi - lo
+    normal = np.array([-richtung[1], richtung[0]]) / np.hypot(*richtung)
+    return p0 + np.outer(t, d) + np.outer(offset, normal)
+
+
+def wobbly_cells(
+    bounds: Tuple[float, float, float, float], nx: int, ny: int, vertices: int
+) -> List[shapely.Polygon]:
+    """Gitter aus nx × ny Polygonen mit je ca. vertices Stützpunkten und gemeinsamen Kanten."""
+    minx, miny, maxx, maxy = bounds
+    xs = np.linspace(minx, maxx, nx + 1)
+    ys = np.linspace(miny, maxy, ny + 1)
+    per_side = max(1, vertices // 4)
+    amplitude = 0.15 * min((maxx - minx) / nx, (maxy - miny) / ny)
+    cells = []
+    for j in range(ny):
+        for i in range(nx):
+            corners = np.array([
+                (xs[i], ys[j]), (xs[i + 1], ys[j]), (xs[i + 1], ys[j + 1]), (xs[i], ys[j + 1]),
+            ])
+            ring = np.vstack([
+                _edge(corners[k], corners[(k + 1) % 4], per_side, amplitude) for k in range(4)
+            ])
+            cells.append(shapely.Polygon(ring))
+    return cells
+
+
+def _grid_shape(features: int, bounds) -> Tuple[int, int]:
+    """Spalten/Zeilen für ca. features Zellen, möglichst quadratisch."""
+    minx, miny, maxx, maxy = bounds
+    ratio = (maxx - minx) / (maxy - miny)
+    nx = max(1, int(round(np.sqrt(features * ratio))))
+    ny = max(1, int(round(features / nx)))
+    return nx, ny
+
+
+def generate(
+    base_dir: str,
+    features: int = 400,
+    vertices: int = 200,
+    layers: int = 2,
+    nachbarn: int = 6,
+    nachbar_vertices: int = 2000,
+) -> Dict[str, object]:
+    """
+    Legt in base_dir die Ordnerstruktur der Anwendung an:
+      hauptland/synth.gpkg     Layer ADM_ADM_0 … ADM_ADM_{layers-1}, der
+                               letzte mit ca. features Polygonen, jeder
+                               höhere mit einem Viertel davon (NAME_1 je Zelle)
+      nebenlaender/synth_N*.gpkg  je ein Layer ADM_ADM_0; die ersten vier
+                               grenzen an, weitere liegen weit außerhalb (Culling)
+    Rückgabe: Beschreibung der erzeugten Daten (Pfade, Layer, Größen).
+    """
+    haupt_dir = os.path.join(base_dir, "hauptland")
+    neben_dir = os.path.join(base_dir, "nebenlaender")
+    os.makedirs(haupt_dir, exist_ok=True)
+    os.makedirs(neben_dir, exist_ok=True)
+
+    haupt_path = os.path.join(haupt_dir, "synth.gpkg")
+    if os.path.exists(haupt_path):
+        os.remove(haupt_path)
+
+    layer_names = []
+    total_features = 0
+    for level in range(layers):
+        n = max(1, features // 4 ** (layers - 1 - level))
+        nx, ny = _grid_shape(n, EXTENT)
+        cells = wobbly_cells(EXTENT, nx, ny, vertices)
+        name = f"ADM_ADM_{level}"
+        gdf = gpd.GeoDataFrame(
+            {
+                "GID_0": ["SYN"] * len(cells),
+                "NAME_1": [f"Region_{level}_{k}" for k in range(len(cells))],
+                "TYPE_1": ["Synth"] * len(cells),
+            },
+            geometry=cells,
+            crs="EPSG:4326",
+        )
+        gdf.to_file(haupt_path, layer=name, driver="GPKG")
+        layer_names.append(name)
+        total_features += len(cells)
+
+    for fname in os.listdir(neben_dir):
+        if fname.startswith("synth_N") and fname.endswith(".gpkg"):
+            os.remove(os.path.join(neben_dir, fname))
+
+    minx, miny, maxx, maxy = EXTENT
+    w, h = maxx - minx, maxy - miny
+    angrenzend = [
+        (minx - w, miny, minx, maxy),
+        (maxx, miny, maxx + w, maxy),
+        (minx, maxy, maxx, maxy + h / 2),
+        (minx, miny - h / 2, maxx, miny),
+    ]
+    entfernt = [(-120.0, 30.0, -100.0, 45.0), (100.0, 60.0, 140.0, 75.0), (-70.0, -40.0, -55.0, -20.0)]
+    boxes = (angrenzend + entfernt)[:nachbarn]
+    for k, bounds in enumerate(boxes):
+        poly = wobbly_cells(bounds, 1, 1, nachbar_vertices)[0]
+        gpd.GeoDataFrame(
+            {"GID_0": [f"N{k}"], "COUNTRY": [f"Nachbar {k}"]},
+            geometry=[poly],
+            crs="EPSG:4326",
+        ).to_file(os.path.join(neben_dir, f"synth_N{k}.gpkg"), layer="ADM_ADM_0", driver="GPKG")
+
+    return {
+        "hauptland_dir": haupt_dir,
+        "nebenlaender_dir": neben_dir,
+        "haupt_gpkg": haupt_path,
+        "layers": layer_names,
+        "features": total_features,
+        "vertices": vertices,
+        "nachbarn": len(boxes),
+    }
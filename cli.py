@@ -2,12 +2,8 @@
 
 from typing import Tuple, List, Set, Dict
 import logging
-from rich.logging import RichHandler
 
 logger = logging.getLogger("mymaptool.cli")
-logger.setLevel(logging.INFO)
-handler = RichHandler(rich_tracebacks=True)
-logger.addHandler(handler)
 
 def choose_mode() -> bool:
     """
@@ -138,13 +134,22 @@ def choose_export_formats() -> Set[str]:
     print("  [1] Nur PNG (Standard)")
     print("  [2] Nur SVG")
     print("  [3] PNG & SVG")
+    print("  [4] WebP")
+    print("  [5] JPEG")
+    print("  [6] PNG, WebP & SVG")
 
-    auswahl = input("Format auswählen [1/2/3]: ").strip()
+    auswahl = input("Format auswählen [1–6]: ").strip()
     if auswahl == "2":
         return {"svg"}
     if auswahl == "3":
         return {"png", "svg"}
-
-    if auswahl not in {"1", "2", "3"}:
+    if auswahl == "4":
+        return {"webp"}
+    if auswahl == "5":
+        return {"jpg"}
+    if auswahl == "6":
+        return {"png", "webp", "svg"}
+
+    if auswahl not in {"1", "2", "3", "4", "5", "6"}:
         logger.info("Ungültige Auswahl, verwende Standard PNG.")
     return {"png"}
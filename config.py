@@ -1,30 +1,95 @@
 # config.py
 
+import atexit
+import copy
 import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 # Standard-Pfade
 BASE_DIR = Path(__file__).parent.resolve()
 DEFAULT_CONFIG_PATH = BASE_DIR / "config.json"
 
+# Markierung für Handler, die setup_logging angelegt hat
+_HANDLER_TAG = "_mymaptool_handler"
 
-def setup_logging(log_cfg: dict):
-    """Initialisiert das Logging mit RotatingFileHandler."""
-    level = log_cfg.get("level", "INFO").upper()
-    log_file = log_cfg.get("file", "app.log")
-    max_bytes = log_cfg.get("maxBytes", 5 * 1024 * 1024)
-    backup_count = log_cfg.get("backupCount", 3)
+# Hintergrund-Thread, der die Records aus der Queue an die Handler gibt
+_LISTENER: Optional[QueueListener] = None
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Stellt die Meldung im aufrufenden Thread fertig (die Argumente können
+    sich danach noch ändern); exc_info bleibt für die Rich-Tracebacks erhalten.
+    """
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Ein JSON-Objekt je Zeile: Zeit, Level, Logger, Meldung, Herkunft, ggf. Traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        eintrag = {
+            "zeit": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "meldung": record.getMessage(),
+            "modul": record.module,
+            "zeile": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            eintrag["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(eintrag, ensure_ascii=False)
+
+
+def _log_path(log_file: str) -> Path:
     log_path = Path(log_file)
     if not log_path.is_absolute():
         log_path = BASE_DIR / log_path
     log_path.parent.mkdir(parents=True, exist_ok=True)
+    return log_path
+
+
+def stop_logging():
+    """Beendet den Listener (schreibt noch wartende Records) und schließt alle Handler."""
+    global _LISTENER
+    listener, _LISTENER = _LISTENER, None
+    if listener is not None:
+        listener.stop()
+        for h in listener.handlers:
+            h.close()
+    root = logging.getLogger()
+    for old in [h for h in root.handlers if getattr(h, _HANDLER_TAG, False)]:
+        root.removeHandler(old)
+        old.close()
+
+
+def setup_logging(log_cfg: dict, console: bool = True):
+    """
+    Initialisiert das Logging: RotatingFileHandler, optional eine JSON-Datei
+    (log_cfg["json_file"], eine Zeile je Record) und die Rich-Konsole.
+    Mit log_cfg["queue"] (Standard) hängt am Root-Logger nur ein
+    QueueHandler; Formatieren und Schreiben übernimmt ein Hintergrund-Thread,
+    damit Log-I/O das Rendern nicht aufhält. Mehrfache Aufrufe ersetzen die
+    zuvor angelegten Handler, statt sie zu verdoppeln.
+    """
+    global _LISTENER
+    level = log_cfg.get("level", "INFO").upper()
+    max_bytes = log_cfg.get("maxBytes", 5 * 1024 * 1024)
+    backup_count = log_cfg.get("backupCount", 3)
 
     handler = RotatingFileHandler(
-        filename=str(log_path),
+        filename=str(_log_path(log_cfg.get("file", "app.log"))),
         maxBytes=max_bytes,
         backupCount=backup_count,
         encoding="utf-8",
@@ -32,20 +97,47 @@ def setup_logging(log_cfg: dict):
     handler.setFormatter(
         logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
     )
-
+    handlers = [handler]
+
+    if log_cfg.get("json_file"):
+        json_handler = RotatingFileHandler(
+            filename=str(_log_path(log_cfg["json_file"])),
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    if console:
+        from rich.logging import RichHandler
+        handlers.append(RichHandler(rich_tracebacks=True))
+
+    stop_logging()
     root = logging.getLogger()
+    if log_cfg.get("queue", True):
+        log_queue = queue.SimpleQueue()
+        _LISTENER = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _LISTENER.start()
+        handlers = [_QueueHandler(log_queue)]
+    for h in handlers:
+        setattr(h, _HANDLER_TAG, True)
+        root.addHandler(h)
     root.setLevel(getattr(logging, level))
-    root.addHandler(handler)
 
     suppress_modules = log_cfg.get("suppress_modules", [])
     for module_name in suppress_modules:
         logging.getLogger(module_name).setLevel(logging.WARNING)
 
 
+# wartende Records beim Beenden noch schreiben
+atexit.register(stop_logging)
+
+
 def load_config(path: Union[str, Path] = None) -> dict:
     """
-    Lädt die Konfiguration von disk,
-    initialisiert Logging und gibt das Dict zurück.
+    Lädt die Konfiguration von disk und gibt das Dict zurück.
+    Keine Seiteneffekte – das Logging richtet setup_logging() ein.
     """
     cfg_path = Path(path) if path else DEFAULT_CONFIG_PATH
     if not cfg_path.is_absolute():
@@ -56,16 +148,8 @@ def load_config(path: Union[str, Path] = None) -> dict:
 
     config = json.loads(cfg_path.read_text(encoding="utf-8"))
 
-    # Logging-Bereich in config sicherstellen und initialisieren
+    # Logging-Bereich in config sicherstellen
     log_cfg = config.setdefault("logging", {})
     log_cfg["level"] = log_cfg.get("level", "INFO").upper()
-    setup_logging(log_cfg)
 
     return config
-
-
-# einmaliges Laden der config beim Import
-CONFIG = load_config()
-
-# Scalebar-Parameter global verfügbar machen
-SCALER = CONFIG.get("scalebar", {})
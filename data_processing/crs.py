@@ -1,7 +1,115 @@
 # data_processing/crs.py
 
-def reproject(gdf, target_crs: str):
-    return gdf.to_crs(target_crs)
+import weakref
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from data_processing.crs_registry import get_crs, get_transformer
+
+
+def to_crs(gdf, target_crs):
+    """
+    Wie gdf.to_crs(target_crs), aber mit CRS und Transformer aus der
+    gemeinsamen Registry (kein erneutes Parsen bzw. PROJ-Datenbankzugriff).
+    """
+    target = get_crs(target_crs)
+    geoms = np.asarray(gdf.geometry.array)
+    if gdf.crs is None or gdf.crs.is_exact_same(target) or shapely.has_z(geoms).any():
+        return gdf.to_crs(target)
+    transformer = get_transformer(gdf.crs, target)
+    coords = shapely.get_coordinates(geoms)
+    x, y = transformer.transform(coords[:, 0], coords[:, 1])
+    geoms = shapely.set_coordinates(geoms.copy(), np.column_stack([x, y]))
+    return gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs=target))
+
+
+def reproject(gdf, target_crs: str, cache=None, variante: str = ""):
+    """
+    Projiziert gdf nach target_crs. Mit einem ReprojCache wird das
+    Ergebnis persistent zwischengespeichert (nur für GeoDataFrames mit
+    bekannter Herkunft, siehe gdf.attrs["quellen"]).
+    """
+    key = cache.key(gdf, target_crs, variante) if cache is not None else None
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            cached.attrs = dict(gdf.attrs)
+            return cached
+
+    projected = to_crs(gdf, target_crs)
+    if key:
+        cache.put(key, projected)
+    return projected
+
+def _in_bloecken(gdf, block: int):
+    """Zeilenblöcke von gdf bzw. eines Arrays (Slices, keine Kopien)."""
+    block = max(1, int(block))
+    zeilen = gdf.iloc if hasattr(gdf, "iloc") else gdf
+    for start in range(0, len(gdf), block):
+        yield zeilen[start:start + block]
+
+
+# Bounds je Quell-GeoDataFrame und Ziel-CRS (über id, solange das Objekt lebt)
+_BOUNDS: Dict[int, Tuple[weakref.ref, Dict[str, np.ndarray]]] = {}
+
+
+def projected_bounds(gdf, target_crs, block: int = 5000) -> np.ndarray:
+    """
+    total_bounds von gdf in target_crs, ohne projizierte Geometrien
+    anzulegen: die Koordinaten werden blockweise transformiert und nur
+    Minimum und Maximum behalten. Gleiches Ergebnis wie
+    to_crs(gdf, target_crs).total_bounds.
+    """
+    entry = _BOUNDS.get(id(gdf))
+    if entry is None or entry[0]() is not gdf:
+        key = id(gdf)
+        entry = _BOUNDS[key] = (weakref.ref(gdf, lambda _ref: _BOUNDS.pop(key, None)), {})
+    schluessel = str(target_crs)
+    if schluessel in entry[1]:
+        return entry[1][schluessel]
+
+    target = get_crs(target_crs)
+    geoms = np.asarray(gdf.geometry.array)
+    if gdf.crs is None or gdf.crs.is_exact_same(target) or shapely.has_z(geoms).any():
+        bounds = to_crs(gdf, target).total_bounds
+    else:
+        transformer = get_transformer(gdf.crs, target)
+        bounds = np.array([np.inf, np.inf, -np.inf, -np.inf])
+        for teil in _in_bloecken(geoms, block):
+            coords = shapely.get_coordinates(teil)
+            if not len(coords):
+                continue
+            x, y = transformer.transform(coords[:, 0], coords[:, 1])
+            bounds = np.r_[np.minimum(bounds[:2], [np.nanmin(x), np.nanmin(y)]),
+                           np.maximum(bounds[2:], [np.nanmax(x), np.nanmax(y)])]
+        if not np.isfinite(bounds).all():
+            bounds = np.full(4, np.nan)
+    entry[1][schluessel] = bounds
+    return bounds
+
+
+def reproject_blockweise(gdf, target_crs, verarbeiten=None, block: int = 5000):
+    """
+    Projiziert gdf in Blöcken von block Features und wendet verarbeiten
+    (z. B. die Vereinfachung) auf jeden Block an, bevor der nächste folgt:
+    in voller Auflösung liegt so nur ein Block projiziert im Speicher.
+    Gleiches Ergebnis wie verarbeiten(to_crs(gdf, target_crs)), solange
+    verarbeiten je Feature unabhängig arbeitet.
+    """
+    teile = []
+    for teil in _in_bloecken(gdf, block):
+        teil = to_crs(teil, target_crs)
+        teile.append(verarbeiten(teil) if verarbeiten is not None else teil)
+    if len(teile) == 1:
+        return teile[0]
+    if not teile:
+        return to_crs(gdf, target_crs)
+    return pd.concat(teile)
+
 
 def compute_bbox(gdf, aspect_ratio: float):
     """
@@ -9,8 +117,38 @@ def compute_bbox(gdf, aspect_ratio: float):
     das das gegebene GeoDataFrame mit dem gewünschten Seitenverhältnis
     plus 5%-Padding umschließt.
     """
+    return bbox_for_bounds(gdf.total_bounds, aspect_ratio)
+
+
+def view_bounds(bounds, target_crs, karte_cfg: dict = None) -> tuple:
+    """
+    Bounds (minx, miny, maxx, maxy) des Kartenausschnitts im Ziel-CRS:
+    karte_cfg["ausschnitt"] ([west, süd, ost, nord] in Länge/Breite) oder
+    die Bounds des Hauptlands; jeweils um die Zoomstufen verkleinert –
+    zoomlevel_horizontal bzw. zoomlevel_vertikal = z halbiert Breite bzw.
+    Höhe z-mal (um die Mitte, negative Werte vergrößern).
+    """
+    karte_cfg = karte_cfg or {}
+    ausschnitt = karte_cfg.get("ausschnitt")
+    if ausschnitt:
+        west, sued, ost, nord = ausschnitt
+        bounds = get_transformer("EPSG:4326", target_crs).transform_bounds(
+            west, sued, ost, nord, densify_pts=21,
+        )
+    minx, miny, maxx, maxy = bounds
+    zoom_x = 2.0 ** -float(karte_cfg.get("zoomlevel_horizontal") or 0.0)
+    zoom_y = 2.0 ** -float(karte_cfg.get("zoomlevel_vertikal") or 0.0)
+    if zoom_x == 1.0 and zoom_y == 1.0:
+        return minx, miny, maxx, maxy
+    center_x, center_y = (minx + maxx) / 2, (miny + maxy) / 2
+    half_w, half_h = (maxx - minx) * zoom_x / 2, (maxy - miny) * zoom_y / 2
+    return center_x - half_w, center_y - half_h, center_x + half_w, center_y + half_h
+
+
+def bbox_for_bounds(bounds, aspect_ratio: float, puffer: float = 0.05):
+    """Wie compute_bbox, für bereits bekannte Bounds (minx, miny, maxx, maxy) und mit wählbarem Rand."""
     # ursprüngliche Bounds
-    minx, miny, maxx, maxy = gdf.total_bounds
+    minx, miny, maxx, maxy = bounds
     width, height = maxx - minx, maxy - miny
     center_x, center_y = (minx + maxx) / 2, (miny + maxy) / 2
 
@@ -23,8 +161,8 @@ def compute_bbox(gdf, aspect_ratio: float):
         new_width = height * aspect_ratio
 
     # 5% Buffer
-    new_width *= 1.05
-    new_height *= 1.05
+    new_width *= 1 + puffer
+    new_height *= 1 + puffer
 
     # wirklich zurückgebende Variablen
     xmin = center_x - new_width / 2
@@ -0,0 +1,119 @@
+# data_processing/crs_registry.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List
+
+from pyproj import CRS, Transformer
+from pyproj.exceptions import CRSError
+
+logger = logging.getLogger("mymaptool.crs_registry")
+
+
+class _LRU:
+    """Kleiner threadsicherer LRU-Cache; erzeugt fehlende Einträge außerhalb der Sperre."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, factory):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            # parallel erzeugt: der zuerst eingetragene Wert gilt
+            value = self._data.setdefault(key, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"eintraege": len(self._data), "treffer": self.hits, "fehlzugriffe": self.misses}
+
+
+# CRS- und Transformer-Objekte sind ab pyproj 3.1 threadsicher und
+# können von allen Threads gemeinsam benutzt werden
+_CRS = _LRU(64)
+_TRANSFORMER = _LRU(256)
+
+
+def crs_key(crs) -> Hashable:
+    """Schlüssel eines CRS: die Eingabe (z. B. "EPSG:3035") bzw. srs eines CRS-Objekts."""
+    if isinstance(crs, CRS):
+        return crs.srs or crs.to_wkt()
+    return str(crs)
+
+
+def get_crs(crs) -> CRS:
+    """Geparstes CRS (aus dem Cache); crs wie bei CRS.from_user_input."""
+    if isinstance(crs, CRS):
+        return crs
+    return _CRS.get(crs_key(crs), lambda: CRS.from_user_input(crs))
+
+
+def get_transformer(src, dst, always_xy: bool = True) -> Transformer:
+    """Transformer von src nach dst (aus dem Cache)."""
+    key = (crs_key(src), crs_key(dst), always_xy)
+    return _TRANSFORMER.get(
+        key, lambda: Transformer.from_crs(get_crs(src), get_crs(dst), always_xy=always_xy)
+    )
+
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    return {"crs": _CRS.info(), "transformer": _TRANSFORMER.info()}
+
+
+def clear():
+    _CRS.clear()
+    _TRANSFORMER.clear()
+
+
+def check_crs(crs: str) -> str:
+    """
+    Prüft ein CRS. Rückgabe: leerer Text, wenn gültig, sonst die
+    Fehlerbeschreibung (mit Vorschlag, z. B. ESRI:102022 statt EPSG:102022).
+    """
+    try:
+        get_crs(crs)
+        return ""
+    except CRSError:
+        pass
+    autoritaet, _, code = str(crs).partition(":")
+    if autoritaet.upper() == "EPSG" and code:
+        vorschlag = f"ESRI:{code}"
+        try:
+            get_crs(vorschlag)
+            return f"{crs} ist kein EPSG-Code – gemeint ist vermutlich {vorschlag}"
+        except CRSError:
+            pass
+    return f"{crs} ist unbekannt"
+
+
+def validate_regionen(config: dict):
+    """
+    Prüft alle CRS in config["regionen"] vorab (und legt sie dabei im
+    Cache ab). Wirft ValueError mit allen Fehlern, wenn eines ungültig ist.
+    """
+    fehler: List[str] = []
+    for region, crs_list in config.get("regionen", {}).items():
+        for crs in [crs_list] if isinstance(crs_list, str) else crs_list:
+            meldung = check_crs(crs)
+            if meldung:
+                fehler.append(f"regionen.{region}: {meldung}")
+    if fehler:
+        raise ValueError("Ungültige CRS in der Konfiguration:\n  " + "\n  ".join(fehler))
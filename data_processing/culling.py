@@ -0,0 +1,186 @@
+# data_processing/culling.py
+
+import logging
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely.geometry import box
+
+from data_processing.crs_registry import get_crs, get_transformer
+
+logger = logging.getLogger("mymaptool.culling")
+
+Bounds = Tuple[float, float, float, float]
+
+
+def _split_antimeridian(west, south, east, north) -> List[Bounds]:
+    """transform_bounds liefert west > east, wenn der Bereich die Datumsgrenze kreuzt."""
+    if west > east:
+        return [(west, south, 180.0, north), (-180.0, south, east, north)]
+    return [(west, south, east, north)]
+
+
+def _intersect(a: Bounds, b: Bounds) -> Optional[Bounds]:
+    minx, miny = max(a[0], b[0]), max(a[1], b[1])
+    maxx, maxy = min(a[2], b[2]), min(a[3], b[3])
+    if minx > maxx or miny > maxy:
+        return None
+    return minx, miny, maxx, maxy
+
+
+def viewport_bounds(bbox: tuple, target_crs, src_crs, densify_pts: int = 21) -> Optional[List[Bounds]]:
+    """
+    Rechnet den Kartenausschnitt bbox (xmin, xmax, ymin, ymax) im Ziel-CRS
+    in Rechtecke im Quell-CRS um und schneidet sie mit dem Gültigkeits-
+    bereich (area_of_use) des Ziel-CRS. None bedeutet: keine Aussage
+    möglich, also nichts aussortieren. [] bedeutet: nichts ist sichtbar.
+    """
+    target = get_crs(target_crs)
+    src = get_crs(src_crs)
+    xmin, xmax, ymin, ymax = bbox
+
+    try:
+        to_src = get_transformer(target, src)
+        bounds = to_src.transform_bounds(xmin, ymin, xmax, ymax, densify_pts=densify_pts)
+    except Exception as e:
+        logger.debug("Ausschnitt nicht nach %s transformierbar: %s", src, e)
+        return None
+    if not all(math.isfinite(v) for v in bounds):
+        return None
+
+    boxes = _split_antimeridian(*bounds) if src.is_geographic else [bounds]
+
+    # Gültigkeitsbereich des Ziel-CRS (in Länge/Breite)
+    aou = target.area_of_use
+    if aou is None or aou.west > aou.east:
+        return boxes
+    try:
+        lonlat_to_src = get_transformer("EPSG:4326", src)
+        aou_bounds = lonlat_to_src.transform_bounds(
+            aou.west, aou.south, aou.east, aou.north, densify_pts=densify_pts
+        )
+    except Exception:
+        return boxes
+    if not all(math.isfinite(v) for v in aou_bounds):
+        return boxes
+
+    aou_boxes = _split_antimeridian(*aou_bounds) if src.is_geographic else [aou_bounds]
+    return [
+        clipped
+        for b in boxes
+        for a in aou_boxes
+        if (clipped := _intersect(b, a)) is not None
+    ]
+
+
+def extent_visible(extent, bbox: tuple, target_crs) -> bool:
+    """
+    Ob eine Layer-Ausdehnung ((minx, miny, maxx, maxy), CRS), z. B. aus
+    io_utils.layer_extent, den Kartenausschnitt berührt. Im Zweifel True.
+    """
+    if extent is None:
+        return True
+    bounds, src_crs = extent
+    try:
+        boxes = viewport_bounds(bbox, target_crs, src_crs)
+    except Exception as e:
+        logger.debug("Ausdehnung in %s nicht prüfbar: %s", src_crs, e)
+        return True
+    if boxes is None:
+        return True
+    return any(_intersect(bounds, b) is not None for b in boxes)
+
+
+def cull_to_extent(gdf: gpd.GeoDataFrame, bbox: tuple, target_crs) -> gpd.GeoDataFrame:
+    """
+    Entfernt alle Features, deren Bounding Box den Kartenausschnitt
+    (bbox im Ziel-CRS) bzw. den Gültigkeitsbereich des Ziel-CRS nicht
+    berührt. Läuft im Quell-CRS über den räumlichen Index (sindex),
+    also vor der Reprojektion. Unverändertes gdf, wenn alles sichtbar ist.
+    """
+    if gdf.empty or gdf.crs is None:
+        return gdf
+
+    boxes = viewport_bounds(bbox, target_crs, gdf.crs)
+    if boxes is None:
+        return gdf
+    if boxes:
+        hits = np.unique(np.concatenate([gdf.sindex.query(box(*b)) for b in boxes]))
+    else:
+        hits = np.empty(0, dtype=np.intp)
+    if len(hits) == len(gdf):
+        return gdf
+    logger.debug("Culling: %d von %d Features außerhalb des Ausschnitts", len(gdf) - len(hits), len(gdf))
+    return gdf.iloc[hits]
+
+
+def viewport_rect(bbox: tuple, rand: float = 0.0) -> Bounds:
+    """Kartenausschnitt bbox (xmin, xmax, ymin, ymax) plus rand als (minx, miny, maxx, maxy)."""
+    xmin, xmax, ymin, ymax = bbox
+    return xmin - rand, ymin - rand, xmax + rand, ymax + rand
+
+
+def _lage(geoms: np.ndarray, rect: Bounds) -> Tuple[np.ndarray, np.ndarray]:
+    """Masken (innen, außen) der Geometrien relativ zu rect, nach ihren Bounding Boxes."""
+    minx, miny, maxx, maxy = rect
+    b = shapely.bounds(geoms)
+    leer = np.isnan(b[:, 0])  # leere und fehlende Geometrien
+    with np.errstate(invalid="ignore"):
+        innen = (b[:, 0] >= minx) & (b[:, 1] >= miny) & (b[:, 2] <= maxx) & (b[:, 3] <= maxy)
+        aussen = (b[:, 0] > maxx) | (b[:, 1] > maxy) | (b[:, 2] < minx) | (b[:, 3] < miny)
+    return innen | leer, aussen & ~leer
+
+
+def cull_to_viewport(gdf: gpd.GeoDataFrame, rect: Bounds) -> gpd.GeoDataFrame:
+    """
+    Entfernt (bereits projizierte) Features, die rect (viewport_rect)
+    nicht berühren, ohne die übrigen zu verändern. Unverändertes gdf,
+    wenn nichts außerhalb liegt.
+    """
+    if gdf.empty:
+        return gdf
+    _, aussen = _lage(np.asarray(gdf.geometry.array), rect)
+    if not aussen.any():
+        return gdf
+    return gdf.iloc[np.flatnonzero(~aussen)]
+
+
+def clip_geometries(geoms: np.ndarray, rect: Bounds) -> np.ndarray:
+    """
+    Schneidet Geometrien auf rect (minx, miny, maxx, maxy) zu: vollständig
+    enthaltene bleiben unverändert (dasselbe Array, wenn alle enthalten
+    sind), angeschnittene werden mit clip_by_rect beschnitten, vollständig
+    außerhalb liegende werden leer.
+    """
+    minx, miny, maxx, maxy = rect
+    innen, _ = _lage(geoms, rect)
+    if innen.all():
+        return geoms
+    geoms = geoms.copy()
+    geoms[~innen] = shapely.clip_by_rect(geoms[~innen], minx, miny, maxx, maxy)
+    return geoms
+
+
+def clip_to_viewport(gdf: gpd.GeoDataFrame, rect: Bounds) -> gpd.GeoDataFrame:
+    """
+    Gegenstück zu cull_to_extent für bereits projizierte Geometrien:
+    schneidet gdf auf rect (viewport_rect, Ziel-CRS) zu, damit Stützpunkte
+    weit außerhalb der Karte weder gerastert noch ins SVG geschrieben
+    werden. Features außerhalb entfallen; unverändertes gdf, wenn alles
+    im Ausschnitt liegt.
+    """
+    if gdf.empty:
+        return gdf
+    geoms = np.asarray(gdf.geometry.array)
+    geclippt = clip_geometries(geoms, rect)
+    if geclippt is geoms:
+        return gdf
+    valid = ~(shapely.is_missing(geclippt) | shapely.is_empty(geclippt))
+    logger.debug("Zuschnitt: %d von %d Features außerhalb des Ausschnitts", (~valid).sum(), len(gdf))
+    result = gdf.set_geometry(gpd.GeoSeries(geclippt, index=gdf.index, crs=gdf.crs))
+    if not valid.all():
+        result = result[valid]
+    return result
@@ -0,0 +1,269 @@
+# data_processing/geostore.py
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import CRS
+
+from io_utils import list_layers, quelle, read_layer
+
+logger = logging.getLogger("mymaptool.geostore")
+
+# Bei Änderungen am Dateiformat erhöhen – ältere Einträge gelten dann als veraltet
+STORE_FORMAT = 1
+
+# Multi-Typ → zugehöriger einteiliger Typ (shapely.GeometryType)
+_EINTEILIG = {
+    int(shapely.GeometryType.MULTIPOINT): int(shapely.GeometryType.POINT),
+    int(shapely.GeometryType.MULTILINESTRING): int(shapely.GeometryType.LINESTRING),
+    int(shapely.GeometryType.MULTIPOLYGON): int(shapely.GeometryType.POLYGON),
+}
+
+
+class GeoStore:
+    """
+    Kompilierte Geometrien ("compile"): je Layer ein Verzeichnis mit
+      coords.npy            flache Koordinaten (N × 2, float64)
+      offsets_K.npy         Teil-/Ring-Offsets (shapely.to_ragged_array)
+      fehlt.npy, einzeln.npy  Masken für leere bzw. einteilige Geometrien
+      meta.json             Herkunft (Pfad, Layer, mtime), CRS, Typ,
+                            Attributtabelle (kleine Spalten, z. B. NAME_1)
+    Gelesen wird per Memory-Map; die Geometrien entstehen vektorisiert
+    über shapely.from_ragged_array statt über WKB-Parsing je Feature.
+    Mehrere Prozesse teilen sich die Seiten im Page-Cache.
+    Einträge, deren GPKG sich seitdem geändert hat, werden ignoriert.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Optional[dict]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: dict, base_dir: str) -> Optional["GeoStore"]:
+        """Erzeugt den Store aus config["kompiliert"], None wenn deaktiviert."""
+        cfg = config.get("kompiliert", {})
+        if not cfg.get("aktiv", True):
+            return None
+        directory = cfg.get("verzeichnis", "compiled")
+        if not os.path.isabs(directory):
+            directory = os.path.join(base_dir, directory)
+        return cls(directory)
+
+    def _entry_dir(self, path: str, layer: str) -> str:
+        path = os.path.abspath(path)
+        digest = hashlib.sha1(f"{path}\0{layer}".encode("utf-8")).hexdigest()[:12]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.directory, f"{stem}_{layer}_{digest}")
+
+    def _read_meta(self, path: str, layer: str) -> Optional[dict]:
+        """meta.json eines Eintrags, sofern vorhanden und aktuell (mtime der Quelle)."""
+        entry = self._entry_dir(path, layer)
+        with self._lock:
+            if entry in self._meta:
+                meta = self._meta[entry]
+            else:
+                try:
+                    with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = None
+                self._meta[entry] = meta
+        if meta is None or meta.get("format") != STORE_FORMAT:
+            return None
+        try:
+            if meta["quelle"] != quelle(path, layer):
+                logger.warning(
+                    f"Kompilierter Layer {layer} aus {os.path.basename(path)} ist veraltet "
+                    f"– bitte 'compile' erneut ausführen."
+                )
+                return None
+        except OSError:
+            return None
+        return meta
+
+    def covers(self, path: str, layer: str, columns: Optional[List[str]]) -> bool:
+        """
+        Ob der Layer aktuell kompiliert vorliegt und die gewünschten Spalten
+        enthält. columns=None (alle Spalten) nur, wenn mit allen kompiliert.
+        """
+        meta = self._read_meta(path, layer)
+        if meta is None:
+            return False
+        if columns is None:
+            return meta.get("alle_spalten", False)
+        # Spalten, die schon der GPKG-Layer nicht hat, fehlen auch beim Lesen
+        return set(columns) <= set(meta["spalten"]) | set(meta["ohne"])
+
+    def load(self, path: str, layer: str, columns: Optional[List[str]] = None, geometry: bool = True):
+        """
+        Layer aus dem Store (wie io_utils.read_layer, ohne bbox/where) oder
+        None, wenn er nicht (aktuell) kompiliert ist bzw. Spalten fehlen.
+        """
+        if not self.covers(path, layer, columns):
+            with self._lock:
+                self.misses += 1
+            return None
+        meta = self._read_meta(path, layer)
+        entry = self._entry_dir(path, layer)
+        cols = meta["spalten"] if columns is None else [c for c in meta["spalten"] if c in columns]
+        data = {
+            c: pd.Series(meta["attribute"][c], dtype=meta["dtypes"][c]) for c in cols
+        }
+        df = pd.DataFrame(data, index=pd.RangeIndex(meta["zeilen"]))
+
+        if geometry:
+            coords = np.load(os.path.join(entry, "coords.npy"), mmap_mode="r")
+            offsets = tuple(
+                np.load(os.path.join(entry, f"offsets_{k}.npy"), mmap_mode="r")
+                for k in range(meta["offsets"])
+            )
+            geoms = shapely.from_ragged_array(shapely.GeometryType(meta["typ"]), coords, offsets)
+            einzeln = np.load(os.path.join(entry, "einzeln.npy"))
+            if einzeln.any():
+                geoms[einzeln] = shapely.get_geometry(geoms[einzeln], 0)
+            fehlt = np.load(os.path.join(entry, "fehlt.npy"))
+            if fehlt.any():
+                geoms[fehlt] = None
+            df = gpd.GeoDataFrame(
+                df, geometry=gpd.GeoSeries(geoms, index=df.index), crs=CRS.from_wkt(meta["crs"])
+            )
+            if meta["geometriespalte"] != "geometry":
+                df = df.rename_geometry(meta["geometriespalte"])
+        with self._lock:
+            self.hits += 1
+        logger.debug("Layer %s aus %s: kompiliert geladen", layer, os.path.basename(path))
+        return df
+
+    def compile_layer(self, path: str, layer: str, columns: Optional[List[str]]) -> Optional[int]:
+        """
+        Schreibt einen Layer in den Store (atomar über ein temporäres
+        Verzeichnis). columns: zu übernehmende Attributspalten.
+        Rückgabe: Größe in Bytes, None wenn der Geometrietyp nicht passt.
+        """
+        gdf = read_layer(path, layer, columns=columns)
+        geoms = np.asarray(gdf.geometry.array)
+        fehlt = shapely.is_missing(geoms)
+        try:
+            typ, coords, offsets = shapely.to_ragged_array(geoms)
+        except ValueError as e:
+            logger.warning(f"Layer {layer} aus {os.path.basename(path)} nicht kompilierbar: {e}")
+            return None
+        # Gemischte Layer (z. B. Polygon/MultiPolygon) liegen im ragged array
+        # als Multi-Typ vor; einteilige Geometrien werden beim Laden zurückgewandelt
+        einzeln = np.zeros(len(geoms), dtype=bool)
+        if int(typ) in _EINTEILIG:
+            einzeln[~fehlt] = shapely.get_type_id(geoms[~fehlt]) == _EINTEILIG[int(typ)]
+
+        entry = self._entry_dir(path, layer)
+        tmp = f"{entry}.{os.getpid()}-{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "coords.npy"), np.ascontiguousarray(coords, dtype=np.float64))
+        for k, off in enumerate(offsets):
+            np.save(os.path.join(tmp, f"offsets_{k}.npy"), np.ascontiguousarray(off))
+        np.save(os.path.join(tmp, "einzeln.npy"), einzeln)
+        np.save(os.path.join(tmp, "fehlt.npy"), fehlt)
+
+        spalten = [c for c in gdf.columns if c != gdf.geometry.name]
+        meta = {
+            "format": STORE_FORMAT,
+            "quelle": quelle(path, layer),
+            "zeilen": len(gdf),
+            "typ": int(typ),
+            "offsets": len(offsets),
+            "crs": gdf.crs.to_wkt() if gdf.crs is not None else None,
+            "geometriespalte": gdf.geometry.name,
+            "spalten": spalten,
+            "ohne": sorted(set(columns or []) - set(spalten)),
+            "alle_spalten": columns is None,
+            "dtypes": {c: str(gdf[c].dtype) for c in spalten},
+            "attribute": {c: gdf[c].astype(object).where(gdf[c].notna(), None).tolist() for c in spalten},
+        }
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        with self._lock:
+            self._meta.pop(entry, None)
+        return sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+
+    def clear(self) -> int:
+        """Löscht den Store. Rückgabe: Anzahl entfernter Layer."""
+        if not os.path.isdir(self.directory):
+            return 0
+        anzahl = len(os.listdir(self.directory))
+        shutil.rmtree(self.directory)
+        with self._lock:
+            self._meta.clear()
+        return anzahl
+
+
+def compile_all(
+    store: GeoStore,
+    hauptland_dir: str,
+    nebenlaender_dir: str,
+    nebenlayer_name: str,
+    columns: List[str],
+) -> Dict[str, int]:
+    """
+    Kompiliert alle Layer der Hauptland-GPKG (Spalten columns) und den
+    Layer nebenlayer_name aller Nebenländer (nur Geometrie).
+    Rückgabe: {"layer": Anzahl, "bytes": Gesamtgröße}.
+    """
+    from io_utils import find_haupt_gpkg
+
+    aufgaben = []
+    haupt_path = find_haupt_gpkg(hauptland_dir)
+    aufgaben += [(haupt_path, layer, columns) for layer in list_layers(haupt_path)]
+    aufgaben += [
+        (os.path.join(nebenlaender_dir, fname), nebenlayer_name, [])
+        for fname in sorted(os.listdir(nebenlaender_dir))
+        if fname.endswith(".gpkg")
+    ]
+
+    os.makedirs(store.directory, exist_ok=True)
+    stats = {"layer": 0, "bytes": 0}
+    for path, layer, cols in aufgaben:
+        size = store.compile_layer(path, layer, cols)
+        if size is None:
+            continue
+        stats["layer"] += 1
+        stats["bytes"] += size
+        logger.info(f"Kompiliert: {os.path.basename(path)} / {layer} ({size / 1e6:.1f} MB)")
+    return stats
+
+
+def preproject(config: dict, haupt_path: str, reproj_cache) -> int:
+    """
+    Legt die Reprojektionen des Hauptlands (Layer und Ausblendungen aus
+    der Konfiguration) für alle CRS aus config["regionen"] im
+    Reprojektions-Cache ab. Rückgabe: Anzahl CRS.
+    """
+    from data_processing.crs import reproject
+    from data_processing.layers import merge_hauptland_layers, filter_ausgeblendet
+    from styling import attribut_spalten
+
+    gdf_haupt = merge_hauptland_layers(haupt_path, config.get("hauptland", []), attribut_spalten(config))
+    gdf_haupt, _ = filter_ausgeblendet(gdf_haupt, config.get("ausblenden", {}))
+    crs_set = sorted({crs for crs_list in config.get("regionen", {}).values() for crs in crs_list})
+    for crs in crs_set:
+        try:
+            reproject(gdf_haupt, crs, cache=reproj_cache)
+        except Exception as e:
+            logger.warning(f"Vorprojektion nach {crs} fehlgeschlagen: {e}")
+            continue
+        logger.info(f"Vorprojiziert: {crs}")
+    return len(crs_set)
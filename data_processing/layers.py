@@ -3,16 +3,65 @@
 import pandas as pd
 import geopandas as gpd
 
+from io_utils import quelle, ATTRIBUT_SPALTEN
+from layer_store import get_store
 from ausblenden import select_ausblendbereiche
 from highlight_selector import select_highlight_regions
 
+# Spalten, die im kompakten Modus als Kategorie gespeichert werden (wenige
+# verschiedene Werte, auf ADM_2-Ebene vielfach wiederholt)
+KATEGORIE_SPALTEN = ["NAME_1"]
+
+
 def merge_hauptland_layers(
     gpkg_path: str,
-    layers: list[str]
+    layers: list[str],
+    columns: list[str] = ATTRIBUT_SPALTEN,
+    kompakt: bool = False,
 ) -> gpd.GeoDataFrame:
-    """Alle angegebenen Layers einlesen und vereinen."""
-    gdfs = [gpd.read_file(gpkg_path, layer=layer) for layer in layers]
-    return pd.concat(gdfs, ignore_index=True)
+    """
+    Alle angegebenen Layers (über den Layer-Store) einlesen und vereinen.
+    Gelesen werden nur columns plus Geometrie (None = alle Spalten).
+    kompakt=True (config["daten"]["kompakt"]): KATEGORIE_SPALTEN als
+    Kategorie, und die Einträge im Layer-Store werden danach freigegeben –
+    die Geometrien hält dann nur noch das Ergebnis.
+    """
+    store = get_store()
+    gdfs = [store.get(gpkg_path, layer, columns=columns) for layer in layers]
+    merged = pd.concat(gdfs, ignore_index=True)
+    del gdfs
+    if kompakt:
+        for spalte in KATEGORIE_SPALTEN:
+            if spalte in merged.columns:
+                merged[spalte] = merged[spalte].astype("category")
+        for layer in layers:
+            store.release(gpkg_path, layer)
+    # Herkunft für den Reprojektions-Cache
+    merged.attrs["quellen"] = [quelle(gpkg_path, layer) for layer in layers]
+    return merged
+
+
+def filter_ausgeblendet(
+    gdf: gpd.GeoDataFrame,
+    aus_cfg: dict
+) -> tuple[gpd.GeoDataFrame, set[str]]:
+    """
+    Entfernt alle NAME_1-Werte aus aus_cfg["bereiche"] (falls aktiv)
+    und gibt (gefiltertes GeoDataFrame, ausgeblendete Namen) zurück.
+    """
+    if not aus_cfg or not aus_cfg.get("aktiv"):
+        return gdf, set()
+
+    # Set ausgeblendeter NAME_1-Werte
+    verboten = set()
+    for names in aus_cfg.get("bereiche", {}).values():
+        verboten.update(names)
+
+    # GeoDataFrame filtern; ohne Treffer bleibt es ungefiltert (keine Kopie)
+    behalten = ~gdf["NAME_1"].isin(verboten).to_numpy()
+    if behalten.all():
+        return gdf, verboten
+    return gdf[behalten], verboten
 
 
 def apply_ausblenden(
@@ -29,17 +78,7 @@ def apply_ausblenden(
         return gdf, set()
 
     aus_cfg = select_ausblendbereiche(gpkg_path, verwendete_layers)
-    if not aus_cfg["aktiv"]:
-        return gdf, set()
-
-    # Set ausgeblendeter NAME_1-Werte
-    verboten = set()
-    for names in aus_cfg["bereiche"].values():
-        verboten.update(names)
-
-    # GeoDataFrame filtern
-    gdf_filtered = gdf[~gdf["NAME_1"].isin(verboten)]
-    return gdf_filtered, verboten
+    return filter_ausgeblendet(gdf, aus_cfg)
 
 
 def select_highlights(
@@ -60,4 +99,4 @@ def select_highlights(
         gpkg_path,
         config,
         verbotene_namen=verbotene_namen
-    )
\ No newline at end of file
+    )
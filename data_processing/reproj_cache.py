@@ -0,0 +1,204 @@
+# data_processing/reproj_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import geopandas as gpd
+
+logger = logging.getLogger("mymaptool.reproj_cache")
+
+try:
+    import pyarrow  # noqa: F401  (nur für GeoParquet nötig)
+    _FORMAT = "parquet"
+except ImportError:
+    _FORMAT = "pickle"
+
+
+def cache_key(gdf: gpd.GeoDataFrame, target_crs: str, variante: str = "") -> Optional[str]:
+    """
+    Inhaltsadresse einer Reprojektion: Herkunft (gdf.attrs["quellen"]),
+    Zeilen (Index-Hash), Spalten, Variante und Ziel-CRS.
+    None, wenn die Herkunft unbekannt ist.
+    """
+    quellen = gdf.attrs.get("quellen")
+    if not quellen:
+        return None
+    h = hashlib.sha256()
+    h.update(json.dumps(
+        [quellen, str(target_crs), variante, _FORMAT, [str(c) for c in gdf.columns]]
+    ).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(gdf.index, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class ReprojCache:
+    """
+    Persistenter Cache für reprojizierte GeoDataFrames.
+
+    Schlüssel: Quelldateien + Layer + mtime (aus gdf.attrs["quellen"]),
+    die enthaltenen Zeilen (Index-Hash) und Spalten, eine optionale Variante
+    (z. B. Vereinfachungsstufe) und das Ziel-CRS. Gespeichert wird als
+    GeoParquet (Fallback ohne pyarrow: Pickle). Bei Überschreiten von
+    max_bytes werden die am längsten nicht benutzten Einträge gelöscht.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: dict, base_dir: str) -> Optional["ReprojCache"]:
+        """Erzeugt den Cache aus config["cache"], None wenn deaktiviert."""
+        cache_cfg = config.get("cache", {})
+        if not cache_cfg.get("aktiv", True):
+            return None
+        directory = Path(cache_cfg.get("verzeichnis", "cache"))
+        if not directory.is_absolute():
+            directory = Path(base_dir) / directory
+        max_bytes = int(cache_cfg.get("max_mb", 1024)) * 1024 * 1024
+        return cls(directory / "reproj", max_bytes)
+
+    def key(self, gdf: gpd.GeoDataFrame, target_crs: str, variante: str = "") -> Optional[str]:
+        """Inhaltsadresse des Eintrags oder None, wenn die Herkunft unbekannt ist."""
+        return cache_key(gdf, target_crs, variante)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.{_FORMAT}"
+
+    def get(self, key: str) -> Optional[gpd.GeoDataFrame]:
+        path = self._path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            if _FORMAT == "parquet":
+                gdf = gpd.read_parquet(path)
+            else:
+                gdf = pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Cache-Eintrag {path.name} unlesbar, wird verworfen: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        # LRU: Zugriff als mtime vermerken
+        os.utime(path)
+        self.hits += 1
+        return gdf
+
+    def put(self, key: str, gdf: gpd.GeoDataFrame):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            if _FORMAT == "parquet":
+                gdf.to_parquet(tmp)
+            else:
+                gdf.to_pickle(tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"Cache-Eintrag konnte nicht geschrieben werden: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def entries(self) -> list[os.DirEntry]:
+        if not self.directory.exists():
+            return []
+        return [e for e in os.scandir(self.directory) if e.is_file()]
+
+    def evict(self):
+        """Löscht die ältesten Einträge, bis die Größengrenze eingehalten ist."""
+        entries = sorted(self.entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        while entries and total > self.max_bytes:
+            oldest = entries.pop(0)
+            total -= oldest.stat().st_size
+            Path(oldest.path).unlink(missing_ok=True)
+            logger.debug("Cache-Eintrag verdrängt: %s", oldest.name)
+
+    def clear(self) -> int:
+        """Leert den Cache, gibt die Anzahl gelöschter Dateien zurück."""
+        entries = self.entries()
+        for e in entries:
+            Path(e.path).unlink(missing_ok=True)
+        return len(entries)
+
+    def size_bytes(self) -> int:
+        return sum(e.stat().st_size for e in self.entries())
+
+
+class MemoryReprojCache:
+    """
+    Reprojektionen im Arbeitsspeicher für langlebige Prozesse (Render-Dienst),
+    optional vor einen persistenten ReprojCache geschaltet. Gleiche Schnitt-
+    stelle wie ReprojCache (key/get/put), threadsicher. Überschreitet die
+    geschätzte Größe max_bytes, fallen die am längsten nicht benutzten
+    Einträge heraus. Einträge sind geteilt und dürfen nicht verändert werden.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, backend: Optional[ReprojCache] = None):
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._data: "OrderedDict[str, gpd.GeoDataFrame]" = OrderedDict()
+        self._bytes: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, gdf: gpd.GeoDataFrame, target_crs: str, variante: str = "") -> Optional[str]:
+        return cache_key(gdf, target_crs, variante)
+
+    def get(self, key: str) -> Optional[gpd.GeoDataFrame]:
+        with self._lock:
+            gdf = self._data.get(key)
+            if gdf is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return gdf
+        gdf = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if gdf is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, gdf)
+        return gdf
+
+    def put(self, key: str, gdf: gpd.GeoDataFrame):
+        self._remember(key, gdf)
+        if self.backend is not None:
+            self.backend.put(key, gdf)
+
+    def _remember(self, key: str, gdf: gpd.GeoDataFrame):
+        from layer_store import estimate_bytes
+        size = estimate_bytes(gdf)
+        with self._lock:
+            self._data[key] = gdf
+            self._data.move_to_end(key)
+            self._bytes[key] = size
+            while len(self._data) > 1 and sum(self._bytes.values()) > self.max_bytes:
+                old, _ = self._data.popitem(last=False)
+                self._bytes.pop(old, None)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(self._bytes.values())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self._bytes.clear()
+        return n
@@ -0,0 +1,169 @@
+# data_processing/simplify.py
+
+import logging
+import weakref
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import shapely
+import geopandas as gpd
+
+from data_processing.culling import viewport_bounds
+
+logger = logging.getLogger("mymaptool.simplify")
+
+_POLYGONAL = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+
+
+def map_units_per_pixel(bbox: tuple, width_px: int, height_px: int) -> float:
+    """Kartenausschnitt (xmin, xmax, ymin, ymax) → Karteneinheiten je Pixel."""
+    xmin, xmax, ymin, ymax = bbox
+    return min((xmax - xmin) / width_px, (ymax - ymin) / height_px)
+
+
+def drop_small_parts(geoms: np.ndarray, min_area: float) -> np.ndarray:
+    """
+    Entfernt Polygonteile (z. B. Inselchen) mit Fläche < min_area.
+    Features, von denen nichts übrig bleibt, werden zu None.
+    """
+    polygonal = np.isin(shapely.get_type_id(geoms), _POLYGONAL)
+    if min_area <= 0 or not polygonal.any():
+        return geoms
+
+    poly_idx = np.flatnonzero(polygonal)
+    parts, part_owner = shapely.get_parts(geoms[poly_idx], return_index=True)
+    keep = shapely.area(parts) >= min_area
+    if keep.all():
+        return geoms
+
+    n_parts = np.bincount(part_owner, minlength=len(poly_idx))
+    n_keep = np.bincount(part_owner[keep], minlength=len(poly_idx))
+    changed = n_keep < n_parts
+
+    out = geoms.copy()
+    out[poly_idx[changed & (n_keep == 0)]] = None
+    rebuild = changed & (n_keep > 0)
+    if rebuild.any():
+        sel = keep & rebuild[part_owner]
+        # indices müssen lückenlos und aufsteigend sein → neu durchnummerieren
+        owners = np.unique(part_owner[sel])
+        dense = np.searchsorted(owners, part_owner[sel])
+        out[poly_idx[owners]] = shapely.multipolygons(parts[sel], indices=dense)
+    return out
+
+
+def simplify_for_output(
+    gdf: gpd.GeoDataFrame,
+    units_per_px: float,
+    toleranz_px: float = 0.5,
+    min_flaeche_px: float = 0.25,
+) -> gpd.GeoDataFrame:
+    """
+    Vereinfacht (bereits projizierte) Geometrien mit einer Toleranz von
+    toleranz_px Pixeln und verwirft Teile kleiner als min_flaeche_px Pixel².
+    Der Index bleibt erhalten, leere Features fallen weg.
+    """
+    if gdf.empty or units_per_px <= 0:
+        return gdf
+
+    geoms = np.asarray(gdf.geometry.array)
+    geoms = shapely.simplify(geoms, units_per_px * toleranz_px, preserve_topology=True)
+    geoms = drop_small_parts(geoms, min_flaeche_px * units_per_px ** 2)
+
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    result = gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs))
+    if not valid.all():
+        result = result[valid]
+    return result
+
+
+class LODPyramid:
+    """
+    Vorberechnete Vereinfachungsstufen eines Layers im Quell-CRS.
+    Stufe 0 ist das Original, Stufe k hat die Toleranz basis * 4**(k-1),
+    wobei basis = größte Ausdehnung des Layers / 65536; Segmente werden
+    danach auf höchstens 64 × Toleranz unterteilt. Stufen werden beim
+    ersten Zugriff erzeugt und danach wiederverwendet.
+    """
+
+    def __init__(self, gdf: gpd.GeoDataFrame, stufen: int = 5):
+        minx, miny, maxx, maxy = gdf.total_bounds
+        self.basis = max(maxx - minx, maxy - miny) / 65536
+        self.stufen = stufen
+        self._source = weakref.ref(gdf)
+        self._levels: Dict[int, gpd.GeoDataFrame] = {}
+
+    def tolerance(self, stufe: int) -> float:
+        return 0.0 if stufe == 0 else self.basis * 4 ** (stufe - 1)
+
+    def choose(self, max_tolerance: float) -> int:
+        """Gröbste Stufe, deren Toleranz max_tolerance nicht überschreitet."""
+        stufe = 0
+        for k in range(1, self.stufen):
+            if self.tolerance(k) <= max_tolerance:
+                stufe = k
+        return stufe
+
+    def level(self, stufe: int) -> Optional[gpd.GeoDataFrame]:
+        source = self._source()
+        if source is None:
+            return None
+        if stufe == 0:
+            return source
+        if stufe not in self._levels:
+            tol = self.tolerance(stufe)
+            geoms = shapely.simplify(
+                np.asarray(source.geometry.array), tol, preserve_topology=True
+            )
+            # lange Segmente wieder unterteilen, damit sie nach einer
+            # nichtlinearen Projektion der gekrümmten Originallinie folgen
+            geoms = shapely.segmentize(geoms, tol * 64)
+            level = source.set_geometry(gpd.GeoSeries(geoms, index=source.index, crs=source.crs))
+            level.attrs["lod"] = stufe
+            self._levels[stufe] = level
+        return self._levels[stufe]
+
+
+# Pyramiden je Quell-GeoDataFrame (über id, solange das Objekt lebt)
+_PYRAMIDEN: Dict[int, Tuple[weakref.ref, LODPyramid]] = {}
+
+
+def get_pyramid(gdf: gpd.GeoDataFrame, stufen: int = 5) -> LODPyramid:
+    entry = _PYRAMIDEN.get(id(gdf))
+    if entry is not None and entry[0]() is gdf:
+        return entry[1]
+    pyramid = LODPyramid(gdf, stufen)
+    key = id(gdf)
+    _PYRAMIDEN[key] = (weakref.ref(gdf, lambda _ref: _PYRAMIDEN.pop(key, None)), pyramid)
+    return pyramid
+
+
+def select_lod(
+    gdf: gpd.GeoDataFrame,
+    bbox: tuple,
+    target_crs,
+    width_px: int,
+    height_px: int,
+    toleranz_px: float = 0.5,
+    stufen: int = 5,
+) -> gpd.GeoDataFrame:
+    """
+    Wählt für gdf (Quell-CRS) die gröbste Pyramidenstufe, die bei der
+    Ausgabeauflösung noch unter toleranz_px Pixel bleibt.
+    """
+    if gdf.empty or gdf.crs is None:
+        return gdf
+    boxes = viewport_bounds(bbox, target_crs, gdf.crs)
+    if not boxes:
+        return gdf
+
+    minx = min(b[0] for b in boxes)
+    miny = min(b[1] for b in boxes)
+    maxx = max(b[2] for b in boxes)
+    maxy = max(b[3] for b in boxes)
+    src_units_per_px = min((maxx - minx) / width_px, (maxy - miny) / height_px)
+
+    pyramid = get_pyramid(gdf, stufen)
+    stufe = pyramid.choose(src_units_per_px * toleranz_px)
+    level = pyramid.level(stufe)
+    return gdf if level is None else level
@@ -0,0 +1,308 @@
+# data_processing/topology.py
+
+import logging
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+import geopandas as gpd
+
+from data_processing.crs_registry import get_crs, get_transformer
+from data_processing.culling import Bounds, clip_geometries
+from data_processing.simplify import drop_small_parts
+
+logger = logging.getLogger("mymaptool.topology")
+
+_POLYGONAL = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+
+
+class Topology:
+    """
+    Gemeinsame Kanten eines Polygon-Layers (wie bei TopoJSON): jede Grenze
+    zwischen zwei Knoten (Punkte, an denen sich mehr als zwei Kanten
+    treffen) ist genau ein Kantenzug ("Arc"), auch wenn sie zu mehreren
+    Features gehört (benachbarte Regionen, Außengrenze von ADM_0 und ADM_1).
+      arcs            Koordinaten je Arc (k × 2, Quell-CRS)
+      ringe           je Ring: Liste von (Arc, umgekehrt)
+      ring_polygon    Polygon je Ring (erster Ring eines Polygons = Außenring)
+      polygon_feature Zeilenposition im Quell-GeoDataFrame je Polygon
+      arc_features    je Arc die Zeilenpositionen der angrenzenden Features
+    Ringe werden aus den (vereinfachten) Arcs wieder zusammengesetzt, so
+    bleiben Füllungen und Grenzen nach der Vereinfachung deckungsgleich.
+    """
+
+    def __init__(self, arcs, ringe, ring_polygon, polygon_feature, arc_features, n_features, crs):
+        self.arcs: List[np.ndarray] = arcs
+        self.ringe: List[List[Tuple[int, bool]]] = ringe
+        self.ring_polygon = ring_polygon
+        self.polygon_feature = polygon_feature
+        self.arc_features: List[np.ndarray] = arc_features
+        self.n_features = n_features
+        self.crs = crs
+        # projizierte Arcs nur für das zuletzt verwendete CRS (die Karten
+        # eines CRS folgen aufeinander)
+        self._projiziert: Tuple[Optional[str], List[np.ndarray]] = (None, [])
+
+    def projected_arcs(self, target_crs) -> List[np.ndarray]:
+        """Arcs im Ziel-CRS (für aufeinanderfolgende Karten eines CRS einmal berechnet)."""
+        if self.crs is None or target_crs is None:
+            return self.arcs
+        key = str(target_crs)
+        # Schlüssel und Arcs als ein Tupel lesen und schreiben: der Render-
+        # Dienst nutzt dieselbe Topology aus mehreren Threads, auch für
+        # verschiedene CRS gleichzeitig
+        gespeichert_key, arcs = self._projiziert
+        if gespeichert_key == key:
+            return arcs
+        target = get_crs(target_crs)
+        if self.crs.is_exact_same(target) or not self.arcs:
+            arcs = self.arcs
+        else:
+            laengen = [len(a) for a in self.arcs]
+            coords = np.concatenate(self.arcs)
+            x, y = get_transformer(self.crs, target).transform(coords[:, 0], coords[:, 1])
+            arcs = np.split(np.column_stack([x, y]), np.cumsum(laengen)[:-1])
+        self._projiziert = (key, arcs)
+        return arcs
+
+    def simplified_arcs(self, target_crs, toleranz: float) -> List[np.ndarray]:
+        """Projizierte Arcs, mit toleranz (Karteneinheiten) vereinfacht; Endpunkte bleiben."""
+        arcs = self.projected_arcs(target_crs)
+        if toleranz <= 0 or not arcs:
+            return arcs
+        laengen = np.array([len(a) for a in arcs])
+        lines = shapely.linestrings(np.concatenate(arcs), indices=np.repeat(np.arange(len(arcs)), laengen))
+        lines = shapely.simplify(lines, toleranz, preserve_topology=False)
+        coords, index = shapely.get_coordinates(lines, return_index=True)
+        return np.split(coords, np.flatnonzero(np.diff(index)) + 1)
+
+    def polygons(self, arcs: List[np.ndarray]) -> np.ndarray:
+        """
+        Geometrie je Feature aus den Arcs (None für Features ohne Fläche).
+        Ringe, die zu weniger als drei Punkten zusammenfallen, entfallen,
+        mit einem Außenring auch dessen Löcher.
+        """
+        ring_coords: List[Optional[np.ndarray]] = []
+        for refs in self.ringe:
+            teile = [arcs[a][::-1] if umgekehrt else arcs[a] for a, umgekehrt in refs]
+            ring = np.concatenate([t[:-1] for t in teile] + [teile[0][:1]])
+            ring_coords.append(ring if len(ring) >= 4 else None)
+
+        # Polygone je Feature sammeln (Außenring zuerst, dann Löcher)
+        polygone: Dict[int, List[List[np.ndarray]]] = {}
+        vorheriges = -1
+        for ring, poly in zip(ring_coords, self.ring_polygon.tolist()):
+            aussenring = poly != vorheriges
+            vorheriges = poly
+            if aussenring:
+                teile = polygone.setdefault(int(self.polygon_feature[poly]), [])
+                if ring is not None:
+                    teile.append([ring])
+                aktuell = teile[-1] if ring is not None else None
+            elif ring is not None and aktuell is not None:
+                aktuell.append(ring)
+
+        geoms = np.full(self.n_features, None, dtype=object)
+        for feature, polys in polygone.items():
+            if not polys:
+                continue
+            teile = [shapely.Polygon(p[0], p[1:]) for p in polys]
+            geoms[feature] = teile[0] if len(teile) == 1 else shapely.MultiPolygon(teile)
+        return geoms
+
+
+def build_topology(gdf: gpd.GeoDataFrame) -> Optional[Topology]:
+    """Topologie eines Polygon-Layers (gemeinsame Punkte müssen exakt übereinstimmen)."""
+    geoms = np.asarray(gdf.geometry.array, dtype=object)
+    keep = np.isin(shapely.get_type_id(geoms), _POLYGONAL) & ~shapely.is_empty(geoms)
+    keep_idx = np.flatnonzero(keep)
+    if len(keep_idx) == 0:
+        return None
+
+    typ, coords, offsets = shapely.to_ragged_array(geoms[keep], include_z=False)
+    ring_off, poly_off = offsets[0], offsets[1]
+    if typ == shapely.GeometryType.MULTIPOLYGON:
+        polygon_feature = keep_idx[np.repeat(np.arange(len(offsets[2]) - 1), np.diff(offsets[2]))]
+    else:
+        polygon_feature = keep_idx
+    ring_polygon = np.repeat(np.arange(len(poly_off) - 1), np.diff(poly_off))
+
+    # offene Ringe (ohne wiederholten Schlusspunkt) und Punkt-Ids
+    starts, ends = ring_off[:-1], ring_off[1:] - 1
+    n_ring = ends - starts
+    gueltig = n_ring >= 3
+    ring_von = np.repeat(np.arange(len(starts)), np.where(gueltig, n_ring, 0))
+    pos = np.arange(len(ring_von)) - np.repeat(np.cumsum(np.where(gueltig, n_ring, 0)) - np.where(gueltig, n_ring, 0),
+                                               np.where(gueltig, n_ring, 0))
+    offen = coords[starts[ring_von] + pos]
+    _, punkt = np.unique(offen, axis=0, return_inverse=True)
+    punkt = punkt.ravel()
+
+    # Kanten (ungerichtet) und Grad je Punkt: Knoten haben Grad ≠ 2
+    naechster = np.arange(len(punkt)) + 1
+    ring_ende = np.cumsum(np.where(gueltig, n_ring, 0))[gueltig] - 1
+    ring_anfang = ring_ende - n_ring[gueltig] + 1
+    naechster[ring_ende] = ring_anfang
+    kanten = np.sort(np.column_stack([punkt, punkt[naechster]]), axis=1)
+    kanten = np.unique(kanten, axis=0)
+    grad = np.bincount(kanten.ravel(), minlength=punkt.max() + 1 if len(punkt) else 0)
+    knoten = grad[punkt] != 2
+    punkte = np.zeros((grad.size, 2))
+    punkte[punkt] = offen
+
+    arcs: List[np.ndarray] = []
+    arc_features: List[set] = []
+    schluessel: Dict[bytes, int] = {}
+    ringe: List[List[Tuple[int, bool]]] = []
+    ring_polygon_gueltig = []
+    for r, a, e in zip(np.flatnonzero(gueltig), ring_anfang, ring_ende + 1):
+        ids = punkt[a:e]
+        k = np.flatnonzero(knoten[a:e])
+        if len(k) == 0:
+            # Ring ohne Knoten (Insel): Start beim kleinsten Punkt, damit
+            # identische Ringe anderer Features gleich zerlegt werden
+            k = np.array([np.argmin(ids)])
+        ids = np.roll(ids, -k[0])
+        k = np.r_[k - k[0], len(ids)]
+        ids = np.r_[ids, ids[:1]]
+        feature = int(polygon_feature[ring_polygon[r]])
+        refs = []
+        for von, bis in zip(k[:-1], k[1:]):
+            stueck = ids[von:bis + 1]
+            vorwaerts = (stueck[0], stueck[1]) < (stueck[-1], stueck[-2])
+            kanonisch = stueck if vorwaerts else stueck[::-1]
+            key = kanonisch.tobytes()
+            arc = schluessel.get(key)
+            if arc is None:
+                arc = schluessel[key] = len(arcs)
+                arcs.append(punkte[kanonisch])
+                arc_features.append(set())
+            arc_features[arc].add(feature)
+            refs.append((arc, not vorwaerts))
+        ringe.append(refs)
+        ring_polygon_gueltig.append(ring_polygon[r])
+
+    logger.debug(
+        "Topologie: %d Kantenzüge aus %d Ringen (%d Knotenpunkte)", len(arcs), len(ringe), knoten.sum(),
+    )
+    return Topology(
+        arcs, ringe, np.asarray(ring_polygon_gueltig), polygon_feature,
+        [np.fromiter(sorted(f), dtype=np.intp) for f in arc_features], len(gdf), gdf.crs,
+    )
+
+
+# Topologien je Quell-GeoDataFrame (über id, solange das Objekt lebt) – wie
+# die LOD-Pyramiden in data_processing/simplify.py
+_TOPOLOGIEN: Dict[int, Tuple[weakref.ref, Optional[Topology]]] = {}
+
+
+def get_topology(gdf: gpd.GeoDataFrame) -> Optional[Topology]:
+    entry = _TOPOLOGIEN.get(id(gdf))
+    if entry is not None and entry[0]() is gdf:
+        return entry[1]
+    topo = build_topology(gdf)
+    key = id(gdf)
+    _TOPOLOGIEN[key] = (weakref.ref(gdf, lambda _ref: _TOPOLOGIEN.pop(key, None)), topo)
+    return topo
+
+
+class Grenzen:
+    """
+    Grenzlinien einer Karte: Arcs im Ziel-CRS (je Grenze einer) und die
+    Zeilenpositionen der angrenzenden Features im gezeichneten Hauptland.
+    """
+
+    def __init__(self, arcs: List[np.ndarray], features: List[np.ndarray]):
+        self.arcs = arcs
+        self.features = features
+
+    def linewidths(self, widths: np.ndarray) -> np.ndarray:
+        """Linienstärke je Arc: die stärkste der angrenzenden Features."""
+        if not self.arcs:
+            return np.empty(0)
+        laengen = np.array([len(f) for f in self.features])
+        flach = np.concatenate(self.features)
+        return np.maximum.reduceat(widths[flach], np.r_[0, np.cumsum(laengen)[:-1]])
+
+
+def _clip_arcs(arcs: List[np.ndarray], features: List[np.ndarray], rect: Bounds):
+    """
+    Arcs auf rect zugeschnitten: enthaltene unverändert, außerhalb liegende
+    entfallen, angeschnittene werden (ggf. in mehrere Teile) beschnitten.
+    """
+    if not arcs:
+        return arcs, features
+    minx, miny, maxx, maxy = rect
+    laengen = np.array([len(a) for a in arcs])
+    coords = np.concatenate(arcs)
+    starts = np.r_[0, np.cumsum(laengen)[:-1]]
+    lo = np.minimum.reduceat(coords, starts)
+    hi = np.maximum.reduceat(coords, starts)
+    innen = (lo[:, 0] >= minx) & (lo[:, 1] >= miny) & (hi[:, 0] <= maxx) & (hi[:, 1] <= maxy)
+    if innen.all():
+        return arcs, features
+    aussen = (lo[:, 0] > maxx) | (lo[:, 1] > maxy) | (hi[:, 0] < minx) | (hi[:, 1] < miny)
+
+    neu_arcs, neu_features = [], []
+    for i in np.flatnonzero(innen):
+        neu_arcs.append(arcs[i])
+        neu_features.append(features[i])
+    schneiden = np.flatnonzero(~innen & ~aussen)
+    if len(schneiden):
+        lines = shapely.linestrings(
+            np.concatenate([arcs[i] for i in schneiden]),
+            indices=np.repeat(np.arange(len(schneiden)), laengen[schneiden]),
+        )
+        lines = shapely.clip_by_rect(lines, minx, miny, maxx, maxy)
+        for teil, i in zip(*shapely.get_parts(lines, return_index=True)):
+            if shapely.get_type_id(teil) != shapely.GeometryType.LINESTRING or shapely.is_empty(teil):
+                continue
+            neu_arcs.append(shapely.get_coordinates(teil))
+            neu_features.append(features[schneiden[i]])
+    return neu_arcs, neu_features
+
+
+def topology_output(
+    gdf: gpd.GeoDataFrame,
+    target_crs,
+    units_per_px: float,
+    toleranz_px: float = 0.5,
+    min_flaeche_px: float = 0.25,
+    vereinfachen: bool = True,
+    rect: Optional[Bounds] = None,
+) -> Optional[Tuple[gpd.GeoDataFrame, Grenzen]]:
+    """
+    Gegenstück zu reproject + simplify_for_output über die Topologie von
+    gdf (Quell-CRS): vereinfacht werden die gemeinsamen Arcs, die Flächen
+    entstehen daraus neu. rect (culling.viewport_rect): Flächen und Arcs
+    werden darauf zugeschnitten. Rückgabe: (projiziertes GeoDataFrame ohne
+    leere Features, Grenzen) oder None, wenn gdf keine Polygone enthält.
+    """
+    topo = get_topology(gdf)
+    if topo is None:
+        return None
+    toleranz = units_per_px * toleranz_px if vereinfachen else 0.0
+    arcs = topo.simplified_arcs(target_crs, toleranz)
+    geoms = topo.polygons(arcs)
+    if vereinfachen:
+        geoms = drop_small_parts(geoms, min_flaeche_px * units_per_px ** 2)
+    if rect is not None:
+        geoms = clip_geometries(geoms, rect)
+        arcs, arc_features = _clip_arcs(arcs, topo.arc_features, rect)
+    else:
+        arc_features = topo.arc_features
+
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    result = gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs=get_crs(target_crs)))
+    # Arcs nur für gezeichnete Features; Positionen im gefilterten Ergebnis
+    neue_position = np.cumsum(valid) - 1
+    grenz_arcs, grenz_features = [], []
+    for arc, features in zip(arcs, arc_features):
+        features = features[valid[features]]
+        if len(features):
+            grenz_arcs.append(arc)
+            grenz_features.append(neue_position[features])
+    if not valid.all():
+        result = result[valid]
+    return result, Grenzen(grenz_arcs, grenz_features)
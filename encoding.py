@@ -0,0 +1,232 @@
+# encoding.py
+
+import io
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+from matplotlib.colors import to_rgba
+from PIL import Image
+
+logger = logging.getLogger("mymaptool.encoding")
+
+# Rasterformate werden aus dem Agg-Puffer kodiert, alles andere (svg)
+# zeichnet matplotlib als Vektorgrafik
+PIL_FORMATE = {"png": "PNG", "webp": "WEBP", "jpg": "JPEG", "jpeg": "JPEG"}
+RASTER_FORMATE = set(PIL_FORMATE)
+
+# Voreinstellungen je Format; überschreibbar über config["export"][Format]
+STANDARD_OPTIONEN = {
+    "png": {"compress_level": 6, "optimize": False},
+    "webp": {"quality": 90, "lossless": False, "method": 4},
+    "jpg": {"quality": 92, "optimize": True, "progressive": True},
+}
+
+
+def _schluessel(ext: str) -> str:
+    ext = ext.lower()
+    return "jpg" if ext == "jpeg" else ext
+
+
+def encoder_optionen(ext: str, export_cfg: Optional[dict] = None) -> dict:
+    """Optionen für Image.save: Voreinstellung des Formats, überschrieben durch config["export"]."""
+    ext = _schluessel(ext)
+    return {**STANDARD_OPTIONEN.get(ext, {}), **((export_cfg or {}).get(ext) or {})}
+
+
+def vorschau_breiten(export_cfg: Optional[dict], breite_px: int) -> List[int]:
+    """Breiten der Vorschaubilder (config["export"]["vorschau"]), nur kleiner als die Karte."""
+    return sorted({int(b) for b in (export_cfg or {}).get("vorschau", []) if 0 < int(b) < breite_px})
+
+
+def export_signatur(ext: str, export_cfg: Optional[dict]) -> Optional[dict]:
+    """Kodier-Einstellungen eines Formats (für Fingerabdrücke)."""
+    if _schluessel(ext) not in RASTER_FORMATE:
+        svg_cfg = (export_cfg or {}).get("svg")
+        return {"svg": svg_cfg} if svg_cfg and ext.lower() in ("svg", "svgz") else None
+    return {
+        "optionen": encoder_optionen(ext, export_cfg),
+        "vorschau": sorted((export_cfg or {}).get("vorschau", [])),
+    }
+
+
+@contextmanager
+def _hintergrund(fig, transparent: bool):
+    """transparent wie bei savefig: Figure- und Achsenhintergrund entfallen (nur solange gezeichnet wird)."""
+    patches = [fig.patch, *(ax.patch for ax in fig.axes)]
+    vorher = [(p.get_facecolor(), p.get_edgecolor()) for p in patches]
+    if transparent:
+        for p in patches:
+            p.set_facecolor("none")
+            p.set_edgecolor("none")
+    try:
+        yield
+    finally:
+        if transparent:
+            for p, (face, edge) in zip(patches, vorher):
+                p.set_facecolor(face)
+                p.set_edgecolor(edge)
+
+
+def _pruefe_groesse(rgba: np.ndarray, width_px: int, height_px: int):
+    if rgba.shape[:2] != (height_px, width_px):
+        logger.warning(
+            f"Puffergröße {rgba.shape[1]}×{rgba.shape[0]} weicht von {width_px}×{height_px} ab."
+        )
+
+
+def render_rgba(fig, width_px: int, height_px: int, transparent: bool) -> np.ndarray:
+    """
+    Rastert die (mit plotting._prepare_export vorbereitete) Figure einmal
+    auf dem Agg-Canvas. Rückgabe: Kopie des RGBA-Puffers (H × W × 4, uint8),
+    die nach dem nächsten Zeichnen der Figure gültig bleibt.
+    transparent wie bei savefig: Figure- und Achsenhintergrund entfallen.
+    """
+    with _hintergrund(fig, transparent):
+        if hasattr(fig.canvas, "buffer_rgba"):
+            fig.canvas.draw()
+            rgba = np.array(fig.canvas.buffer_rgba(), dtype=np.uint8)
+        else:
+            # Nicht-Agg-Canvas (z. B. interaktives Backend): über print_raw
+            buf = io.BytesIO()
+            fig.savefig(buf, format="rgba", dpi=fig.dpi)
+            w, h = fig.canvas.get_width_height(physical=True)
+            rgba = np.frombuffer(buf.getvalue(), dtype=np.uint8).reshape(h, w, 4).copy()
+    _pruefe_groesse(rgba, width_px, height_px)
+    return rgba
+
+
+class Grundbild:
+    """
+    Raster für Kartenserien, die sich nur im Vordergrund unterscheiden
+    (Atlas): alles außer den Artists von vordergrund() wird einmal
+    gerastert und als Puffer behalten (copy_from_bbox); je Karte wird
+    dieser zurückgeschrieben (restore_region) und nur der Vordergrund
+    darübergezeichnet. Pixelgleich zu render_rgba, solange der
+    Vordergrund in der Zeichenreihenfolge über allem anderen liegt.
+    Gilt für eine gezeichnete Karte – ändert sich etwas außerhalb des
+    Vordergrunds, ist ein neues Grundbild nötig.
+    """
+
+    def __init__(self, vordergrund: Callable[[], list]):
+        self.vordergrund = vordergrund
+        self._puffer = None
+        self._schluessel = None
+        self.treffer = 0
+
+    def render_rgba(self, fig, width_px: int, height_px: int, transparent: bool) -> np.ndarray:
+        """Wie render_rgba (ohne Agg-Canvas auch genau so)."""
+        canvas = fig.canvas
+        if not hasattr(canvas, "copy_from_bbox"):
+            return render_rgba(fig, width_px, height_px, transparent)
+        artists = [a for a in self.vordergrund() if a.get_visible()]
+        schluessel = (width_px, height_px, transparent)
+        if self._puffer is None or self._schluessel != schluessel:
+            for a in artists:
+                a.set_visible(False)
+            try:
+                with _hintergrund(fig, transparent):
+                    canvas.draw()
+            finally:
+                for a in artists:
+                    a.set_visible(True)
+            self._puffer = canvas.copy_from_bbox(fig.bbox)
+            self._schluessel = schluessel
+        else:
+            self.treffer += 1
+            canvas.restore_region(self._puffer)
+        renderer = canvas.get_renderer()
+        for a in artists:
+            a.draw(renderer)
+        rgba = np.array(canvas.buffer_rgba(), dtype=np.uint8)
+        _pruefe_groesse(rgba, width_px, height_px)
+        return rgba
+
+
+def _bild(rgba: np.ndarray, ext: str, background_cfg: Optional[dict]) -> Image.Image:
+    """PIL-Bild aus dem Puffer; JPEG (ohne Alphakanal) auf die Hintergrundfarbe bzw. Weiß gelegt."""
+    bild = Image.fromarray(rgba, "RGBA")
+    if PIL_FORMATE[_schluessel(ext)] != "JPEG":
+        return bild
+    farbe = to_rgba((background_cfg or {}).get("color") or "white")
+    if farbe[3] == 0:
+        farbe = (1.0, 1.0, 1.0, 1.0)
+    grund = Image.new("RGB", bild.size, tuple(int(round(c * 255)) for c in farbe[:3]))
+    grund.paste(bild, mask=bild.getchannel("A"))
+    return grund
+
+
+def encode_raster(
+    rgba: np.ndarray,
+    ext: str,
+    target,
+    export_cfg: Optional[dict] = None,
+    background_cfg: Optional[dict] = None,
+    breite: Optional[int] = None,
+):
+    """
+    Kodiert den RGBA-Puffer als ext nach target (Pfad oder Datei-Objekt).
+    breite: verkleinerte Fassung (Vorschau) mit proportionaler Höhe.
+    """
+    bild = _bild(rgba, ext, background_cfg)
+    if breite:
+        hoehe = max(1, round(bild.height * breite / bild.width))
+        bild = bild.resize((breite, hoehe), Image.LANCZOS)
+    bild.save(target, format=PIL_FORMATE[_schluessel(ext)], **encoder_optionen(ext, export_cfg))
+
+
+def vorschau_pfad(filepath: str, breite: int) -> str:
+    """Pfad eines Vorschaubilds: {basename}_{breite}px.{ext}."""
+    stamm, ext = os.path.splitext(filepath)
+    return f"{stamm}_{breite}px{ext}"
+
+
+class BackgroundEncoder:
+    """
+    Kodiert Rasterbilder in Hintergrund-Threads, während bereits die
+    nächste Karte gezeichnet wird (zlib/libwebp/libjpeg geben den GIL frei).
+    wait() wartet auf alle eingereichten Aufträge und wirft den ersten Fehler.
+    """
+
+    def __init__(self, threads: int = 1):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="encoder")
+        self._lock = threading.Lock()
+        self._offen: List[Future] = []
+
+    @classmethod
+    def from_config(cls, config: dict) -> "BackgroundEncoder":
+        return cls(int((config.get("export") or {}).get("threads", 1) or 1))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = self._pool.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._offen.append(future)
+        return future
+
+    def wait(self):
+        with self._lock:
+            offen, self._offen = self._offen, []
+        fehler = None
+        for future in offen:
+            try:
+                future.result()
+            except Exception as e:
+                fehler = fehler or e
+        if fehler is not None:
+            raise fehler
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,7 @@
 # highlight_selector.py
 
-import geopandas as gpd
-import fiona
+from io_utils import list_layers
+from layer_store import get_store
 
 def select_highlight_regions(
     gpkg_path: str,
@@ -21,7 +21,7 @@ def select_highlight_regions(
     aktiv = True
 
     # Layer-Auswahl
-    available_layers = fiona.listlayers(gpkg_path)
+    available_layers = list_layers(gpkg_path)
     if layer not in available_layers:
         print("\n📚 Verfügbare Layer für Hervorhebung:")
         for i, l in enumerate(available_layers, 1):
@@ -29,11 +29,8 @@ def select_highlight_regions(
         idx = int(input("🔍 Layer wählen (Nummer): ").strip()) - 1
         layer = available_layers[idx]
 
-    # Regionen lesen
-    # highlight_selector.py
-
-    gdf = gpd.read_file(gpkg_path, layer=layer)
-    region_names = sorted(gdf["NAME_1"].dropna().unique())
+    # Regionen lesen (aus dem Layer-Store, meist schon geladen)
+    region_names = get_store().names(gpkg_path, layer, "NAME_1")
 
     # DEBUG: alle Namen vor Filter
     print("DEBUG – alle möglichen Regionen vor Filter:", region_names)
@@ -0,0 +1,69 @@
+# import_report.py
+
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+# Startpfad (muss leicht bleiben) und Render-Stack
+DEFAULT_MODULES = ["config", "cli", "io_utils", "pipeline", "batch"]
+
+
+def measure(modules: List[str], cwd: str) -> List[Dict[str, object]]:
+    """
+    Importiert modules in einem frischen Interpreter mit -X importtime
+    und liefert je importiertem Modul self/cumulative (µs) und Tiefe.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import fehlgeschlagen:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        raw_name = parts[2]
+        stripped = raw_name.lstrip()
+        rows.append({
+            "modul": stripped.strip(),
+            "self_us": int(parts[0]),
+            "kumuliert_us": int(parts[1]),
+            # -X importtime rückt je Ebene um zwei Leerzeichen ein
+            "tiefe": (len(raw_name) - len(stripped) - 1) // 2,
+        })
+    return rows
+
+
+def summarize(rows: List[Dict[str, object]], top: int = 15) -> Dict[str, object]:
+    """Gesamtzeit, Top-Level-Module und die teuersten Pakete nach kumulierter Zeit."""
+    top_level = [r for r in rows if r["tiefe"] == 0]
+    return {
+        "gesamt_ms": sum(r["kumuliert_us"] for r in top_level) / 1000,
+        "module": len(rows),
+        "top_level": sorted(top_level, key=lambda r: -r["kumuliert_us"])[:top],
+        "teuerste": sorted(rows, key=lambda r: -r["kumuliert_us"])[:top],
+    }
+
+
+def print_report(summary: Dict[str, object]):
+    print(f"Importzeit gesamt: {summary['gesamt_ms']:.1f} ms ({summary['module']} Module)")
+    print("\nTop-Level-Imports (kumuliert):")
+    for r in summary["top_level"]:
+        print(f"  {r['kumuliert_us'] / 1000:9.1f} ms  {r['modul']}")
+    print("\nTeuerste Module (kumuliert):")
+    for r in summary["teuerste"]:
+        print(f"  {r['kumuliert_us'] / 1000:9.1f} ms  {'  ' * r['tiefe']}{r['modul']}")
+
+
+def write_json(summary: Dict[str, object], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
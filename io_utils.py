@@ -1,34 +1,224 @@
 # io_utils.py
 
 import os
-import geopandas as gpd
-from typing import Tuple, List
+import shutil
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Tuple, List, Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from layer_store import LayerHandle
+
+# Attributspalten, die die Pipeline tatsächlich nutzt (plus Geometrie)
+ATTRIBUT_SPALTEN = ["NAME_1"]
+
+
+@lru_cache(maxsize=None)
+def _engine():
+    """
+    Schneller Lesepfad: pyogrio (+ Arrow, falls pyarrow installiert),
+    sonst Fiona über geopandas. Erst beim ersten Lesen importiert.
+    Rückgabe: (pyogrio-Modul oder None, use_arrow)
+    """
+    try:
+        import pyogrio
+    except ImportError:
+        return None, False
+    try:
+        import pyarrow  # noqa: F401
+        return pyogrio, True
+    except ImportError:
+        return pyogrio, False
+
+
+def list_layers(gpkg_path: str) -> List[str]:
+    """
+    Namen aller Feature-Layer einer GeoPackage-Datei. Liest direkt die
+    SQLite-Tabelle gpkg_contents, ohne GDAL/Geo-Stack zu laden.
+    """
+    try:
+        con = sqlite3.connect(f"file:{os.path.abspath(gpkg_path)}?mode=ro", uri=True)
+        try:
+            rows = con.execute(
+                "SELECT table_name FROM gpkg_contents "
+                "WHERE data_type = 'features' ORDER BY rowid"
+            ).fetchall()
+        finally:
+            con.close()
+        return [r[0] for r in rows]
+    except sqlite3.Error:
+        pass
+
+    pyogrio, _ = _engine()
+    if pyogrio is not None:
+        return [str(name) for name in pyogrio.list_layers(gpkg_path)[:, 0]]
+    import fiona
+    return list(fiona.listlayers(gpkg_path))
+
+
+def layer_extent(gpkg_path: str, layer: str) -> Optional[Tuple[Tuple[float, float, float, float], str]]:
+    """
+    Ausdehnung eines Layers ((minx, miny, maxx, maxy), CRS) aus dem
+    R-Tree-Index des GeoPackage, ohne die Geometrien zu lesen.
+    None, wenn kein Index vorhanden oder das CRS unbekannt ist.
+    """
+    try:
+        con = sqlite3.connect(f"file:{os.path.abspath(gpkg_path)}?mode=ro", uri=True)
+        try:
+            row = con.execute(
+                "SELECT g.column_name, s.organization, s.organization_coordsys_id "
+                "FROM gpkg_geometry_columns g JOIN gpkg_spatial_ref_sys s ON g.srs_id = s.srs_id "
+                "WHERE g.table_name = ?", (layer,)
+            ).fetchone()
+            if row is None or row[1].upper() == "NONE":
+                return None
+            bounds = con.execute(
+                f'SELECT min(minx), min(miny), max(maxx), max(maxy) FROM "rtree_{layer}_{row[0]}"'
+            ).fetchone()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return None
+    if bounds is None or any(v is None for v in bounds):
+        return None
+    return tuple(float(v) for v in bounds), f"{row[1]}:{row[2]}"
+
+
+def layer_fields(gpkg_path: str, layer: str) -> List[str]:
+    """Namen der Attributspalten eines Layers (ohne Geometrie)."""
+    pyogrio, _ = _engine()
+    if pyogrio is not None:
+        return [str(f) for f in pyogrio.read_info(gpkg_path, layer=layer)["fields"]]
+    import fiona
+    with fiona.open(gpkg_path, layer=layer) as src:
+        return list(src.schema["properties"])
+
+
+def read_layer(
+    gpkg_path: str,
+    layer: str,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    where: Optional[str] = None,
+    geometry: bool = True,
+):
+    """
+    Liest einen Layer mit Spalten- und Zeilenauswahl.
+    columns: Attributspalten (None = alle, [] = nur Geometrie); fehlende
+             Spalten werden übergangen.
+    bbox:    (minx, miny, maxx, maxy) im Layer-CRS, nutzt den R-Tree des GPKG.
+    where:   SQL-Attributfilter, z. B. "NAME_1 IN ('Bayern')".
+    geometry=False liefert einen DataFrame ohne Geometrie.
+    """
+    if columns is not None:
+        vorhanden = set(layer_fields(gpkg_path, layer))
+        columns = [c for c in columns if c in vorhanden]
+
+    pyogrio, use_arrow = _engine()
+    if pyogrio is not None:
+        return pyogrio.read_dataframe(
+            gpkg_path,
+            layer=layer,
+            columns=columns,
+            bbox=bbox,
+            where=where,
+            read_geometry=geometry,
+            use_arrow=use_arrow,
+        )
+
+    import geopandas as gpd
+    kwargs = {"layer": layer, "engine": "fiona"}
+    if columns is not None:
+        kwargs["columns"] = columns
+    if bbox is not None:
+        kwargs["bbox"] = bbox
+    if where:
+        kwargs["where"] = where
+    if not geometry:
+        kwargs["ignore_geometry"] = True
+    return gpd.read_file(gpkg_path, **kwargs)
+
+
+def quelle(gpkg_path: str, layer: str) -> list:
+    """Herkunftsangabe (Pfad, Layer, mtime) für gdf.attrs["quellen"]."""
+    path = os.path.abspath(gpkg_path)
+    return [path, layer, os.path.getmtime(path)]
+
+
+def link_or_copy(src: str, dst: str):
+    """Legt dst als Hardlink auf src an (Kopie, wo das nicht geht); vorhandenes dst wird ersetzt."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def write_replace(path: str, data: bytes):
+    """
+    Schreibt data in eine neue Datei und ersetzt path damit. Nie in die
+    vorhandene Datei hinein – die kann ein Hardlink sein (link_or_copy),
+    den andere Pfade teilen.
+    """
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def find_haupt_gpkg(hauptland_dir: str) -> str:
+    """Pfad der ersten .gpkg-Datei in hauptland_dir."""
+    haupt_files = [f for f in os.listdir(hauptland_dir) if f.endswith(".gpkg")]
+    if not haupt_files:
+        raise FileNotFoundError(f"Keine .gpkg im Ordner {hauptland_dir}")
+    return os.path.join(hauptland_dir, haupt_files[0])
+
+
+def find_neighbour_handles(nebenlaender_dir: str, nebenlayer_name: str) -> List["LayerHandle"]:
+    """
+    Alle .gpkg-Dateien in nebenlaender_dir als LayerHandle auf den Layer
+    nebenlayer_name (nur Geometrie). Gelesen wird erst bei Bedarf.
+    """
+    from layer_store import LayerHandle  # layer_store importiert io_utils
+    return [
+        LayerHandle(os.path.join(nebenlaender_dir, fname), nebenlayer_name, columns=[])
+        for fname in os.listdir(nebenlaender_dir)
+        if fname.endswith(".gpkg")
+    ]
 
 
 def find_gpkg_files(
     hauptland_dir: str,
     nebenlaender_dir: str,
-    nebenlayer_name: str
-) -> Tuple[str, List[gpd.GeoDataFrame]]:
+    nebenlayer_name: str,
+    lazy: bool = False,
+    worker: Optional[int] = None,
+) -> Tuple[str, List[Union["gpd.GeoDataFrame", "LayerHandle"]]]:
     """
     Findet im Verzeichnis hauptland_dir die erste .gpkg-Datei
     und lädt aus nebenlaender_dir alle .gpkg-Dateien als GeoDataFrames
     unter Verwendung des Layers nebenlayer_name.
     Liefert (pfad_haupt_gpkg, [gdf_neben1, gdf_neben2, ...]).
+    Gelesen wird über den gemeinsamen Layer-Store, von den Nebenländern
+    nur die Geometrie, parallel mit bis zu worker Threads.
+    lazy=True liefert statt der GeoDataFrames LayerHandles, die erst bei
+    Bedarf gelesen werden (siehe pipeline.render_region).
     """
+    from layer_store import load_all  # layer_store importiert io_utils
+
     # Hauptland-GPKG finden
-    haupt_files = [f for f in os.listdir(hauptland_dir) if f.endswith(".gpkg")]
-    if not haupt_files:
-        raise FileNotFoundError(f"Keine .gpkg im Ordner {hauptland_dir}")
-    haupt_path = os.path.join(hauptland_dir, haupt_files[0])
-
-    # Nebenländer laden
-    neben_gdfs: List[gpd.GeoDataFrame] = []
-    for fname in os.listdir(nebenlaender_dir):
-        if not fname.endswith(".gpkg"):
-            continue
-        pfad = os.path.join(nebenlaender_dir, fname)
-        gdf = gpd.read_file(pfad, layer=nebenlayer_name)
-        neben_gdfs.append(gdf)
-
-    return haupt_path, neben_gdfs
\ No newline at end of file
+    haupt_path = find_haupt_gpkg(hauptland_dir)
+
+    # Nebenländer
+    handles = find_neighbour_handles(nebenlaender_dir, nebenlayer_name)
+    if lazy:
+        return haupt_path, handles
+    return haupt_path, load_all(handles, worker)
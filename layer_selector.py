@@ -1,8 +1,8 @@
-import fiona
+from io_utils import list_layers
 
 def get_layers_interactive(gpkg_path):
     """Interaktive Null-basierte Auswahl von Layern aus einer GPKG-Datei."""
-    available_layers = fiona.listlayers(gpkg_path)
+    available_layers = list_layers(gpkg_path)
 
     print("\n📚 Verfügbare Layer im Hauptland-GPKG:")
     for i, layer in enumerate(available_layers):  # beginnt bei 0
@@ -0,0 +1,243 @@
+# layer_store.py
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+import shapely
+
+from io_utils import layer_extent, quelle, read_layer
+
+logger = logging.getLogger("mymaptool.layer_store")
+
+# (Pfad, Layer, Spalten oder None für alle, mit Geometrie, bbox, where)
+StoreKey = Tuple[str, str, Optional[Tuple[str, ...]], bool, Optional[tuple], Optional[str]]
+
+
+def estimate_bytes(df) -> int:
+    """Grobe Speicherabschätzung: Spalten + 16 Byte je Koordinate + Objekt-Overhead."""
+    total = int(df.memory_usage(deep=True, index=True).sum())
+    if isinstance(df, gpd.GeoDataFrame) and df.geometry.name in df:
+        geoms = df.geometry.array
+        total += int(shapely.get_num_coordinates(geoms).sum()) * 16 + len(geoms) * 64
+    return total
+
+
+class LayerStore:
+    """
+    Gemeinsamer Zwischenspeicher für gelesene GeoPackage-Layer.
+
+    Jede Kombination (Pfad, Layer, Spaltenauswahl, mit/ohne Geometrie,
+    bbox-/where-Filter) wird höchstens einmal gelesen. Anfragen, die ein bereits geladener
+    Eintrag abdeckt (z. B. nur NAME_1 aus einem vollständigen Layer),
+    werden daraus bedient. Einträge bleiben bis release()/clear() erhalten.
+    Ist compiled gesetzt (data_processing.geostore.GeoStore), werden
+    ungefilterte Layer bevorzugt aus dem kompilierten Store geladen.
+    """
+
+    def __init__(self):
+        self.compiled = None
+        self._data: Dict[StoreKey, object] = {}
+        self._bytes: Dict[StoreKey, int] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[StoreKey, threading.Lock] = {}
+        self.reads = 0
+
+    @staticmethod
+    def _key(path, layer, columns, geometry, bbox=None, where=None) -> StoreKey:
+        cols = tuple(sorted(set(columns))) if columns is not None else None
+        bbox = tuple(float(v) for v in bbox) if bbox is not None else None
+        return os.path.abspath(path), layer, cols, geometry, bbox, where or None
+
+    def _find_cover(self, key: StoreKey):
+        """Bereits geladener Eintrag, der key vollständig enthält."""
+        path, layer, cols, geometry, bbox, where = key
+        for (p, l, c, g, b, w), df in self._data.items():
+            if p != path or l != layer or (geometry and not g):
+                continue
+            if (b, w) != (bbox, where):
+                continue
+            if c is None or (cols is not None and set(cols) <= set(c)):
+                return df
+        return None
+
+    def get(
+        self,
+        path: str,
+        layer: str,
+        columns: Optional[List[str]] = None,
+        geometry: bool = True,
+        bbox: Optional[tuple] = None,
+        where: Optional[str] = None,
+    ):
+        """
+        Liefert den Layer als GeoDataFrame (bzw. DataFrame ohne Geometrie),
+        beschränkt auf columns (None = alle Attributspalten) und optional
+        gefiltert per bbox/where (siehe io_utils.read_layer).
+        Das Ergebnis ist geteilt und darf nicht verändert werden.
+        """
+        key = self._key(path, layer, columns, geometry, bbox, where)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                with self._lock:
+                    cover = self._find_cover(key)
+                if cover is None:
+                    cover = self._read(key)
+                    with self._lock:
+                        self._data[key] = cover
+                        self._bytes[key] = estimate_bytes(cover)
+                        self.reads += 1
+        finally:
+            # Sperre nur für die Dauer des Lesens; danach liegt der Eintrag
+            # in _data (sonst wächst _key_locks mit jedem bbox/where-Schlüssel)
+            with self._lock:
+                if self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+        return self._project(cover, key)
+
+    @staticmethod
+    def _project(df, key: StoreKey):
+        cols, geometry = key[2], key[3]
+        if cols is None and (geometry or not isinstance(df, gpd.GeoDataFrame)):
+            return df
+        wanted = [c for c in df.columns if (cols is None or c in cols)]
+        if isinstance(df, gpd.GeoDataFrame):
+            geom_col = df.geometry.name
+            wanted = [c for c in wanted if c != geom_col]
+            if geometry:
+                return df[wanted + [geom_col]]
+        return df[wanted]
+
+    def _read(self, key: StoreKey):
+        path, layer, cols, geometry, bbox, where = key
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Lese Layer %s aus %s (Spalten: %s, bbox: %s, where: %s)",
+                layer, os.path.basename(path), "alle" if cols is None else list(cols), bbox, where,
+            )
+        df = None
+        if self.compiled is not None and bbox is None and where is None:
+            df = self.compiled.load(path, layer, list(cols) if cols is not None else None, geometry)
+        if df is None:
+            df = read_layer(
+                path,
+                layer,
+                columns=list(cols) if cols is not None else None,
+                bbox=bbox,
+                where=where,
+                geometry=geometry,
+            )
+        df.attrs["quellen"] = [quelle(path, layer)]
+        return df
+
+    def names(self, path: str, layer: str, column: str = "NAME_1") -> List[str]:
+        """Sortierte, eindeutige Werte einer Attributspalte (ohne leere)."""
+        df = self.get(path, layer, columns=[column], geometry=False)
+        return sorted(df[column].dropna().unique())
+
+    def release(self, path: Optional[str] = None, layer: Optional[str] = None) -> int:
+        """Gibt Einträge frei (alle, eines Pfads oder eines Layers). Rückgabe: freigegebene Bytes."""
+        abspath = os.path.abspath(path) if path else None
+        freed = 0
+        with self._lock:
+            for key in list(self._data):
+                if abspath and key[0] != abspath:
+                    continue
+                if layer and key[1] != layer:
+                    continue
+                del self._data[key]
+                freed += self._bytes.pop(key, 0)
+        if freed:
+            logger.debug("Layer-Store: %.1f MB freigegeben", freed / 1e6)
+        return freed
+
+    def clear(self) -> int:
+        return self.release()
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(self._bytes.values())
+
+    def report(self) -> List[Dict[str, object]]:
+        """Übersicht der geladenen Einträge (für Logging)."""
+        with self._lock:
+            return [
+                {"pfad": k[0], "layer": k[1], "spalten": k[2], "geometrie": k[3],
+                 "bbox": k[4], "where": k[5], "zeilen": len(self._data[k]), "bytes": self._bytes[k]}
+                for k in self._data
+            ]
+
+
+_STORE = LayerStore()
+
+
+def get_store() -> LayerStore:
+    """Prozessweiter Layer-Store."""
+    return _STORE
+
+
+class LayerHandle:
+    """
+    Verweis auf einen Layer, der erst beim ersten load() über den
+    Layer-Store gelesen wird. Herkunft (quellen) und Ausdehnung (extent)
+    sind ohne Lesen der Geometrien verfügbar; so können Layer außerhalb
+    des Kartenausschnitts ungelesen bleiben.
+    """
+
+    def __init__(self, path: str, layer: str, columns: Optional[List[str]] = None,
+                 store: Optional[LayerStore] = None):
+        self.path = path
+        self.layer = layer
+        self.columns = columns
+        self._store = store
+        self._extent = None
+        self._extent_known = False
+
+    @property
+    def store(self) -> LayerStore:
+        return self._store or get_store()
+
+    @property
+    def quellen(self) -> list:
+        return [quelle(self.path, self.layer)]
+
+    @property
+    def extent(self):
+        """((minx, miny, maxx, maxy), CRS) aus dem R-Tree des GPKG oder None."""
+        if not self._extent_known:
+            self._extent = layer_extent(self.path, self.layer)
+            self._extent_known = True
+        return self._extent
+
+    def load(self):
+        """GeoDataFrame des Layers (geteilt, nicht verändern)."""
+        return self.store.get(self.path, self.layer, columns=self.columns)
+
+    def release(self) -> int:
+        """Gibt den Layer im Store frei. Rückgabe: freigegebene Bytes."""
+        return self.store.release(self.path, self.layer)
+
+    def __repr__(self):
+        return f"LayerHandle({os.path.basename(self.path)!r}, {self.layer!r})"
+
+
+def load_all(handles: Sequence[LayerHandle], worker: Optional[int] = None) -> list:
+    """
+    Liest mehrere Layer parallel (GDAL gibt beim Lesen die GIL frei) mit
+    höchstens worker Threads (Standard: min(8, CPU-Kerne)).
+    Rückgabe: GeoDataFrames in der Reihenfolge der handles.
+    """
+    if not handles:
+        return []
+    worker = worker or min(8, os.cpu_count() or 1)
+    worker = max(1, min(worker, len(handles)))
+    if worker == 1:
+        return [h.load() for h in handles]
+    with ThreadPoolExecutor(max_workers=worker, thread_name_prefix="laden") as pool:
+        return list(pool.map(LayerHandle.load, handles))
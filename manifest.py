@@ -0,0 +1,184 @@
+# manifest.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+from layer_store import LayerHandle
+from styling import choropleth_signatur
+
+logger = logging.getLogger("mymaptool.manifest")
+
+# Bei Änderungen an der Darstellung erhöhen – macht alle Fingerabdrücke ungültig
+RENDER_VERSION = 1
+
+
+def _geodaten_hash(gdf) -> Optional[list]:
+    """
+    Herkunft (Quellen inkl. mtime) und enthaltene Zeilen eines GeoDataFrames
+    (LayerHandle: der ganze Layer, ohne ihn zu lesen); None, wenn unbekannt.
+    """
+    if isinstance(gdf, LayerHandle):
+        return [gdf.quellen, "alle"]
+    quellen = gdf.attrs.get("quellen")
+    if not quellen:
+        return None
+    zeilen = hashlib.sha256(pd.util.hash_pandas_object(gdf.index, index=False).values.tobytes())
+    return [quellen, zeilen.hexdigest()]
+
+
+def _sortiert(cfg: Optional[dict]) -> Optional[dict]:
+    """Konfiguration mit sortierten Namenslisten (Reihenfolge ohne Einfluss aufs Bild)."""
+    if not cfg:
+        return cfg
+    return {k: sorted(map(str, v)) if k == "namen" and isinstance(v, list) else v for k, v in cfg.items()}
+
+
+def map_fingerprint(
+    gdf_haupt,
+    neben_gdfs,
+    ziel_crs: str,
+    config: dict,
+    breite_px: int,
+    hoehe_px: int,
+    highlight_cfg: dict,
+    scalebar_cfg: dict,
+    background_cfg: dict,
+) -> Optional[str]:
+    """
+    Fingerabdruck (sha256) aller Eingaben, die das Kartenbild bestimmen:
+    Quelldateien und Layer samt mtime, die enthaltenen Zeilen (ausgeblendete
+    Namen fehlen im Index), Hervorhebung, Choropleth (inkl. CSV-mtime),
+    Farben, Linien, Maßstab, Hintergrund, Vereinfachung, Render-Einstellungen, Kartengröße und CRS.
+    None, wenn die Herkunft eines Datensatzes unbekannt ist.
+    """
+    daten = [_geodaten_hash(gdf_haupt)] + [_geodaten_hash(g) for g in neben_gdfs]
+    if any(d is None for d in daten):
+        return None
+    payload = {
+        "version": RENDER_VERSION,
+        "daten": daten,
+        "crs": str(ziel_crs),
+        "groesse": [int(breite_px), int(hoehe_px)],
+        "hervorhebung": _sortiert(highlight_cfg),
+        "farben": config.get("farben"),
+        "linien": config.get("linien"),
+        "scalebar": scalebar_cfg,
+        "background": background_cfg,
+        "vereinfachung": config.get("vereinfachung"),
+        "render": config.get("render"),
+        "karte": config.get("karte"),
+        "choropleth": choropleth_signatur(config.get("choropleth")),
+    }
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def format_fingerprint(fingerprint: str, ext: str, signatur: Optional[dict] = None) -> str:
+    """
+    Fingerabdruck einer Ausgabedatei: Karten-Fingerabdruck plus Format und
+    dessen Kodier-Einstellungen (encoding.export_signatur).
+    """
+    text = f"{fingerprint}:{ext.lower()}"
+    if signatur is not None:
+        text += ":" + json.dumps(signatur, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class OutputManifest:
+    """
+    Verzeichnis der erzeugten Karten eines Ausgabeordners (manifest.json):
+    Fingerabdruck → Datei, Größe, Region, CRS, Format, Zeitpunkt.
+    Ist ein Fingerabdruck bereits vorhanden und die Datei unverändert,
+    muss die Karte nicht neu gerendert werden.
+    save() führt vor dem Schreiben mit dem Stand auf der Platte zusammen,
+    sodass parallele Läufe keine Einträge verlieren.
+    """
+
+    def __init__(self, output_dir: str, name: str = "manifest.json", ueberspringen: bool = True,
+                 benennung: str = "zeitstempel"):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, name)
+        self.ueberspringen = ueberspringen
+        self.benennung = benennung
+        self.entries: Dict[str, dict] = self._read()
+        self._neu: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.uebersprungen = 0
+        self.verlinkt = 0
+
+    @classmethod
+    def from_config(cls, config: dict, output_dir: str) -> "OutputManifest":
+        """config["ausgabe"] (manifest, ueberspringen, benennung)."""
+        cfg = config.get("ausgabe", {})
+        benennung = cfg.get("benennung", "zeitstempel")
+        if benennung not in ("zeitstempel", "inhalt"):
+            raise ValueError(f"Unbekannte Benennung '{benennung}' (erlaubt: zeitstempel, inhalt)")
+        return cls(output_dir, cfg.get("manifest", "manifest.json"),
+                   cfg.get("ueberspringen", True), benennung)
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("karten", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifest {self.path} nicht lesbar ({e}) – wird neu angelegt.")
+            return {}
+
+    def basename(self, region: str, crs: str, fingerprint: Optional[str]) -> str:
+        """Dateiname ohne Endung: {region}_{crs}_{hash} bzw. {region}_{crs}_{timestamp}."""
+        if self.benennung == "inhalt" and fingerprint:
+            suffix = fingerprint[:16]
+        else:
+            suffix = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        return f"{region}_{crs.replace(':', '_')}_{suffix}"
+
+    def lookup(self, fingerprint: str) -> Optional[str]:
+        """Pfad der vorhandenen Ausgabedatei zum Fingerabdruck, sofern noch unverändert vorhanden."""
+        if not self.ueberspringen:
+            return None
+        with self._lock:
+            eintrag = self.entries.get(fingerprint)
+        if eintrag is None:
+            return None
+        pfad = os.path.join(self.output_dir, eintrag["datei"])
+        try:
+            if os.path.getsize(pfad) != eintrag.get("bytes"):
+                return None
+        except OSError:
+            return None
+        return pfad
+
+    def record(self, fingerprint: str, pfad: str, **meta):
+        eintrag = {
+            "datei": os.path.relpath(pfad, self.output_dir),
+            "bytes": os.path.getsize(pfad),
+            "erstellt": datetime.now().isoformat(timespec="seconds"),
+            **meta,
+        }
+        with self._lock:
+            self.entries[fingerprint] = eintrag
+            self._neu[fingerprint] = eintrag
+
+    def save(self):
+        """Schreibt neue Einträge atomar (mit dem aktuellen Stand der Datei zusammengeführt)."""
+        with self._lock:
+            if not self._neu:
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            entries = self._read()
+            entries.update(self._neu)
+            tmp = f"{self.path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": RENDER_VERSION, "karten": entries}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+            self.entries = entries
+            self._neu = {}
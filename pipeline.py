@@ -0,0 +1,354 @@
+# pipeline.py
+
+import logging
+import os
+from tqdm import tqdm
+
+from data_processing.crs import (
+    reproject, bbox_for_bounds, projected_bounds, reproject_blockweise, view_bounds,
+)
+from data_processing.culling import (
+    clip_to_viewport, cull_to_extent, cull_to_viewport, extent_visible, viewport_rect,
+)
+from data_processing.simplify import map_units_per_pixel, simplify_for_output, select_lod
+from data_processing.topology import topology_output
+from encoding import BackgroundEncoder, export_signatur
+from io_utils import link_or_copy
+from layer_store import LayerHandle, load_all
+from manifest import OutputManifest, map_fingerprint, format_fingerprint
+from plotting import RenderSession, save_map
+from profiling import get_profiler
+
+logger = logging.getLogger("mymaptool.pipeline")
+
+
+def render_region(
+    gdf_haupt,
+    neben_gdfs,
+    region: str,
+    ziel_crs_list: list[str],
+    config: dict,
+    breite_px: int,
+    hoehe_px: int,
+    output_dir: str,
+    highlight_cfg: dict,
+    scalebar_cfg: dict = None,
+    background_cfg: dict = None,
+    export_formats: set[str] = {"png"},
+    show_progress: bool = True,
+    reproj_cache=None,
+    session: RenderSession = None,
+    manifest: OutputManifest = None,
+    neben_freigeben: bool = None,
+    encoder: BackgroundEncoder = None,
+) -> int:
+    """
+    Rendert eine Region für alle Ziel-CRS und speichert die Karten.
+    Die Geodaten werden nur gelesen, nie verändert – dieselben
+    GeoDataFrames können also für mehrere Aufrufe verwendet werden.
+    Mit reproj_cache (ReprojCache) werden Reprojektionen persistent
+    zwischengespeichert.
+    session (RenderSession) erlaubt es, dieselbe Figure über mehrere
+    Aufrufe zu nutzen; ohne wird eine eigene für alle CRS angelegt.
+    manifest (OutputManifest) ordnet Fingerabdrücke den Ausgabedateien zu;
+    Karten mit bekanntem Fingerabdruck werden nicht neu gerendert, sondern
+    übersprungen bzw. verlinkt. Ohne wird eines aus config["ausgabe"] für
+    output_dir angelegt und am Ende gespeichert.
+    neben_gdfs darf statt GeoDataFrames LayerHandles enthalten: gelesen
+    werden sie erst, wenn eine Karte sie braucht, und mit neben_freigeben
+    (Standard: config["nachbarn"]["freigeben"]) nach der letzten Karte
+    wieder freigegeben.
+    Rasterformate werden mit encoder (BackgroundEncoder, ohne: ein eigener
+    nach config["export"]) im Hintergrund kodiert, während die nächste
+    Karte entsteht; vor der Rückkehr sind alle Dateien geschrieben.
+    Rückgabe: Anzahl erzeugter Karten.
+    """
+    # Scalebar: Werte aus config["scalebar"], überschrieben durch scalebar_cfg
+    scalebar_cfg = {**config.get("scalebar", {}), **(scalebar_cfg or {})}
+    crs_iter = tqdm(ziel_crs_list, desc="Projektionen") if show_progress else ziel_crs_list
+    eigene_session = session is None
+    if eigene_session:
+        session = RenderSession()
+    eigenes_manifest = manifest is None
+    if eigenes_manifest:
+        manifest = OutputManifest.from_config(config, output_dir)
+    eigener_encoder = encoder is None
+    if eigener_encoder:
+        encoder = BackgroundEncoder.from_config(config)
+
+    profiler = get_profiler()
+
+    if neben_freigeben is None:
+        neben_freigeben = config.get("nachbarn", {}).get("freigeben", True)
+
+    try:
+        for ziel_crs in crs_iter:
+            with profiler.stage("karte", region=region, crs=ziel_crs, groesse=f"{breite_px}x{hoehe_px}"):
+                _render_crs(
+                    gdf_haupt, neben_gdfs, region, ziel_crs, config, breite_px, hoehe_px,
+                    output_dir, highlight_cfg, scalebar_cfg, background_cfg, export_formats,
+                    reproj_cache, session, manifest, encoder,
+                )
+    finally:
+        try:
+            # erst nach dem Kodieren stehen alle Karten im Manifest
+            if eigener_encoder:
+                encoder.close()
+            else:
+                encoder.wait()
+        finally:
+            if eigene_session:
+                session.close()
+            if eigenes_manifest:
+                manifest.save()
+            if neben_freigeben:
+                freigegeben = sum(n.release() for n in neben_gdfs if isinstance(n, LayerHandle))
+                if freigegeben:
+                    logger.debug("Nachbarländer freigegeben: %.1f MB", freigegeben / 1e6)
+
+    if reproj_cache is not None:
+        logger.debug(
+            "Reprojektions-Cache: %d Treffer, %d Fehlzugriffe", reproj_cache.hits, reproj_cache.misses,
+        )
+    return len(ziel_crs_list)
+
+
+def _render_crs(
+    gdf_haupt, neben_gdfs, region, ziel_crs, config, breite_px, hoehe_px,
+    output_dir, highlight_cfg, scalebar_cfg, background_cfg, export_formats,
+    reproj_cache, session, manifest, encoder,
+):
+    """Eine Karte: reprojizieren, vereinfachen, zeichnen, speichern – sofern nicht schon vorhanden."""
+    fingerprint = map_fingerprint(
+        gdf_haupt, neben_gdfs, ziel_crs, config, breite_px, hoehe_px,
+        highlight_cfg, scalebar_cfg, background_cfg,
+    )
+    basename = manifest.basename(region, ziel_crs, fingerprint)
+    export_cfg = config.get("export")
+
+    # Formate mit bekanntem Fingerabdruck übernehmen statt neu zu rendern
+    fehlend = reuse_existing(manifest, fingerprint, basename, export_formats, output_dir, export_cfg)
+    if not fehlend:
+        return
+
+    fig = render_figure(
+        gdf_haupt, neben_gdfs, ziel_crs, config, breite_px, hoehe_px,
+        highlight_cfg, scalebar_cfg, background_cfg, reproj_cache, session,
+    )
+
+    # Speichern (Rasterformate im Hintergrund, eingetragen sobald geschrieben)
+    save_map(
+        fig,
+        output_dir,
+        region,
+        ziel_crs,
+        breite_px,
+        hoehe_px,
+        fehlend,
+        background_cfg=background_cfg,
+        close=False,
+        basename=basename,
+        export_cfg=export_cfg,
+        encoder=encoder,
+        on_written=manifest_eintrag(manifest, fingerprint, export_cfg, region, ziel_crs, breite_px, hoehe_px),
+    )
+    if (config.get("daten") or {}).get("kompakt", False):
+        # Karteninhalte nicht bis zur nächsten Karte aufheben (gerastert bzw.
+        # geschrieben ist alles; die Kodierung arbeitet auf einer Kopie)
+        session.reset()
+
+
+def reuse_existing(manifest, fingerprint, basename, export_formats, output_dir, export_cfg) -> set:
+    """
+    Übernimmt Formate, deren Fingerabdruck im Manifest steht (überspringen
+    bzw. verlinken). Rückgabe: die Formate, die neu gerendert werden müssen.
+    """
+    fehlend = set()
+    for ext in export_formats:
+        vorhanden = (
+            manifest.lookup(format_fingerprint(fingerprint, ext, export_signatur(ext, export_cfg)))
+            if fingerprint else None
+        )
+        if vorhanden is None:
+            fehlend.add(ext)
+            continue
+        ziel = os.path.join(output_dir, f"{basename}.{ext}")
+        if os.path.abspath(vorhanden) == os.path.abspath(ziel):
+            manifest.uebersprungen += 1
+            logger.info("Karte unverändert, übersprungen: %s", ziel)
+        else:
+            link_or_copy(vorhanden, ziel)
+            manifest.verlinkt += 1
+            logger.info("Karte unverändert, verlinkt: %s → %s", ziel, os.path.basename(vorhanden))
+    return fehlend
+
+
+def manifest_eintrag(manifest, fingerprint, export_cfg, region, ziel_crs, breite_px, hoehe_px):
+    """on_written für save_map: trägt jede geschriebene Datei mit ihrem Fingerabdruck ins Manifest ein."""
+    def eintragen(ext, pfad):
+        if fingerprint:
+            manifest.record(
+                format_fingerprint(fingerprint, ext, export_signatur(ext, export_cfg)), pfad,
+                region=region, crs=ziel_crs, format=ext, groesse=f"{breite_px}x{hoehe_px}",
+            )
+    return eintragen
+
+
+def render_figure(
+    gdf_haupt,
+    neben_gdfs,
+    ziel_crs: str,
+    config: dict,
+    breite_px: int,
+    hoehe_px: int,
+    highlight_cfg: dict,
+    scalebar_cfg: dict,
+    background_cfg: dict,
+    reproj_cache,
+    session: RenderSession,
+):
+    """
+    Reprojiziert, vereinfacht und zeichnet eine Karte in die Figure der
+    session (ohne zu speichern). scalebar_cfg ist bereits mit
+    config["scalebar"] zusammengeführt. Rückgabe: die Figure.
+    """
+    aspect_ratio = breite_px / hoehe_px
+    simpl_cfg = config.get("vereinfachung", {})
+    vereinfachen = simpl_cfg.get("aktiv", True)
+    toleranz_px = simpl_cfg.get("toleranz_px", 0.5)
+    min_flaeche_px = simpl_cfg.get("min_flaeche_px", 0.25)
+    profiler = get_profiler()
+
+    # kompakt: das Hauptland wird nie vollständig in voller Auflösung
+    # projiziert, sondern blockweise projiziert und gleich vereinfacht;
+    # mit Topologie werden nur deren Kantenzüge projiziert
+    daten_cfg = config.get("daten") or {}
+    kompakt = daten_cfg.get("kompakt", False)
+    block = daten_cfg.get("block_features", 5000)
+    topologie = (config.get("render") or {}).get("topologie", False)
+
+    # reprojiziere Hauptland
+    with profiler.stage("reprojektion") as st:
+        if kompakt or topologie:
+            haupt_proj = None
+            bounds = projected_bounds(gdf_haupt, ziel_crs, block)
+        else:
+            haupt_proj = reproject(gdf_haupt, ziel_crs, cache=reproj_cache)
+            bounds = haupt_proj.total_bounds
+            st.geo(haupt_proj)
+
+    # Bounding Box passend zum Seitenverhältnis (Zoomstufen bzw. fester
+    # Ausschnitt aus config["karte"])
+    karte_cfg = config.get("karte") or {}
+    bbox = bbox_for_bounds(
+        view_bounds(bounds, ziel_crs, karte_cfg), aspect_ratio,
+        puffer=0.0 if karte_cfg.get("ausschnitt") else 0.05,
+    )
+
+    # Geometrie auf Ausgabeauflösung vereinfachen
+    units_per_px = map_units_per_pixel(bbox, breite_px, hoehe_px)
+
+    # Zuschnitt des Hauptlands auf den Ausschnitt plus Rand (breiteste
+    # Linie + 2 px): Features außerhalb werden gar nicht erst vereinfacht,
+    # angeschnittene erst nach dem Vereinfachen beschnitten, damit die
+    # sichtbaren Konturen dieselben bleiben
+    linien_cfg = config.get("linien") or {}
+    rand_px = max(linien_cfg.get("grenze_px", 1), linien_cfg.get("highlight_px", 1)) + 2
+    rect = viewport_rect(bbox, units_per_px * rand_px)
+    grenzen = None
+    if topologie:
+        # gemeinsame Grenzen einmal: vereinfacht werden die Kantenzüge der
+        # Topologie, die Flächen entstehen daraus neu
+        with profiler.stage("topologie") as st:
+            ergebnis = topology_output(
+                gdf_haupt, ziel_crs, units_per_px, toleranz_px, min_flaeche_px, vereinfachen, rect,
+            )
+            if ergebnis is not None:
+                haupt_proj, grenzen = ergebnis
+                st.geo(haupt_proj)
+    if grenzen is None and kompakt:
+        with profiler.stage("vereinfachung") as st:
+            haupt_proj = reproject_blockweise(
+                gdf_haupt, ziel_crs,
+                lambda teil: clip_to_viewport(simplify_for_output(
+                    cull_to_viewport(teil, rect), units_per_px if vereinfachen else 0.0,
+                    toleranz_px, min_flaeche_px,
+                ), rect),
+                block,
+            )
+            st.geo(haupt_proj)
+    elif grenzen is None:
+        if haupt_proj is None:
+            # Topologie ohne Polygone: doch vollständig projizieren
+            with profiler.stage("reprojektion") as st:
+                haupt_proj = reproject(gdf_haupt, ziel_crs, cache=reproj_cache)
+                st.geo(haupt_proj)
+        with profiler.stage("vereinfachung") as st:
+            haupt_proj = cull_to_viewport(haupt_proj, rect)
+            if vereinfachen:
+                haupt_proj = simplify_for_output(haupt_proj, units_per_px, toleranz_px, min_flaeche_px)
+            haupt_proj = clip_to_viewport(haupt_proj, rect)
+            st.geo(haupt_proj)
+
+    # Nebenländer: passende Vereinfachungsstufe wählen und unsichtbare
+    # Features vor der Reprojektion aussortieren
+    neben_proj = []
+    with profiler.stage("nachbarn") as st:
+        for g in _sichtbare_nachbarn(neben_gdfs, bbox, ziel_crs, config):
+            if vereinfachen and simpl_cfg.get("pyramide", True):
+                g = select_lod(
+                    g, bbox, ziel_crs, breite_px, hoehe_px,
+                    toleranz_px, simpl_cfg.get("stufen", 5),
+                )
+            sichtbar = cull_to_extent(g, bbox, ziel_crs)
+            if sichtbar.empty:
+                continue
+            stufe = sichtbar.attrs.get("lod", 0)
+            proj = reproject(
+                sichtbar, ziel_crs, cache=reproj_cache,
+                variante=f"lod{stufe}" if stufe else "",
+            )
+            if vereinfachen:
+                proj = simplify_for_output(proj, units_per_px, toleranz_px, min_flaeche_px)
+            neben_proj.append(proj)
+        st.geo(neben_proj)
+
+    # Plotten
+    fig, _ = session.render(
+        haupt_proj,
+        neben_proj,
+        highlight_cfg,
+        config["farben"],
+        bbox,
+        breite_px,
+        hoehe_px,
+        src_crs=ziel_crs,
+        label_text=None,
+        scalebar_cfg=scalebar_cfg,
+        background_cfg=background_cfg,
+        linien_cfg=config.get("linien"),
+        render_cfg=config.get("render"),
+        choropleth_cfg=config.get("choropleth"),
+        grenzen=grenzen,
+    )
+    return fig
+
+
+def _sichtbare_nachbarn(neben, bbox, ziel_crs, config) -> list:
+    """
+    GeoDataFrames der Nachbarländer für eine Karte. LayerHandles, deren
+    Ausdehnung den Ausschnitt nicht berührt, bleiben ungelesen; die übrigen
+    werden parallel gelesen (config["nachbarn"]["worker"], 0 = automatisch).
+    """
+    handles = [n for n in neben if isinstance(n, LayerHandle) and extent_visible(n.extent, bbox, ziel_crs)]
+    if not handles:
+        return [n for n in neben if not isinstance(n, LayerHandle)]
+    with get_profiler().stage("nachbarn_laden", anzahl=len(handles)):
+        geladen = dict(zip(map(id, handles), load_all(handles, config.get("nachbarn", {}).get("worker") or None)))
+    result = []
+    for n in neben:
+        if not isinstance(n, LayerHandle):
+            result.append(n)
+        elif id(n) in geladen:
+            result.append(geladen[id(n)])
+    return result
@@ -1,14 +1,225 @@
+import gzip
+import io
 import os
 import logging
 import matplotlib.pyplot as plt
 from datetime import datetime
 from scalebar import add_scalebar
+from renderer import add_lines, add_polygons, geopandas_aspect
+from styling import feature_styles
+from profiling import get_profiler
+from encoding import RASTER_FORMATE, encode_raster, render_rgba, vorschau_breiten, vorschau_pfad
+from svg_export import set_regionen, write_svg
 
 logger = logging.getLogger("mymaptool.plotting")
 
 def pixel_to_pt(pixel, dpi):
     return pixel * 72 / dpi
 
+class RenderSession:
+    """
+    Hält eine Figure samt Achse über mehrere Karten hinweg (alle CRS
+    einer Region, im Batch auch über Jobs). Zwischen zwei Karten werden
+    nur die gezeichneten Artists, Achsengrenzen, Hintergrund und Scalebar
+    getauscht; Figure, Canvas und Text-/Font-Setup bleiben erhalten.
+    pyplot=False legt die Figure ohne pyplot an (Agg-Canvas); so kann
+    jeder Thread eine eigene Session benutzen (Render-Dienst).
+    """
+
+    def __init__(self, dpi: int = 600, pyplot: bool = True):
+        self.dpi = dpi
+        self.pyplot = pyplot
+        self.fig = None
+        self.ax = None
+        self.karten = 0
+        self._hauptland = None
+        self._haupt_artists = []
+        self._overlay = []
+
+    def _prepare(self, width_px: int, height_px: int):
+        figsize = (width_px / self.dpi, height_px / self.dpi)
+        if self.fig is None:
+            if self.pyplot:
+                self.fig, self.ax = plt.subplots(figsize=figsize, dpi=self.dpi)
+            else:
+                from matplotlib.figure import Figure
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                self.fig = Figure(figsize=figsize, dpi=self.dpi)
+                FigureCanvasAgg(self.fig)
+                self.ax = self.fig.add_subplot()
+            return
+        if tuple(self.fig.get_size_inches()) != figsize:
+            self.fig.set_size_inches(*figsize)
+        self.reset()
+
+    def reset(self):
+        """Entfernt alle Karteninhalte der vorigen Karte."""
+        ax = self.ax
+        for artist in [*ax.collections, *ax.lines, *ax.texts, *ax.patches, *ax.images]:
+            artist.remove()
+        ax.set_aspect("auto")
+        ax.ignore_existing_data_limits = True
+        self._hauptland = None
+        self._haupt_artists = []
+        self._overlay = []
+
+    def render(
+        self,
+        haupt_gdf,
+        neben_gdfs,
+        highlight_cfg: dict,
+        colors: dict,
+        bbox: tuple,
+        width_px: int,
+        height_px: int,
+        src_crs,
+        label_text: str = None,
+        scalebar_cfg: dict = None,
+        background_cfg: dict = None,
+        linien_cfg: dict = None,
+        render_cfg: dict = None,
+        choropleth_cfg: dict = None,
+        grenzen=None,
+    ):
+        """
+        Zeichnet eine Karte in die (wiederverwendete) Figure. Rückgabe: (fig, ax).
+        grenzen: Grenzlinien des Hauptlands aus der Topologie
+        (data_processing.topology.Grenzen); das Hauptland wird dann ohne
+        Konturen gefüllt und jede Grenze einmal als Linie gezeichnet.
+        """
+        with get_profiler().stage("zeichnen") as st:
+            st.geo(haupt_gdf, "haupt_")
+            st.geo(list(neben_gdfs), "neben_")
+            return self._render(
+                haupt_gdf, neben_gdfs, highlight_cfg, colors, bbox, width_px, height_px,
+                src_crs, label_text, scalebar_cfg, background_cfg, linien_cfg, render_cfg,
+                choropleth_cfg, grenzen,
+            )
+
+    def _render(
+        self, haupt_gdf, neben_gdfs, highlight_cfg, colors, bbox, width_px, height_px,
+        src_crs, label_text, scalebar_cfg, background_cfg, linien_cfg, render_cfg,
+        choropleth_cfg, grenzen=None,
+    ):
+        # Artists werden hier nur angelegt; gerastert wird erst beim Export (save_map)
+        self._prepare(width_px, height_px)
+        fig, ax, dpi = self.fig, self.ax, self.dpi
+
+        # Hintergrund
+        if background_cfg:
+            bg_color  = background_cfg.get("color", "#2896BA")
+            bg_transp = background_cfg.get("transparent", False)
+        else:
+            bg_color  = "none"
+            bg_transp = True
+
+        fig.patch.set_facecolor(bg_color)
+        ax.set_facecolor(bg_color)
+        fig.patch.set_alpha(0 if bg_transp else 1)
+        ax.patch.set_alpha(0 if bg_transp else 1)
+
+        # Linienstärken auslesen (in Pixeln, umgerechnet in pt)
+        if linien_cfg:
+            linewidth_grenze = pixel_to_pt(linien_cfg.get("grenze_px", 1), dpi)
+            linewidth_highlight = pixel_to_pt(linien_cfg.get("highlight_px", 1), dpi)
+        else:
+            linewidth_grenze = pixel_to_pt(1, dpi)
+            linewidth_highlight = pixel_to_pt(1, dpi)
+        logger.debug("Linienstärken (pt): Grenze=%.2f, Highlight=%.2f", linewidth_grenze, linewidth_highlight)
+
+        # Nebenländer, darüber das Hauptland (siehe hervorheben)
+        render_cfg = render_cfg or {}
+        if render_cfg.get("engine", "geopandas") == "batched":
+            _draw_nachbarn_batched(ax, neben_gdfs, colors, linewidth_grenze,
+                                   zusammenfassen=render_cfg.get("zusammenfassen", False))
+        else:
+            _draw_nachbarn_geopandas(ax, neben_gdfs, colors, linewidth_grenze)
+        self._hauptland = {
+            "gdf": haupt_gdf, "colors": colors, "linewidths": (linewidth_grenze, linewidth_highlight),
+            "render_cfg": render_cfg, "choropleth_cfg": choropleth_cfg, "grenzen": grenzen,
+        }
+        self.hervorheben(highlight_cfg)
+
+        # Bounding Box und Achsen
+        xmin, xmax, ymin, ymax = bbox
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+        ax.axis("off")
+
+        # Scalebar
+        vorher = {id(a) for a in ax.get_children()}
+        if scalebar_cfg and scalebar_cfg.get("show", False):
+            extent = [*ax.get_xlim(), *ax.get_ylim()]
+
+            # src_crs kommt als Parameter herein,
+            # label_text ist optional (None → automatische Label-Erzeugung)
+            add_scalebar(
+                ax,
+                extent,
+                src_crs,
+                label=label_text,
+                cfg=scalebar_cfg
+            )
+        self._overlay = [a for a in ax.get_children() if id(a) not in vorher]
+
+        self.karten += 1
+        return fig, ax
+
+    def hervorheben(self, highlight_cfg: dict) -> list:
+        """
+        Zeichnet das Hauptland der aktuellen Karte (neu) mit den Stilen für
+        highlight_cfg: Füllfarbe und Linienstärke je Feature (Hervorhebung,
+        Choropleth), ggf. die Grenzlinien der Topologie. Nachbarländer,
+        Achsen und Scalebar bleiben unverändert – so entstehen die Karten
+        eines Atlas aus einer einzigen vorbereiteten Karte.
+        Rückgabe: die Artists des Hauptlands.
+        """
+        ax = self.ax
+        for artist in self._haupt_artists:
+            artist.remove()
+        h = self._hauptland
+        linewidth_grenze, linewidth_highlight = h["linewidths"]
+        styles = feature_styles(
+            h["gdf"], highlight_cfg, h["colors"], linewidth_grenze, linewidth_highlight, h["choropleth_cfg"],
+        )
+        grenzen = h["grenzen"]
+        if grenzen is not None:
+            face, widths, order = styles
+            styles = (face, widths * 0, order)
+
+        anzahl = len(ax.collections)
+        if h["render_cfg"].get("engine", "geopandas") == "batched":
+            _draw_hauptland_batched(ax, h["gdf"], styles, h["colors"],
+                                    zusammenfassen=h["render_cfg"].get("zusammenfassen", False))
+        else:
+            _draw_hauptland_geopandas(ax, h["gdf"], styles, h["colors"])
+        if grenzen is not None:
+            add_lines(ax, grenzen.arcs, h["colors"]["grenze"], grenzen.linewidths(widths), gid="grenzen")
+        self._haupt_artists = list(ax.collections[anzahl:])
+        return self._haupt_artists
+
+    def vordergrund(self) -> list:
+        """
+        Artists, die über den Nachbarländern liegen (Hauptland, Grenzlinien,
+        Scalebar), in Zeichenreihenfolge – alles, was sich zwischen den
+        Karten eines Atlas ändert (encoding.Grundbild).
+        """
+        eigene = {id(a) for a in [*self._haupt_artists, *self._overlay]}
+        kinder = [a for a in self.ax.get_children() if id(a) in eigene]
+        return sorted(kinder, key=lambda a: a.get_zorder())
+
+    def close(self):
+        if self.fig is not None and self.pyplot:
+            plt.close(self.fig)
+        self.fig = self.ax = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 def plot_map(
     haupt_gdf,
     neben_gdfs,
@@ -21,108 +232,91 @@ def plot_map(
     label_text: str = None,
     scalebar_cfg: dict = None,
     background_cfg: dict = None,
-    linien_cfg: dict = None  # 👈 NEU: Linienkonfiguration
+    linien_cfg: dict = None,  # 👈 NEU: Linienkonfiguration
+    render_cfg: dict = None,
+    choropleth_cfg: dict = None,
 ):
-    dpi     = 600
-    figsize = (width_px / dpi, height_px / dpi)
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    """Einzelne Karte in einer eigenen Figure (save_map schließt sie wieder)."""
+    return RenderSession().render(
+        haupt_gdf, neben_gdfs, highlight_cfg, colors, bbox, width_px, height_px,
+        src_crs, label_text=label_text, scalebar_cfg=scalebar_cfg,
+        background_cfg=background_cfg, linien_cfg=linien_cfg, render_cfg=render_cfg,
+        choropleth_cfg=choropleth_cfg,
+    )
 
-    # Hintergrund
-    if background_cfg:
-        bg_color  = background_cfg.get("color", "#2896BA")
-        bg_transp = background_cfg.get("transparent", False)
-    else:
-        bg_color  = "none"
-        bg_transp = True
-
-    fig.patch.set_facecolor(bg_color)
-    ax.set_facecolor(bg_color)
-    fig.patch.set_alpha(0 if bg_transp else 1)
-    ax.patch.set_alpha(0 if bg_transp else 1)
-
-    # Linienstärken auslesen (in Pixeln, umgerechnet in pt)
-    if linien_cfg:
-        linewidth_grenze = pixel_to_pt(linien_cfg.get("grenze_px", 1), dpi)
-        linewidth_highlight = pixel_to_pt(linien_cfg.get("highlight_px", 1), dpi)
-    else:
-        linewidth_grenze = pixel_to_pt(1, dpi)
-        linewidth_highlight = pixel_to_pt(1, dpi)
-    logger.debug(f"Linienstärken (pt): Grenze={linewidth_grenze:.2f}, Highlight={linewidth_highlight:.2f}")
+def _markiere_hauptland(collection, geoms, haupt_gdf):
+    """Gruppen-Id und NAME_1 je Path für den SVG-Export."""
+    collection.set_gid("hauptland")
+    if "NAME_1" in haupt_gdf.columns:
+        set_regionen(collection, geoms, haupt_gdf["NAME_1"].to_numpy())
 
 
-    # Nebenländer
+def _draw_nachbarn_geopandas(ax, neben_gdfs, colors, linewidth_grenze):
+    """Zeichnen über GeoDataFrame.plot (ein Patch je Polygon): Nebenländer."""
     for g in neben_gdfs:
+        anzahl = len(ax.collections)
         g.plot(
             ax=ax,
             color=colors["nebenland"],
             edgecolor=colors["grenze"],
             linewidth=linewidth_grenze
         )
+        if len(ax.collections) > anzahl:
+            ax.collections[-1].set_gid("nachbarland")
 
-    # Hauptland
-    haupt_gdf.plot(
-        ax=ax,
-        color=colors["hauptland"],
-        edgecolor=colors["grenze"],
-        linewidth=linewidth_grenze
-    )
 
-    # Hervorhebung
-    if highlight_cfg.get("aktiv") and highlight_cfg.get("namen"):
-        mask = haupt_gdf["NAME_1"].isin(highlight_cfg["namen"])
-        haupt_gdf[mask].plot(
+def _draw_hauptland_geopandas(ax, haupt_gdf, styles, colors):
+    """Zeichnen über GeoDataFrame.plot: Hauptland, jedes Feature einmal mit seinem Stil."""
+    face, widths, order = styles
+    if order is not None:
+        haupt_gdf, face, widths = haupt_gdf.iloc[order], face[order], widths[order]
+    if not haupt_gdf.empty:
+        haupt_gdf.plot(
             ax=ax,
-            color=colors["highlight"],
+            color=list(face),
             edgecolor=colors["grenze"],
-            linewidth=linewidth_highlight
+            linewidth=widths,
         )
+        _markiere_hauptland(ax.collections[-1], haupt_gdf.geometry.array, haupt_gdf)
 
-    # Bounding Box und Achsen
-    xmin, xmax, ymin, ymax = bbox
-    ax.set_xlim(xmin, xmax)
-    ax.set_ylim(ymin, ymax)
-    ax.axis("off")
-
-    # Scalebar
-    if scalebar_cfg and scalebar_cfg.get("show", False):
-        extent = [*ax.get_xlim(), *ax.get_ylim()]
-
-    # src_crs kommt als Parameter in plot_map rein,
-    # label_text ist optional (None → automatische Label-Erzeugung)
-    add_scalebar(
-        ax,
-        extent,
-        src_crs,
-        label=label_text
-    )
-
-    return fig, ax
 
-def save_map(
-    fig,
-    output_dir: str,
-    region: str,
-    crs: str,
-    width_px: int,
-    height_px: int,
-    export_formats: set[str] = {"png"},
-    background_cfg: dict = None
-):
+def _draw_nachbarn_batched(ax, neben_gdfs, colors, linewidth_grenze, zusammenfassen=False):
     """
-    Speichert die Karte in exakt den Pixelmaßen (width_px × height_px),
-    ohne äußere Ränder, im angegebenen Ausgabeordner.
-
-    Dateiname: {region}_{crs}_{timestamp}.{ext}
+    Zeichnen ohne GeoDataFrame.plot: je Stilgruppe eine PathCollection,
+    direkt aus den Koordinaten-Arrays gebaut (gleiche Reihenfolge und
+    Stile wie _draw_nachbarn_geopandas bzw. _draw_hauptland_geopandas).
     """
+    for g in neben_gdfs:
+        add_polygons(ax, g.geometry.array, colors["nebenland"],
+                     colors["grenze"], linewidth_grenze, zusammenfassen, gid="nachbarland")
 
-    # Timestamp und Basis-Pfad
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    base = f"{region}_{crs.replace(':','_')}_{timestamp}"
 
+def _draw_hauptland_batched(ax, haupt_gdf, styles, colors, zusammenfassen=False):
+    """Wie _draw_nachbarn_batched, für das Hauptland (jedes Feature einmal mit seinem Stil)."""
+    face, widths, order = styles
+    geoms = haupt_gdf.geometry.array
+    if order is not None:
+        geoms, face, widths = geoms[order], face[order], widths[order]
+    collection = add_polygons(ax, geoms, face, colors["grenze"], widths, zusammenfassen)
+    if collection is not None:
+        _markiere_hauptland(collection, geoms, haupt_gdf if order is None else haupt_gdf.iloc[order])
+
+    # Seitenverhältnis wie bei GeoDataFrame.plot
+    ax.set_aspect(geopandas_aspect(haupt_gdf))
+
+
+def _prepare_export(fig, width_px: int, height_px: int, background_cfg: dict = None):
+    """
+    Bringt die Figure auf exakt width_px × height_px (ohne Ränder).
+    Rückgabe: (bbox_inches für savefig, transparent).
+    """
     # Konstantes DPI
     dpi = 600
 
     # Figure-Größe in Zoll so setzen, dass dpi * Zoll = gewünschte Pixelgröße
+    # (auch der Agg-Puffer entsteht mit diesem DPI)
+    if fig.dpi != dpi:
+        fig.set_dpi(dpi)
     fig.set_size_inches(width_px / dpi, height_px / dpi)
 
     # Subplots so strecken, dass Achsen exakt die Figure füllen
@@ -143,31 +337,164 @@ def save_map(
         transparent = background_cfg.get("transparent", False)
     else:
         transparent = True
+    return bbox_inches, transparent
 
-    # Schleife über die gewünschten Formate
-    for ext in export_formats:
-        filepath = os.path.join(output_dir, f"{base}.{ext}")
-
-        if ext.lower() == "png":
-            fig.savefig(
-                filepath,
-                dpi=dpi,
-                transparent=transparent,
-                bbox_inches=bbox_inches,
-                pad_inches=0
-            )
-        elif ext.lower() == "svg":
-            fig.savefig(
-                filepath,
-                format="svg",
-                bbox_inches=bbox_inches,
-                pad_inches=0
-            )
+
+def _savefig(fig, target, ext: str, bbox_inches, width_px: int, height_px: int,
+             transparent: bool, svg_cfg: dict = None) -> bool:
+    """
+    Schreibt die Figure als Vektorgrafik ext nach target (Pfad oder Datei-Objekt).
+    svg mit svg_cfg["kompakt"] und svgz über den kompakten Writer (svg_export).
+    False bei unbekanntem Format.
+    """
+    svg_cfg = svg_cfg or {}
+    if ext == "svgz" or (ext == "svg" and svg_cfg.get("kompakt", False)):
+        if write_svg(fig, target, width_px, height_px, transparent,
+                     nachkommastellen=svg_cfg.get("nachkommastellen", 1),
+                     komprimieren=ext == "svgz"):
+            return True
+        logger.debug("Kompakter SVG-Writer deckt die Figure nicht ab – savefig")
+    if ext == "svg":
+        fig.savefig(
+            target,
+            format="svg",
+            bbox_inches=bbox_inches,
+            pad_inches=0
+        )
+    elif ext == "svgz":
+        buf = io.BytesIO()
+        fig.savefig(buf, format="svg", bbox_inches=bbox_inches, pad_inches=0)
+        daten = gzip.compress(buf.getvalue(), compresslevel=6, mtime=0)
+        if hasattr(target, "write"):
+            target.write(daten)
         else:
-            logger.warning(f"Unbekanntes Format '{ext}' – übersprungen.")
+            with open(target, "wb") as f:
+                f.write(daten)
+    else:
+        return False
+    return True
+
+
+def figure_bytes(fig, ext: str, width_px: int, height_px: int, background_cfg: dict = None,
+                 export_cfg: dict = None) -> bytes:
+    """Wie save_map, aber für ein Format und in den Speicher (Render-Dienst)."""
+    ext = ext.lower()
+    bbox_inches, transparent = _prepare_export(fig, width_px, height_px, background_cfg)
+    buf = io.BytesIO()
+    profiler = get_profiler()
+    if ext in RASTER_FORMATE:
+        with profiler.stage("rastern"):
+            rgba = render_rgba(fig, width_px, height_px, transparent)
+        with profiler.stage("kodieren", format=ext) as st:
+            encode_raster(rgba, ext, buf, export_cfg, background_cfg)
+            st.set(bytes=buf.tell())
+        return buf.getvalue()
+    with profiler.stage("savefig", format=ext) as st:
+        if not _savefig(fig, buf, ext, bbox_inches, width_px, height_px, transparent,
+                        (export_cfg or {}).get("svg")):
+            raise ValueError(f"Unbekanntes Format '{ext}'")
+        st.set(bytes=buf.tell())
+    return buf.getvalue()
+
+
+def _write_raster(rgba, ext: str, filepath: str, export_cfg, background_cfg, breiten, on_written):
+    """Kodiert eine Rasterkarte samt Vorschaubildern (auch im Hintergrund-Thread)."""
+    profiler = get_profiler()
+    with profiler.stage("kodieren", format=ext) as st:
+        encode_raster(rgba, ext, filepath, export_cfg, background_cfg)
+        if profiler.aktiv:
+            st.set(bytes=os.path.getsize(filepath))
+    for breite in breiten:
+        with profiler.stage("kodieren", format=ext, breite=breite):
+            encode_raster(rgba, ext, vorschau_pfad(filepath, breite), export_cfg, background_cfg, breite)
+    logger.info("Karte gespeichert: %s", filepath)
+    if on_written is not None:
+        on_written(ext, filepath)
+
+
+def save_map(
+    fig,
+    output_dir: str,
+    region: str,
+    crs: str,
+    width_px: int,
+    height_px: int,
+    export_formats: set[str] = {"png"},
+    background_cfg: dict = None,
+    close: bool = True,
+    basename: str = None,
+    export_cfg: dict = None,
+    encoder=None,
+    on_written=None,
+    grundbild=None,
+) -> dict:
+    """
+    Speichert die Karte in exakt den Pixelmaßen (width_px × height_px),
+    ohne äußere Ränder, im angegebenen Ausgabeordner.
+    close=False lässt die Figure offen (RenderSession).
+
+    Rasterformate (png, webp, jpg) werden einmal gerastert und aus
+    demselben RGBA-Puffer kodiert, samt Vorschaubildern
+    {basename}_{breite}px.{ext} (export_cfg = config["export"]);
+    nur Vektorformate zeichnet matplotlib eigens; svg mit
+    export_cfg["svg"]["kompakt"] und svgz (gzip) entstehen über den
+    kompakten SVG-Writer (svg_export.write_svg).
+    Mit encoder (encoding.BackgroundEncoder) wird im Hintergrund kodiert –
+    die Dateien liegen dann erst nach encoder.wait() vor.
+    on_written(ext, pfad) wird je fertig geschriebener Karte aufgerufen.
+    Mit grundbild (encoding.Grundbild) wird nur der Vordergrund neu
+    gerastert (Atlas).
+
+    Dateiname: {basename}.{ext}, ohne basename {region}_{crs}_{timestamp}.{ext}
+    Rückgabe: {Format: Pfad} der (ggf. noch im Hintergrund) geschriebenen Dateien.
+    """
+
+    # Timestamp und Basis-Pfad
+    if basename is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        basename = f"{region}_{crs.replace(':','_')}_{timestamp}"
+
+    bbox_inches, transparent = _prepare_export(fig, width_px, height_px, background_cfg)
+
+    profiler = get_profiler()
+    geschrieben = {}
+
+    # Rasterformate: ein Zeichenvorgang, dann Kodieren aus dem Puffer
+    raster = [ext for ext in export_formats if ext.lower() in RASTER_FORMATE]
+    if raster:
+        with profiler.stage("rastern"):
+            rastern = grundbild.render_rgba if grundbild is not None else render_rgba
+            rgba = rastern(fig, width_px, height_px, transparent)
+        breiten = vorschau_breiten(export_cfg, width_px)
+        for ext in raster:
+            filepath = os.path.join(output_dir, f"{basename}.{ext}")
+            args = (rgba, ext.lower(), filepath, export_cfg, background_cfg, breiten, on_written)
+            if encoder is not None:
+                encoder.submit(_write_raster, *args)
+            else:
+                _write_raster(*args)
+            geschrieben[ext] = filepath
+
+    # Vektorformate
+    for ext in export_formats:
+        if ext in geschrieben:
             continue
+        filepath = os.path.join(output_dir, f"{basename}.{ext}")
+
+        with profiler.stage("savefig", format=ext.lower()) as st:
+            if not _savefig(fig, filepath, ext.lower(), bbox_inches, width_px, height_px,
+                            transparent, (export_cfg or {}).get("svg")):
+                logger.warning(f"Unbekanntes Format '{ext}' – übersprungen.")
+                continue
+            if profiler.aktiv:
+                st.set(bytes=os.path.getsize(filepath))
 
-        logger.info(f"Karte gespeichert: {filepath}")
+        geschrieben[ext] = filepath
+        logger.info("Karte gespeichert: %s", filepath)
+        if on_written is not None:
+            on_written(ext, filepath)
 
     # Aufräumen
-    plt.close(fig)
\ No newline at end of file
+    if close:
+        plt.close(fig)
+    return geschrieben
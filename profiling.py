@@ -0,0 +1,228 @@
+# profiling.py
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("mymaptool.profiling")
+
+
+def rss_mb():
+    """(aktuelle RSS, Spitzen-RSS des Prozesses) in MB; None, wo nicht ermittelbar."""
+    current = peak = None
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        current = info.rss / 1e6
+        peak = getattr(info, "peak_wset", None)  # Windows
+        peak = peak / 1e6 if peak else None
+    except ImportError:
+        try:
+            with open("/proc/self/statm") as f:
+                current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+        except (OSError, ValueError, AttributeError):
+            pass
+    if peak is None:
+        try:
+            import resource
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux: KiB, macOS: Byte
+            peak = rss / 1e6 if sys.platform == "darwin" else rss * 1024 / 1e6
+        except ImportError:
+            pass
+    if peak is not None and current is not None:
+        peak = max(peak, current)
+    return current, peak
+
+
+def geo_counts(gdfs) -> Dict[str, int]:
+    """Anzahl Features und Stützpunkte eines GeoDataFrames oder einer Liste davon."""
+    import shapely
+    if not isinstance(gdfs, (list, tuple)):
+        gdfs = [gdfs]
+    features = vertices = 0
+    for g in gdfs:
+        features += len(g)
+        vertices += int(shapely.get_num_coordinates(g.geometry.array).sum())
+    return {"features": features, "vertices": vertices}
+
+
+class StageRecord:
+    """Messwerte einer Stufe; Zusatzangaben per geo()/set()."""
+
+    def __init__(self, fields: Dict[str, object]):
+        self.fields = fields
+
+    def geo(self, gdfs, prefix: str = ""):
+        for k, v in geo_counts(gdfs).items():
+            self.fields[f"{prefix}{k}"] = self.fields.get(f"{prefix}{k}", 0) + v
+
+    def set(self, **kwargs):
+        self.fields.update(kwargs)
+
+
+class _NullRecord:
+    def geo(self, gdfs, prefix: str = ""):
+        pass
+
+    def set(self, **kwargs):
+        pass
+
+
+_NULL_RECORD = _NullRecord()
+
+
+class Profiler:
+    """
+    Misst Pipeline-Stufen (Wall- und CPU-Zeit, RSS, Feature-/Stützpunktzahlen,
+    Ausgabegröße) und schreibt je Stufe eine Zeile JSON in path.
+    Verschachtelte Stufen erhalten einen Pfad (z. B. "karte/zeichnen").
+    Mit cprofile_stufe wird genau diese Stufe (alle Vorkommen) zusätzlich
+    mit cProfile erfasst und bei close() als pstats-Datei gespeichert.
+    Ohne path und cprofile_stufe ist der Profiler inaktiv und kostet nichts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        cprofile_stufe: Optional[str] = None,
+        cprofile_path: Optional[str] = None,
+    ):
+        self.path = path
+        self.cprofile_stufe = cprofile_stufe
+        self.cprofile_path = cprofile_path or (
+            f"profil_{cprofile_stufe}.pstats" if cprofile_stufe else None
+        )
+        self.aktiv = bool(path or cprofile_stufe)
+        self.lauf = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.records: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cprofile = None
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def from_config(cls, config: dict, base_dir: str, path=None, cprofile_stufe=None) -> "Profiler":
+        """
+        config["profil"] (aktiv, datei, cprofile_stufe, cprofile_datei),
+        path/cprofile_stufe (Kommandozeile) haben Vorrang.
+        """
+        cfg = config.get("profil", {})
+        if path is None and cfg.get("aktiv", False):
+            path = cfg.get("datei", "profil.jsonl")
+        cprofile_stufe = cprofile_stufe or cfg.get("cprofile_stufe")
+        cprofile_path = cfg.get("cprofile_datei") or (
+            f"profil_{cprofile_stufe}.pstats" if cprofile_stufe else None
+        )
+        if path and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        if cprofile_path and not os.path.isabs(cprofile_path):
+            cprofile_path = os.path.join(base_dir, cprofile_path)
+        return cls(path, cprofile_stufe, cprofile_path)
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        if not self.aktiv:
+            yield _NULL_RECORD
+            return
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        record = StageRecord({"lauf": self.lauf, "stufe": name, "pfad": "/".join(stack), **fields})
+
+        prof = None
+        if name == self.cprofile_stufe:
+            with self._lock:
+                if self._cprofile is None:
+                    import cProfile
+                    self._cprofile = cProfile.Profile()
+                prof = self._cprofile
+            try:
+                prof.enable()
+            except ValueError:  # bereits aktiv (parallele Stufe)
+                prof = None
+
+        rss_vorher, _ = rss_mb()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        record.fields["start"] = datetime.now().isoformat(timespec="milliseconds")
+        ok = False
+        try:
+            yield record
+            ok = True
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            if prof is not None:
+                prof.disable()
+            stack.pop()
+            rss, rss_peak = rss_mb()
+            record.fields.update({
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "rss_mb": None if rss is None else round(rss, 1),
+                "rss_delta_mb": None if rss is None or rss_vorher is None else round(rss - rss_vorher, 1),
+                "rss_peak_mb": None if rss_peak is None else round(rss_peak, 1),
+                "ok": ok,
+            })
+            self._emit(record.fields)
+
+    def _emit(self, fields: Dict[str, object]):
+        with self._lock:
+            self.records.append(fields)
+            if self._file is not None:
+                self._file.write(json.dumps(fields, ensure_ascii=False, default=str) + "\n")
+                self._file.flush()
+
+    def summary(self) -> List[Dict[str, object]]:
+        """Summen je Stufenpfad: Anzahl, Wall-/CPU-Zeit (absteigend nach Wall-Zeit)."""
+        agg: Dict[str, Dict[str, object]] = {}
+        with self._lock:
+            for r in self.records:
+                a = agg.setdefault(r["pfad"], {"pfad": r["pfad"], "anzahl": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                a["anzahl"] += 1
+                a["wall_s"] += r["wall_s"]
+                a["cpu_s"] += r["cpu_s"]
+        return sorted(agg.values(), key=lambda a: -a["wall_s"])
+
+    def close(self):
+        if not self.aktiv:
+            return
+        for a in self.summary():
+            logger.info(
+                f"Profil: {a['wall_s']:8.3f} s wall, {a['cpu_s']:8.3f} s CPU, "
+                f"{a['anzahl']:4d}×  {a['pfad']}"
+            )
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(self.cprofile_path)
+            logger.info(f"cProfile für Stufe '{self.cprofile_stufe}' gespeichert: {self.cprofile_path}")
+            self._cprofile = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Profil geschrieben: {self.path}")
+
+
+_PROFILER = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """Prozessweiter Profiler (standardmäßig inaktiv)."""
+    return _PROFILER
+
+
+def set_profiler(profiler: Profiler) -> Profiler:
+    global _PROFILER
+    _PROFILER = profiler
+    return profiler
@@ -0,0 +1,202 @@
+# renderer.py
+
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+import shapely
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+
+logger = logging.getLogger("mymaptool.renderer")
+
+_POLYGONAL = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+
+
+def _ring_signed_area(coords: np.ndarray, ring_offsets: np.ndarray) -> np.ndarray:
+    """Vorzeichenbehaftete Fläche je Ring (Shoelace), > 0 = gegen den Uhrzeigersinn."""
+    x, y = coords[:, 0], coords[:, 1]
+    cross = np.zeros(len(coords))
+    cross[:-1] = x[:-1] * y[1:] - x[1:] * y[:-1]
+    # das letzte Produkt jedes Rings würde in den nächsten Ring greifen
+    ends = ring_offsets[1:] - 1
+    cross[ends[ends >= 0]] = 0.0
+    starts = ring_offsets[:-1]
+    nonempty = ring_offsets[1:] > starts
+    area = np.zeros(len(starts))
+    if nonempty.any():
+        area[nonempty] = np.add.reduceat(cross, starts[nonempty]) / 2
+    return area
+
+
+def _oriented_arrays(geoms: Iterable):
+    """
+    Koordinaten und Path-Codes aller (Multi-)Polygone, direkt aus den
+    Ragged-Arrays von shapely. Ringe werden so orientiert (außen gegen,
+    Löcher im Uhrzeigersinn), dass die Nonzero-Füllregel von matplotlib
+    Löcher korrekt ausspart. Rückgabe: (coords, codes, Startindex je
+    Polygon, Index der Geometrie in geoms je Polygon) oder None, wenn
+    nichts zu zeichnen ist.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    keep = np.isin(shapely.get_type_id(geoms), _POLYGONAL) & ~shapely.is_empty(geoms)
+    keep_idx = np.flatnonzero(keep)
+    geoms = geoms[keep]
+    if len(geoms) == 0:
+        return None
+
+    typ, coords, offsets = shapely.to_ragged_array(geoms)
+    ring_offsets, polygon_offsets = offsets[0], offsets[1]
+    coords = np.ascontiguousarray(coords[:, :2], dtype=float)
+    n_rings = len(ring_offsets) - 1
+    if n_rings == 0 or len(coords) == 0:
+        return None
+
+    # erster Ring jedes Polygons ist die Außenhülle
+    exterior = np.zeros(n_rings, dtype=bool)
+    first = polygon_offsets[:-1]
+    exterior[first[first < n_rings]] = True
+
+    area = _ring_signed_area(coords, ring_offsets)
+    flip = np.where(exterior, area < 0, area > 0)
+    if flip.any():
+        starts = ring_offsets[:-1]
+        ends = ring_offsets[1:]
+        ring_of_vertex = np.repeat(np.arange(n_rings), ends - starts)
+        idx = np.arange(len(coords))
+        rev = starts[ring_of_vertex] + ends[ring_of_vertex] - 1 - idx
+        coords = coords[np.where(flip[ring_of_vertex], rev, idx)]
+
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    nonempty = ring_offsets[1:] > ring_offsets[:-1]
+    codes[ring_offsets[:-1][nonempty]] = Path.MOVETO
+    codes[ring_offsets[1:][nonempty] - 1] = Path.CLOSEPOLY
+
+    # Polygone ohne Koordinaten entfallen; Zuordnung Polygon → Geometrie
+    if typ == shapely.GeometryType.MULTIPOLYGON:
+        polygon_geom = np.repeat(np.arange(len(geoms)), np.diff(offsets[2]))
+    else:
+        polygon_geom = np.arange(len(polygon_offsets) - 1)
+    polygon_starts = ring_offsets[polygon_offsets[:-1]]
+    polygon_ends = ring_offsets[polygon_offsets[1:]]
+    filled = polygon_ends > polygon_starts
+    return coords, codes, polygon_starts[filled], keep_idx[polygon_geom[filled]]
+
+
+def polygons_to_path(geoms: Iterable) -> Optional[Path]:
+    """Alle Polygone als ein einziger zusammengesetzter Path."""
+    arrays = _oriented_arrays(geoms)
+    if arrays is None:
+        return None
+    coords, codes, _, _ = arrays
+    return Path(coords, codes)
+
+
+def polygons_to_paths(geoms: Iterable, return_index: bool = False):
+    """
+    Ein Path je Polygon (wie die Patches von GeoDataFrame.plot), als
+    Views auf gemeinsame Koordinaten-Arrays. Gezeichnet wird trotzdem
+    mit einem einzigen Collection-Aufruf.
+    return_index=True liefert zusätzlich je Path den Index der Geometrie
+    in geoms (für Stile je Feature).
+    """
+    arrays = _oriented_arrays(geoms)
+    if arrays is None:
+        return ([], np.empty(0, dtype=np.intp)) if return_index else []
+    coords, codes, polygon_starts, polygon_geom = arrays
+    splits = polygon_starts[1:]
+    paths = [Path(v, c) for v, c in zip(np.split(coords, splits), np.split(codes, splits))]
+    return (paths, polygon_geom) if return_index else paths
+
+
+def _uniform(values: np.ndarray):
+    """Der gemeinsame Wert, wenn alle Zeilen gleich sind, sonst None."""
+    if len(values) and (values == values[0]).all():
+        return values[0]
+    return None
+
+
+def add_polygons(
+    ax, geoms, facecolor, edgecolor, linewidth, zusammenfassen: bool = False, **kwargs
+) -> Optional[PathCollection]:
+    """
+    Zeichnet alle Polygone einer Stilgruppe als eine PathCollection.
+    facecolor und linewidth gelten entweder für die ganze Gruppe oder
+    je Geometrie (Arrays: n × 4 RGBA bzw. n Werte, siehe styling.py).
+    zusammenfassen=False: ein Path je Polygon, pixelgleich zu
+    GeoDataFrame.plot (Füllung und Kontur je Polygon abwechselnd).
+    zusammenfassen=True: ein einziger Path – am schnellsten, Konturen
+    liegen dann aber vollständig über allen Füllungen; nur bei
+    einheitlichem Stil möglich.
+    """
+    je_feature = {}
+    if isinstance(facecolor, np.ndarray) and facecolor.ndim == 2:
+        je_feature["facecolors"] = facecolor
+    if isinstance(linewidth, np.ndarray) and linewidth.ndim == 1:
+        je_feature["linewidths"] = linewidth
+    stile = {"facecolors": facecolor, "linewidths": linewidth}
+    for name, values in list(je_feature.items()):
+        gemeinsam = _uniform(values)
+        if gemeinsam is not None:
+            stile[name] = gemeinsam
+            del je_feature[name]
+
+    if zusammenfassen and not je_feature:
+        path = polygons_to_path(geoms)
+        paths = [path] if path is not None else []
+    else:
+        paths, polygon_geom = polygons_to_paths(geoms, return_index=True)
+        for name, values in je_feature.items():
+            stile[name] = values[polygon_geom]
+    if not paths:
+        return None
+    collection = PathCollection(
+        paths,
+        edgecolors=edgecolor,
+        **stile,
+        **kwargs,
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def add_lines(ax, lines: List[np.ndarray], color, linewidth, **kwargs) -> Optional[PathCollection]:
+    """
+    Zeichnet Linienzüge (Koordinaten-Arrays, k × 2) ohne Füllung: je
+    Linienstärke ein Path mit einem MOVETO je Linie. linewidth gilt für
+    alle Linien oder je Linie; stärkere Linien (Hervorhebung) liegen oben.
+    """
+    if not lines:
+        return None
+    widths = np.broadcast_to(np.asarray(linewidth, dtype=float), (len(lines),))
+    laengen = np.array([len(line) for line in lines])
+    coords = np.concatenate(lines)
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    codes[np.cumsum(laengen) - laengen] = Path.MOVETO
+    linie_von = np.repeat(np.arange(len(lines)), laengen)
+
+    stufen = np.unique(widths)
+    paths = []
+    for w in stufen:
+        maske = (widths == w)[linie_von]
+        paths.append(Path(coords[maske], codes[maske]))
+    collection = PathCollection(
+        paths,
+        facecolors="none",
+        edgecolors=color,
+        linewidths=stufen,
+        capstyle="round",
+        joinstyle="round",
+        **kwargs,
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def geopandas_aspect(gdf) -> object:
+    """Seitenverhältnis wie GeoDataFrame.plot (equal bzw. 1/cos(Breite) bei geografischem CRS)."""
+    if gdf.crs is not None and gdf.crs.is_geographic and not gdf.empty:
+        miny, maxy = gdf.total_bounds[[1, 3]]
+        y_coord = np.mean([miny, maxy])
+        return 1 / np.cos(y_coord * np.pi / 180)
+    return "equal"
@@ -2,8 +2,7 @@
 
 import numpy as np
 from matplotlib.transforms import blended_transform_factory
-from pyproj import CRS, Transformer
-from config import SCALER
+from data_processing.crs_registry import get_crs, get_transformer
 
 def pixel_to_pt(pixel, dpi):
     return pixel * 72 / dpi
@@ -19,23 +18,24 @@ def nice_number(x):
     else:        nice_f = 10
     return nice_f * 10**exp
 
-def add_scalebar(ax, extent, src_crs, label=None):
-    # scalebar‐Einstellungen aus Config
-    show            = SCALER.get("show", True)
-    length_fraction = SCALER.get("length_fraction", 0.05)
-    tick_fraction   = SCALER.get("tick_fraction", 0.02)
-    position        = SCALER.get("position", "bottom-left")
-    color           = SCALER.get("color", "white")
-    linewidth_px    = SCALER.get("linewidth_px", 1.5)
-    font_px         = SCALER.get("font_px", 8)
+def add_scalebar(ax, extent, src_crs, label=None, cfg=None):
+    # scalebar‐Einstellungen (config["scalebar"], ggf. je Karte überschrieben)
+    opts            = cfg or {}
+    show            = opts.get("show", True)
+    length_fraction = opts.get("length_fraction", 0.05)
+    tick_fraction   = opts.get("tick_fraction", 0.02)
+    position        = opts.get("position", "bottom-left")
+    color           = opts.get("color", "white")
+    linewidth_px    = opts.get("linewidth_px", 1.5)
+    font_px         = opts.get("font_px", 8)
 
     if not show:
         return
 
     # 1) Extent → Meter (EPSG:3857)
-    crs_obj = CRS.from_user_input(src_crs)
+    crs_obj = get_crs(src_crs)
     if crs_obj.is_geographic:
-        transformer = Transformer.from_crs(crs_obj, "EPSG:3857", always_xy=True)
+        transformer = get_transformer(crs_obj, "EPSG:3857")
         xmin, ymin = transformer.transform(extent[0], extent[2])
         xmax, ymax = transformer.transform(extent[1], extent[3])
     else:
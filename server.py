@@ -0,0 +1,377 @@
+# server.py
+
+import ipaddress
+import json
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from batch import resolve_job
+from io_utils import find_gpkg_files
+from layer_store import get_store
+from data_processing.layers import merge_hauptland_layers, filter_ausgeblendet
+from data_processing.reproj_cache import MemoryReprojCache
+from pipeline import render_figure
+from plotting import RenderSession, figure_bytes
+from styling import attribut_spalten
+
+logger = logging.getLogger("mymaptool.server")
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "svg": "image/svg+xml",
+}
+MAX_BODY = 1024 * 1024
+
+
+class Ueberlastet(Exception):
+    """Alle Worker belegt und Warteschlange voll."""
+
+
+class Metrics:
+    """Zähler und Latenzen (gleitendes Fenster) für /metrics, threadsicher."""
+
+    def __init__(self, fenster: int = 1000):
+        self._lock = threading.Lock()
+        self.start = time.time()
+        self.zaehler: Dict[str, int] = {"anfragen": 0, "ok": 0, "abgelehnt": 0, "fehler": 0, "timeout": 0}
+        self.wartend = 0
+        self.aktiv = 0
+        self._gesamt = deque(maxlen=fenster)
+        self._render = deque(maxlen=fenster)
+        self._warten = deque(maxlen=fenster)
+
+    def count(self, name: str):
+        with self._lock:
+            self.zaehler[name] = self.zaehler.get(name, 0) + 1
+
+    def queued(self, delta: int):
+        with self._lock:
+            self.wartend += delta
+
+    def started(self, warten_s: float):
+        with self._lock:
+            self.wartend -= 1
+            self.aktiv += 1
+            self._warten.append(warten_s)
+
+    def finished(self, render_s: float):
+        with self._lock:
+            self.aktiv -= 1
+            self._render.append(render_s)
+
+    def request_done(self, gesamt_s: float):
+        with self._lock:
+            self._gesamt.append(gesamt_s)
+
+    @staticmethod
+    def _perzentile(werte) -> Dict[str, Optional[float]]:
+        if not werte:
+            return {"anzahl": 0, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+        s = sorted(werte)
+
+        def p(q):
+            return round(s[min(len(s) - 1, int(q * len(s)))] * 1000, 1)
+
+        return {"anzahl": len(s), "p50_ms": p(0.5), "p90_ms": p(0.9), "p99_ms": p(0.99),
+                "max_ms": round(s[-1] * 1000, 1)}
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "laufzeit_s": round(time.time() - self.start, 1),
+                **self.zaehler,
+                "wartend": self.wartend,
+                "aktiv": self.aktiv,
+                "latenz_gesamt": self._perzentile(self._gesamt),
+                "latenz_render": self._perzentile(self._render),
+                "latenz_warteschlange": self._perzentile(self._warten),
+            }
+
+
+class RenderService:
+    """
+    Hält Layer und Reprojektionen zwischen Anfragen im Speicher und rendert
+    Karten in einem begrenzten Thread-Pool. Jeder Worker-Thread hat eine
+    eigene RenderSession (Figure ohne pyplot). Höchstens worker Anfragen
+    laufen gleichzeitig, weitere warteschlange Anfragen warten; darüber
+    hinaus wird sofort mit Ueberlastet abgelehnt (HTTP 503).
+    Nach timeout_s antwortet der Dienst mit 504; eine noch wartende Anfrage
+    wird dann verworfen (cancel), eine bereits laufende lässt sich nicht
+    abbrechen und belegt ihren Worker und Platz, bis sie fertig ist.
+    """
+
+    def __init__(self, config: dict, hauptland_dir: str, nebenlaender_dir: str, reproj_cache=None):
+        dcfg = config.get("dienst", {})
+        self.config = config
+        self.worker = int(dcfg.get("worker", 2))
+        self.warteschlange = int(dcfg.get("warteschlange", 8))
+        self.timeout_s = float(dcfg.get("timeout_s", 120))
+        self.max_px = int(dcfg.get("max_px", 10000))
+        self.cache = MemoryReprojCache(
+            max_bytes=int(dcfg.get("cache_mb", 512)) * 1024 * 1024, backend=reproj_cache,
+        )
+        self.metrics = Metrics()
+        self._pool = ThreadPoolExecutor(max_workers=self.worker, thread_name_prefix="render")
+        self._slots = threading.BoundedSemaphore(self.worker + self.warteschlange)
+        self._local = threading.local()
+        self._merged: Dict[Tuple[str, ...], object] = {}
+        self._merged_lock = threading.Lock()
+
+        # Daten einmal laden (bleiben für die Laufzeit des Dienstes im Speicher)
+        start = time.perf_counter()
+        self.haupt_gpkg_path, self.neben_gdfs = find_gpkg_files(
+            hauptland_dir, nebenlaender_dir, config.get("nebenlaender", []),
+        )
+        self._haupt(tuple(config.get("hauptland", [])))
+        logger.info(
+            f"Geodaten geladen in {time.perf_counter() - start:.2f} s "
+            f"({get_store().memory_bytes() / 1e6:.1f} MB)"
+        )
+
+    def _haupt(self, layers: Tuple[str, ...]):
+        with self._merged_lock:
+            if layers not in self._merged:
+                self._merged[layers] = merge_hauptland_layers(
+                    self.haupt_gpkg_path, list(layers), attribut_spalten(self.config),
+                    kompakt=self.config.get("daten", {}).get("kompakt", False),
+                )
+            return self._merged[layers]
+
+    def _session(self) -> RenderSession:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = RenderSession(pyplot=False)
+        return session
+
+    @staticmethod
+    def _normalize(request: dict) -> dict:
+        """Kurzformen: hervorhebung/ausblenden als Namensliste, crs als String, format statt formate."""
+        job = dict(request)
+        if isinstance(job.get("hervorhebung"), list):
+            job["hervorhebung"] = {"aktiv": True, "namen": job["hervorhebung"]}
+        if isinstance(job.get("ausblenden"), list):
+            job["ausblenden"] = {"aktiv": True, "bereiche": {"anfrage": job["ausblenden"]}}
+        if "format" in job:
+            job["formate"] = [job.pop("format")]
+        return job
+
+    def render(self, request: dict) -> Tuple[bytes, str]:
+        """Rendert eine Anfrage. Rückgabe: (Bilddaten, Content-Type). ValueError bei ungültiger Anfrage."""
+        if not isinstance(request, dict) or "region" not in request:
+            raise ValueError("Feld 'region' fehlt.")
+        job = resolve_job(self._normalize(request), self.config, 0)
+        if len(job["crs"]) != 1:
+            raise ValueError(
+                f"Genau ein CRS je Anfrage; Region {job['region']} hat mehrere "
+                f"({', '.join(job['crs'])}), Feld 'crs' angeben."
+            )
+        ziel_crs = job["crs"][0]
+        if len(job["formate"]) != 1:
+            raise ValueError("Genau ein Format je Anfrage.")
+        fmt = next(iter(job["formate"])).lower()
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unbekanntes Format '{fmt}'")
+        if not (0 < job["breite"] <= self.max_px and 0 < job["hoehe"] <= self.max_px):
+            raise ValueError(f"Größe außerhalb 1–{self.max_px} px.")
+
+        gdf_haupt, ausgeblendet = filter_ausgeblendet(self._haupt(tuple(job["hauptland"])), job["ausblenden"])
+        highlight_cfg = dict(job["hervorhebung"])
+        highlight_cfg["namen"] = [n for n in highlight_cfg.get("namen", []) if n not in ausgeblendet]
+        scalebar_cfg = {**self.config.get("scalebar", {}), **(job["scalebar"] or {})}
+
+        fig = render_figure(
+            gdf_haupt, self.neben_gdfs, ziel_crs, self.config, job["breite"], job["hoehe"],
+            highlight_cfg, scalebar_cfg, job["background"], self.cache, self._session(),
+        )
+        data = figure_bytes(
+            fig, fmt, job["breite"], job["hoehe"], job["background"], self.config.get("export"),
+        )
+        return data, CONTENT_TYPES[fmt]
+
+    def submit(self, request: dict) -> Future:
+        """Reiht eine Anfrage ein; Ueberlastet, wenn Worker und Warteschlange voll sind."""
+        if not self._slots.acquire(blocking=False):
+            raise Ueberlastet()
+        eingereiht = time.perf_counter()
+        self.metrics.queued(1)
+
+        def run():
+            self.metrics.started(time.perf_counter() - eingereiht)
+            start = time.perf_counter()
+            try:
+                return self.render(request)
+            finally:
+                self.metrics.finished(time.perf_counter() - start)
+
+        try:
+            future = self._pool.submit(run)
+        except Exception:
+            self.metrics.queued(-1)
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    def cancel(self, future: Future) -> bool:
+        """Verwirft eine noch wartende Anfrage (gibt ihren Platz frei); laufende rendern zu Ende."""
+        if future.cancel():
+            self.metrics.queued(-1)
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            **self.metrics.snapshot(),
+            "worker": self.worker,
+            "warteschlange": self.warteschlange,
+            "reproj_cache": {
+                "eintraege": len(self.cache),
+                "mb": round(self.cache.memory_bytes() / 1e6, 1),
+                "treffer": self.cache.hits,
+                "fehlzugriffe": self.cache.misses,
+            },
+            "layer_store_mb": round(get_store().memory_bytes() / 1e6, 1),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """POST /render (JSON → Bild), GET /metrics, GET /health."""
+
+    server_version = "mymaptool"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> RenderService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, data: dict, headers: Optional[dict] = None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._json(200, self.service.snapshot())
+        else:
+            self._json(404, {"fehler": "Unbekannter Pfad"})
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._json(404, {"fehler": "Unbekannter Pfad"})
+            return
+
+        service = self.service
+        metrics = service.metrics
+        start = time.perf_counter()
+        metrics.count("anfragen")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_BODY:
+                metrics.count("fehler")
+                self._json(413, {"fehler": "Anfrage zu groß"})
+                return
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError as e:
+                metrics.count("fehler")
+                self._json(400, {"fehler": f"Ungültiges JSON: {e}"})
+                return
+
+            try:
+                future = service.submit(request)
+            except Ueberlastet:
+                metrics.count("abgelehnt")
+                self._json(503, {"fehler": "Überlastet, später erneut versuchen"}, {"Retry-After": "1"})
+                return
+
+            try:
+                data, content_type = future.result(timeout=service.timeout_s)
+            except FutureTimeout:
+                metrics.count("timeout")
+                if not service.cancel(future):
+                    logger.warning(f"Anfrage nach {service.timeout_s:.0f} s noch in Arbeit, Worker bleibt belegt.")
+                self._json(504, {"fehler": f"Keine Antwort nach {service.timeout_s:.0f} s"})
+                return
+            except ValueError as e:
+                metrics.count("fehler")
+                self._json(400, {"fehler": str(e)})
+                return
+            except Exception as e:
+                logger.exception(f"Render-Anfrage fehlgeschlagen: {e}")
+                metrics.count("fehler")
+                self._json(500, {"fehler": str(e)})
+                return
+
+            metrics.count("ok")
+            dauer = time.perf_counter() - start
+            self._send(200, data, content_type, {"X-Render-Ms": f"{dauer * 1000:.0f}"})
+        finally:
+            metrics.request_done(time.perf_counter() - start)
+
+
+def _check_loopback(host: str):
+    """Der Dienst ist nur für lokale Werkzeuge gedacht – keine externen Adressen."""
+    try:
+        addr = ipaddress.ip_address(socket.gethostbyname(host))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Host {host} nicht auflösbar: {e}")
+    if not addr.is_loopback:
+        raise ValueError(f"Host {host} ({addr}) ist keine Loopback-Adresse; der Dienst läuft nur lokal.")
+
+
+def serve(
+    config: dict,
+    hauptland_dir: str,
+    nebenlaender_dir: str,
+    reproj_cache=None,
+    port: Optional[int] = None,
+    worker: Optional[int] = None,
+):
+    """Startet den Render-Dienst (blockiert bis Strg+C)."""
+    dcfg = config.setdefault("dienst", {})
+    if worker:
+        dcfg["worker"] = worker
+    host = dcfg.get("host", "127.0.0.1")
+    port = port or int(dcfg.get("port", 8765))
+    _check_loopback(host)
+
+    service = RenderService(config, hauptland_dir, nebenlaender_dir, reproj_cache)
+    httpd = ThreadingHTTPServer((host, port), RenderHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    logger.info(
+        f"Render-Dienst auf http://{host}:{httpd.server_address[1]} "
+        f"({service.worker} Worker, Warteschlange {service.warteschlange})"
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Render-Dienst wird beendet.")
+    finally:
+        httpd.server_close()
+        service.shutdown()
@@ -0,0 +1,134 @@
+# styling.py
+
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.colors import to_rgba, to_rgba_array
+
+from io_utils import ATTRIBUT_SPALTEN
+
+logger = logging.getLogger("mymaptool.styling")
+
+
+def attribut_spalten(config: dict) -> List[str]:
+    """Attributspalten des Hauptlands, die gelesen werden müssen (inkl. Choropleth-Spalte)."""
+    spalten = list(ATTRIBUT_SPALTEN)
+    cfg = config.get("choropleth") or {}
+    if cfg.get("aktiv"):
+        extra = cfg.get("schluessel", "NAME_1") if cfg.get("csv") else cfg.get("spalte")
+        if extra and extra not in spalten:
+            spalten.append(extra)
+    return spalten
+
+
+def choropleth_signatur(cfg: Optional[dict]) -> Optional[dict]:
+    """Choropleth-Einstellungen plus mtime der CSV (für Fingerabdrücke); None, wenn inaktiv."""
+    if not cfg or not cfg.get("aktiv"):
+        return None
+    signatur = dict(cfg)
+    if cfg.get("csv"):
+        try:
+            signatur["csv_mtime"] = os.path.getmtime(cfg["csv"])
+        except OSError:
+            signatur["csv_mtime"] = None
+    return signatur
+
+
+@lru_cache(maxsize=8)
+def _csv_tabelle(pfad: str, mtime: float, schluessel: str, spalte: str) -> pd.Series:
+    """CSV-Spalte als Series mit Index auf schluessel (mtime nur als Cache-Schlüssel)."""
+    df = pd.read_csv(pfad, usecols=[schluessel, spalte])
+    doppelt = df[schluessel].duplicated()
+    if doppelt.any():
+        logger.warning(
+            f"{pfad}: {int(doppelt.sum())} doppelte Werte in '{schluessel}' – es gilt der erste."
+        )
+        df = df[~doppelt]
+    return df.set_index(schluessel)[spalte]
+
+
+def choropleth_werte(haupt_gdf, cfg: dict) -> pd.Series:
+    """
+    Werte je Feature: aus der Spalte cfg["spalte"] des Hauptlands oder,
+    mit cfg["csv"], per indiziertem Join über cfg["schluessel"] (NAME_1).
+    """
+    spalte = cfg["spalte"]
+    pfad = cfg.get("csv")
+    if not pfad:
+        return haupt_gdf[spalte]
+    schluessel = cfg.get("schluessel", "NAME_1")
+    tabelle = _csv_tabelle(pfad, os.path.getmtime(pfad), schluessel, spalte)
+    werte = tabelle.reindex(haupt_gdf[schluessel].to_numpy())
+    werte.index = haupt_gdf.index
+    return werte
+
+
+def _choropleth_farben(werte: pd.Series, cfg: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """RGBA je Feature aus der Farbskala und Maske der Features mit Wert."""
+    cmap = colormaps[cfg.get("farbskala", "viridis")]
+    zahlen = pd.to_numeric(werte, errors="coerce")
+    vorhanden = werte.notna().to_numpy()
+    if zahlen.notna().sum() == vorhanden.sum():
+        # numerisch: linear zwischen min und max, optional in Klassen
+        x = zahlen.to_numpy(dtype=float)
+        vmin = cfg.get("min")
+        vmax = cfg.get("max")
+        # konfigurierte Grenzen gelten wie angegeben (auch 0)
+        if vmin is None:
+            vmin = np.nanmin(x) if vorhanden.any() else 0.0
+        if vmax is None:
+            vmax = np.nanmax(x) if vorhanden.any() else 1.0
+        norm = np.clip((x - vmin) / (vmax - vmin), 0.0, 1.0) if vmax > vmin else np.full(len(x), 0.5)
+        klassen = cfg.get("klassen")
+        if klassen and klassen > 1:
+            norm = np.minimum(np.floor(norm * klassen), klassen - 1) / (klassen - 1)
+    else:
+        # kategorial: eine Farbe je Wert (in Sortierreihenfolge)
+        codes, kategorien = pd.factorize(werte, sort=True)
+        norm = codes / max(len(kategorien) - 1, 1)
+    farben = cmap(np.nan_to_num(norm, nan=0.0))
+    return farben, vorhanden
+
+
+def feature_styles(
+    haupt_gdf,
+    highlight_cfg: Optional[dict],
+    colors: dict,
+    linewidth: float,
+    linewidth_highlight: float,
+    choropleth_cfg: Optional[dict] = None,
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Füllfarbe (n × 4 RGBA) und Linienstärke (n) je Feature des Hauptlands,
+    vektorisiert in einem Durchgang: Grundfarbe, darüber die Choropleth-
+    Farben (Features ohne Wert behalten die Grundfarbe bzw.
+    choropleth["fehlend"]), darüber die Hervorhebung.
+    Dritter Wert: Zeichenreihenfolge (Positionen, hervorgehobene Features
+    zuletzt, damit ihre Konturen oben liegen) oder None für die
+    ursprüngliche Reihenfolge.
+    """
+    n = len(haupt_gdf)
+    order = None
+    face = np.repeat(to_rgba_array(colors["hauptland"]), n, axis=0)
+    widths = np.full(n, float(linewidth))
+
+    if choropleth_cfg and choropleth_cfg.get("aktiv") and n:
+        farben, vorhanden = _choropleth_farben(choropleth_werte(haupt_gdf, choropleth_cfg), choropleth_cfg)
+        face[vorhanden] = farben[vorhanden]
+        if choropleth_cfg.get("fehlend"):
+            face[~vorhanden] = to_rgba(choropleth_cfg["fehlend"])
+        logger.debug("Choropleth: %d von %d Features mit Wert", vorhanden.sum(), n)
+
+    if highlight_cfg and highlight_cfg.get("aktiv") and highlight_cfg.get("namen") and n:
+        mask = haupt_gdf["NAME_1"].isin(highlight_cfg["namen"]).to_numpy()
+        face[mask] = to_rgba(colors["highlight"])
+        widths[mask] = linewidth_highlight
+        if mask.any():
+            order = np.argsort(mask, kind="stable")
+
+    return face, widths, order
@@ -0,0 +1,361 @@
+# svg_export.py
+
+import gzip
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+import shapely
+from matplotlib.collections import Collection
+from matplotlib.colors import to_hex, to_rgba
+from matplotlib.lines import Line2D
+from matplotlib.path import Path
+from matplotlib.text import Text
+
+logger = logging.getLogger("mymaptool.svg_export")
+
+# Attribut einer Collection mit dem NAME_1 je Path (→ stabile Element-Ids)
+REGIONEN_ATTR = "_mymaptool_regionen"
+
+_CAPSTYLE = {"butt": "butt", "projecting": "square", "round": "round"}
+_ANCHOR = {"left": "start", "center": "middle", "right": "end"}
+
+
+def set_regionen(collection, geoms, namen) -> bool:
+    """
+    Vermerkt an der Collection den Namen je Path. Wie GeoDataFrame.plot
+    bzw. renderer.add_polygons entsteht je (Teil-)Polygon ein Path, leere
+    Geometrien entfallen. Passt die Anzahl nicht (z. B. zusammengefasste
+    Paths), bleiben die Ids weg. Rückgabe: ob vermerkt wurde.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    teile = np.where(shapely.is_empty(geoms) | shapely.is_missing(geoms), 0,
+                     np.maximum(shapely.get_num_geometries(geoms), 1))
+    namen = pd.Series(namen, dtype=object)
+    je_pfad = np.repeat(namen.where(namen.notna(), None).to_numpy(), teile)
+    if collection is None or len(je_pfad) != len(collection.get_paths()):
+        return False
+    setattr(collection, REGIONEN_ATTR, je_pfad)
+    return True
+
+
+def _element_id(name: str, vergeben: Dict[str, int]) -> str:
+    """XML-taugliche, stabile Id aus einem Namen; Wiederholungen erhalten -2, -3 …"""
+    basis = "r-" + re.sub(r"[^\w.-]", "_", str(name))
+    anzahl = vergeben.get(basis, 0) + 1
+    vergeben[basis] = anzahl
+    return basis if anzahl == 1 else f"{basis}-{anzahl}"
+
+
+class _Klassen:
+    """Vergibt CSS-Klassen je Stil (s0, s1, …) in der Reihenfolge des ersten Auftretens."""
+
+    def __init__(self):
+        self.stile: Dict[str, str] = {}
+
+    def __call__(self, css: str) -> str:
+        if css not in self.stile:
+            self.stile[css] = f"s{len(self.stile)}"
+        return self.stile[css]
+
+    def css(self) -> str:
+        return "".join(f".{k}{{{css}}}" for css, k in self.stile.items())
+
+
+def _farbe(prop: str, rgba) -> str:
+    rgba = to_rgba(rgba)
+    if rgba[3] == 0:
+        return f"{prop}:none"
+    css = f"{prop}:{to_hex(rgba)}"
+    if rgba[3] < 1:
+        css += f";{prop}-opacity:{rgba[3]:.3g}"
+    return css
+
+
+@lru_cache(maxsize=1024)
+def _flaeche_css(face: Optional[tuple], edge: Optional[tuple], stroke_width: float,
+                 capstyle: Optional[str] = None) -> str:
+    css = (_farbe("fill", face) if face is not None else "fill:none") + ";"
+    if edge is not None and stroke_width > 0:
+        css += _farbe("stroke", edge) + f";stroke-width:{stroke_width:.4g}"
+        if capstyle and capstyle != "butt":
+            css += f";stroke-linecap:{_CAPSTYLE.get(capstyle, capstyle)}"
+        return css
+    return css + "stroke:none"
+
+
+def _pfad_texte(paths: List[Path], transform, skala: float, hoehe: float,
+                breite: float) -> List[Optional[str]]:
+    """
+    Pfaddaten je Path: absolute Startpunkte (M), dann relative Schritte (l)
+    in ganzen Rastereinheiten; doppelte Punkte nach dem Runden entfallen.
+    Paths vollständig außerhalb der Karte ergeben None.
+    """
+    if not paths:
+        return []
+    laengen = np.array([len(p.vertices) for p in paths])
+    if not laengen.sum():
+        return [None] * len(paths)
+    verts = np.concatenate([p.vertices for p in paths])
+    # Paths ohne codes (z. B. LineCollection): nur LINETO, der Anfang eines
+    # Paths gilt ohnehin als Startpunkt
+    codes = np.full(len(verts), Path.LINETO, dtype=Path.code_type)
+    for p, a, n in zip(paths, np.cumsum(laengen) - laengen, laengen):
+        if p.codes is not None:
+            codes[a:a + n] = p.codes
+
+    xy = transform.transform(verts)
+    xy[:, 1] = hoehe - xy[:, 1]
+    q = np.rint(xy * skala).astype(np.int64)
+
+    pfad_von = np.repeat(np.arange(len(paths)), laengen)
+    neu = np.ones(len(q), dtype=bool)
+    neu[1:] = pfad_von[1:] != pfad_von[:-1]
+    start = (codes == Path.MOVETO) | neu
+    schliessen = codes == Path.CLOSEPOLY
+    gleich = np.zeros(len(q), dtype=bool)
+    gleich[1:] = (q[1:] == q[:-1]).all(axis=1)
+    behalten = (start | schliessen | ~gleich) & (codes != Path.STOP)
+
+    q, start, schliessen, pfad_von = q[behalten], start[behalten], schliessen[behalten], pfad_von[behalten]
+    # Schritte relativ zum vorigen Punkt (Startpunkte absolut); der Punkt
+    # eines CLOSEPOLY wird nicht ausgegeben
+    delta = q.copy()
+    delta[1:] -= q[:-1]
+    delta[start] = q[start]
+    punkte = ~schliessen
+    zahlen = list(map(str, delta[punkte].ravel().tolist()))
+    # Position jedes Teilpfads in zahlen (zwei Einträge je Punkt)
+    index = np.cumsum(punkte) - punkte
+    starts = np.flatnonzero(start)
+    enden = np.r_[starts[1:], len(q)]
+    geschlossen = schliessen[enden - 1]
+
+    # Sichtbarkeit: Bounding Box je Path gegen die Karte (mit etwas Rand)
+    rand = 2 * skala
+    pfad_start = np.flatnonzero(np.r_[True, pfad_von[1:] != pfad_von[:-1]])
+    pfad_ende = np.r_[pfad_start[1:], len(q)]
+    x_min = np.minimum.reduceat(q[:, 0], pfad_start)
+    x_max = np.maximum.reduceat(q[:, 0], pfad_start)
+    y_min = np.minimum.reduceat(q[:, 1], pfad_start)
+    y_max = np.maximum.reduceat(q[:, 1], pfad_start)
+    sichtbar = ((x_max >= -rand) & (x_min <= breite * skala + rand)
+                & (y_max >= -rand) & (y_min <= hoehe * skala + rand))
+
+    texte: List[Optional[str]] = [None] * len(paths)
+    teil = 0
+    for p, a, e, zeigen in zip(pfad_von[pfad_start].tolist(), pfad_start.tolist(),
+                               pfad_ende.tolist(), sichtbar.tolist()):
+        ringe = []
+        while teil < len(starts) and starts[teil] < e:
+            if zeigen:
+                i0 = 2 * index[starts[teil]]
+                i1 = 2 * (index[enden[teil] - 1] + punkte[enden[teil] - 1])
+                text = f"M{zahlen[i0]} {zahlen[i0 + 1]}"
+                if i1 > i0 + 2:
+                    text += "l" + " ".join(zahlen[i0 + 2:i1])
+                ringe.append(text + "z" if geschlossen[teil] else text)
+            teil += 1
+        if zeigen:
+            # negative Zahlen brauchen kein Trennzeichen davor
+            texte[p] = "".join(ringe).replace(" -", "-")
+    return texte
+
+
+def _collection(coll, klassen, skala, breite, hoehe, pt_px) -> List[tuple]:
+    """(Klasse, NAME_1 oder None, Pfaddaten) je sichtbarem Path einer Collection."""
+    paths = coll.get_paths()
+    texte = _pfad_texte(paths, coll.get_transform(), skala, hoehe, breite)
+    face = coll.get_facecolor()
+    edge = coll.get_edgecolor()
+    lw = np.atleast_1d(coll.get_linewidth())
+    regionen = getattr(coll, REGIONEN_ATTR, None)
+    capstyle = coll.get_capstyle()
+
+    elemente = []
+    for i, d in enumerate(texte):
+        if d is None:
+            continue
+        css = _flaeche_css(
+            tuple(face[i % len(face)]) if len(face) else None,
+            tuple(edge[i % len(edge)]) if len(edge) else None,
+            float(lw[i % len(lw)] * pt_px * skala) if len(lw) else 0.0,
+            capstyle,
+        )
+        elemente.append((klassen(css), regionen[i] if regionen is not None else None, d))
+    return elemente
+
+
+def _linie(line: Line2D, klassen, skala, breite, hoehe, pt_px) -> List[tuple]:
+    (d,) = _pfad_texte([line.get_path()], line.get_transform(), skala, hoehe, breite)
+    if d is None:
+        return []
+    css = "fill:none;" + _farbe("stroke", line.get_color())
+    css += f";stroke-width:{line.get_linewidth() * pt_px * skala:.4g}"
+    css += f";stroke-linecap:{_CAPSTYLE.get(line.get_solid_capstyle(), 'butt')}"
+    css += f";stroke-linejoin:{line.get_solid_joinstyle()}"
+    return [(klassen(css), None, d)]
+
+
+def _text(text: Text, renderer, klassen, skala, hoehe, pt_px) -> List[str]:
+    inhalt = text.get_text()
+    if not inhalt:
+        return []
+    bbox = text.get_window_extent(renderer)
+    _, _, unterlaenge = renderer.get_text_width_height_descent(
+        inhalt, text.get_fontproperties(), ismath=False,
+    )
+    ha = text.get_horizontalalignment()
+    x = {"left": bbox.x0, "right": bbox.x1}.get(ha, (bbox.x0 + bbox.x1) / 2)
+    y = hoehe - (bbox.y0 + unterlaenge)
+    schrift = text.get_fontproperties()
+    css = _farbe("fill", text.get_color())
+    css += f";font-family:{schrift.get_family()[0]};font-size:{schrift.get_size_in_points() * pt_px * skala:.4g}px"
+    css += f";text-anchor:{_ANCHOR.get(ha, 'middle')}"
+    if schrift.get_weight() not in ("normal", 400):
+        css += f";font-weight:{schrift.get_weight()}"
+    x, y = round(x * skala), round(y * skala)
+    drehung = text.get_rotation()
+    attr = f' transform="rotate({-drehung:g} {x} {y})"' if drehung else ""
+    return [f'<text class="{klassen(css)}" x="{x}" y="{y}"{attr}>{escape(inhalt)}</text>']
+
+
+def _artists(ax) -> Optional[list]:
+    """Gezeichnete Artists einer Achse in Zeichenreihenfolge; None bei nicht unterstützten."""
+    artists = []
+    for a in ax.get_children():
+        if not a.get_visible() or a is ax.patch:
+            continue
+        if isinstance(a, (Collection, Line2D)):
+            artists.append(a)
+        elif isinstance(a, Text):
+            if a.get_text():
+                artists.append(a)
+        elif any(a is s for s in ax.spines.values()) or a is ax.xaxis or a is ax.yaxis:
+            # ohne Achsen (ax.axis("off")) nicht gezeichnet
+            if ax.axison:
+                return None
+        else:
+            return None
+    return sorted(artists, key=lambda a: a.get_zorder())
+
+
+def write_svg(
+    fig,
+    target,
+    width_px: int,
+    height_px: int,
+    transparent: bool,
+    nachkommastellen: int = 1,
+    komprimieren: bool = False,
+) -> bool:
+    """
+    Kompaktes SVG der (mit plotting._prepare_export vorbereiteten) Figure:
+    Koordinaten auf das Pixelraster gerundet (nachkommastellen, als ganze
+    Zahlen in einer skalierten viewBox, relativ kodiert), aufeinanderfolgende
+    Paths gleichen Stils zusammengefasst, Stile als CSS-Klassen, Features
+    des Hauptlands als eigene Elemente mit Id je NAME_1 (set_regionen).
+    komprimieren=True schreibt gzip (SVGZ).
+    Rückgabe: False, wenn die Figure Elemente enthält, die der Writer nicht
+    kennt (Bilder, Achsenbeschriftung …) – dann gilt savefig.
+    """
+    if not hasattr(fig.canvas, "get_renderer") or len(fig.axes) > 1:
+        return False
+    ax = fig.axes[0] if fig.axes else None
+    artists = _artists(ax) if ax is not None else []
+    if artists is None:
+        return False
+    if ax is not None:
+        # Seitenverhältnis wie beim Zeichnen anwenden (verschiebt ggf. die Achse)
+        ax.apply_aspect()
+
+    skala = 10 ** max(0, int(nachkommastellen))
+    pt_px = fig.dpi / 72
+    klassen = _Klassen()
+    renderer = fig.canvas.get_renderer()
+
+    koerper: List[str] = []
+    if not transparent:
+        # Achse füllt die Figure: gleicher Hintergrund nur einmal
+        hintergrund = []
+        for patch in (fig.patch, ax.patch if ax is not None else None):
+            if patch is not None and patch.get_visible() and to_rgba(patch.get_facecolor())[3] > 0:
+                klasse = klassen(_farbe("fill", patch.get_facecolor()))
+                if klasse not in hintergrund:
+                    hintergrund.append(klasse)
+                    koerper.append(f'<rect class="{klasse}" width="100%" height="100%"/>')
+
+    # Paths gleichen Stils (und gleicher Region) in Folge werden zu einem
+    # Element zusammengefasst – auch über Collections hinweg
+    ids: Dict[str, int] = {}
+    offen: List[object] = [None, []]
+
+    def ausgeben():
+        schluessel, teile = offen
+        if teile:
+            klasse, region = schluessel
+            attr = ""
+            if region is not None:
+                attr = f' id="{_element_id(region, ids)}" data-name={quoteattr(str(region))}'
+            koerper.append(f'<path{attr} class="{klasse}" d="{"".join(teile)}"/>')
+        offen[:] = [None, []]
+
+    # aufeinanderfolgende Artists mit gleicher gid bilden eine Gruppe
+    vergeben: Dict[str, int] = {}
+    gruppe = None
+    for a in artists:
+        if isinstance(a, Collection):
+            elemente = _collection(a, klassen, skala, width_px, height_px, pt_px)
+        elif isinstance(a, Line2D):
+            elemente = _linie(a, klassen, skala, width_px, height_px, pt_px)
+        else:
+            elemente = _text(a, renderer, klassen, skala, height_px, pt_px)
+        if not elemente:
+            continue
+        if a.get_gid() != gruppe:
+            ausgeben()
+            if gruppe is not None:
+                koerper.append("</g>")
+            gruppe = a.get_gid()
+            if gruppe is not None:
+                anzahl = vergeben.get(gruppe, 0) + 1
+                vergeben[gruppe] = anzahl
+                gid = gruppe if anzahl == 1 else f"{gruppe}-{anzahl}"
+                koerper.append(f"<g id={quoteattr(gid)}>")
+        for element in elemente:
+            if isinstance(element, str):
+                ausgeben()
+                koerper.append(element)
+                continue
+            klasse, region, d = element
+            if offen[0] != (klasse, region):
+                ausgeben()
+                offen[0] = (klasse, region)
+            offen[1].append(d)
+    ausgeben()
+    if gruppe is not None:
+        koerper.append("</g>")
+
+    svg = "\n".join([
+        '<?xml version="1.0" encoding="utf-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width_px}" height="{height_px}" '
+        f'viewBox="0 0 {width_px * skala} {height_px * skala}">',
+        f"<style>path{{stroke-linejoin:round}}{klassen.css()}</style>",
+        *koerper,
+        "</svg>",
+        "",
+    ]).encode("utf-8")
+    if komprimieren:
+        svg = gzip.compress(svg, compresslevel=6, mtime=0)
+
+    if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+        with open(target, "wb") as f:
+            f.write(svg)
+    else:
+        target.write(svg)
+    return True
+
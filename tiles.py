@@ -0,0 +1,395 @@
+# tiles.py
+
+import hashlib
+import io
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+from io_utils import link_or_copy, write_replace
+from data_processing.crs import reproject, compute_bbox
+from data_processing.culling import cull_to_extent
+from data_processing.simplify import simplify_for_output, select_lod
+from plotting import pixel_to_pt
+from styling import attribut_spalten, feature_styles
+from profiling import get_profiler
+
+logger = logging.getLogger("mymaptool.tiles")
+
+# Halbe Weltbreite in EPSG:3857 und Breitengrad-Grenze von Web Mercator
+WORLD = 20037508.342789244
+MAX_LAT = 85.0511287798066
+
+
+def parse_zoom(text) -> List[int]:
+    """"3-7", "5" oder [3, 7] → Liste der Zoomstufen."""
+    if isinstance(text, (list, tuple)):
+        lo, hi = (text[0], text[-1])
+    elif "-" in str(text):
+        lo, hi = str(text).split("-", 1)
+    else:
+        lo = hi = text
+    lo, hi = int(lo), int(hi)
+    if not 0 <= lo <= hi <= 24:
+        raise ValueError(f"Ungültiger Zoombereich: {text}")
+    return list(range(lo, hi + 1))
+
+
+def units_per_pixel(z: int, tile_px: int = 256) -> float:
+    return 2 * WORLD / (tile_px * 2 ** z)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Ausdehnung der Kachel z/x/y in EPSG:3857 als (xmin, xmax, ymin, ymax)."""
+    size = 2 * WORLD / 2 ** z
+    xmin = -WORLD + x * size
+    ymax = WORLD - y * size
+    return xmin, xmin + size, ymax - size, ymax
+
+
+def tile_range(bbox: tuple, z: int) -> Tuple[int, int, int, int]:
+    """Kachelindizes (x0, x1, y0, y1), inklusive, die bbox (xmin, xmax, ymin, ymax) abdecken."""
+    n = 2 ** z
+    size = 2 * WORLD / n
+    xmin, xmax, ymin, ymax = bbox
+
+    def clamp(v):
+        return min(max(v, 0), n - 1)
+
+    x0 = clamp(math.floor((xmin + WORLD) / size))
+    x1 = clamp(math.ceil((xmax + WORLD) / size) - 1)
+    y0 = clamp(math.floor((WORLD - ymax) / size))
+    y1 = clamp(math.ceil((WORLD - ymin) / size) - 1)
+    return x0, x1, y0, y1
+
+
+def _clip_mercator(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Schneidet geografische Daten auf den Breitenbereich von Web Mercator zu (Pole → ∞)."""
+    if gdf.empty or gdf.crs is None or not gdf.crs.is_geographic:
+        return gdf
+    miny, maxy = gdf.total_bounds[[1, 3]]
+    if -MAX_LAT <= miny and maxy <= MAX_LAT:
+        return gdf
+    geoms = shapely.clip_by_rect(np.asarray(gdf.geometry.array), -180.0, -MAX_LAT, 180.0, MAX_LAT)
+    clipped = gdf.set_geometry(gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs))
+    return clipped[~shapely.is_empty(geoms)]
+
+
+# --- Worker ---------------------------------------------------------------
+#
+# Jeder Prozess bekommt die (für die Zoomstufe vereinfachten) Geometrien
+# einmal über den Initializer, baut je Gruppe einen STRtree und rendert
+# danach beliebig viele Kacheln in dieselbe Figure.
+
+_W: Dict[str, object] = {}
+
+
+def _init_worker(gruppen: List[dict], tile_px: int, background_cfg: Optional[dict], pad_px: float):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    dpi = 72
+    fig = Figure(figsize=(tile_px / dpi, tile_px / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis("off")
+
+    if background_cfg:
+        bg_color = background_cfg.get("color", "#2896BA")
+        bg_transp = background_cfg.get("transparent", False)
+    else:
+        bg_color, bg_transp = "none", True
+    fig.patch.set_facecolor(bg_color)
+    fig.patch.set_alpha(0 if bg_transp else 1)
+
+    for g in gruppen:
+        g["tree"] = shapely.STRtree(g["geoms"])
+
+    canvas.draw()
+    leer = np.asarray(canvas.buffer_rgba())[0, 0].copy()
+    _W.update(fig=fig, canvas=canvas, ax=ax, gruppen=gruppen, tile_px=tile_px, pad_px=pad_px, leer=leer)
+
+
+def _render_tile(z: int, x: int, y: int):
+    """
+    Rendert eine Kachel. Rückgabe: (x, y, art, hash, png) mit art
+    "leer" (nur Hintergrund, ohne PNG) oder "kachel".
+    """
+    from renderer import add_polygons
+
+    ax = _W["ax"]
+    for artist in list(ax.collections):
+        artist.remove()
+
+    xmin, xmax, ymin, ymax = tile_bounds(z, x, y)
+    # Geometrie etwas über den Rand hinaus mitnehmen, damit Konturen
+    # angrenzender Polygone hineinragen und künstliche Schnittkanten
+    # außerhalb der Kachel liegen
+    pad = _W["pad_px"] * units_per_pixel(z, _W["tile_px"])
+    rect = (xmin - pad, ymin - pad, xmax + pad, ymax + pad)
+    query = shapely.box(*rect)
+
+    gezeichnet = False
+    for g in _W["gruppen"]:
+        idx = g["tree"].query(query)
+        if len(idx) == 0:
+            continue
+        idx = np.sort(idx)
+        geoms = shapely.clip_by_rect(g["geoms"][idx], *rect)
+        face, linewidth = g["face"], g["linewidth"]
+        if isinstance(face, np.ndarray):
+            face, linewidth = face[idx], linewidth[idx]
+        if add_polygons(ax, geoms, face, g["edge"], linewidth) is not None:
+            gezeichnet = True
+    if not gezeichnet:
+        return x, y, "leer", None, None
+
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+    canvas = _W["canvas"]
+    canvas.draw()
+    rgba = np.asarray(canvas.buffer_rgba())
+    if (rgba == _W["leer"]).all():
+        return x, y, "leer", None, None
+
+    digest = hashlib.blake2b(rgba.tobytes(), digest_size=16).hexdigest()
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.frombuffer("RGBA", (rgba.shape[1], rgba.shape[0]), rgba, "raw", "RGBA", 0, 1).save(buf, "PNG")
+    return x, y, "kachel", digest, buf.getvalue()
+
+
+def _render_batch(z: int, coords: List[Tuple[int, int]]):
+    return [_render_tile(z, x, y) for x, y in coords]
+
+
+# --- Steuerung ------------------------------------------------------------
+
+def _geometrien(gdfs: List[gpd.GeoDataFrame]) -> np.ndarray:
+    """Geometrien mehrerer GeoDataFrames in Zeichenreihenfolge."""
+    if not gdfs:
+        return np.empty(0, dtype=object)
+    return np.concatenate([np.asarray(g.geometry.array) for g in gdfs])
+
+
+def _gruppe(name: str, geoms: np.ndarray, face, edge, linewidth) -> dict:
+    """Stilgruppe; face/linewidth als Einzelwert oder je Geometrie (Arrays)."""
+    return {"name": name, "geoms": geoms, "face": face, "edge": edge, "linewidth": linewidth}
+
+
+def render_tiles(
+    gdf_haupt: gpd.GeoDataFrame,
+    neben_gdfs: List[gpd.GeoDataFrame],
+    region: str,
+    config: dict,
+    zooms: List[int],
+    output_dir: str,
+    highlight_cfg: dict,
+    reproj_cache=None,
+    worker: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Schreibt eine XYZ-Kachelpyramide (EPSG:3857, {z}/{x}/{y}.png) für den
+    Kartenausschnitt der Region nach output_dir/{region}. Farben, Linienstärken,
+    Hintergrund und Vereinfachung kommen aus der Konfiguration; die Geometrie
+    wird je Zoomstufe auf die Kachelauflösung vereinfacht und erst pro Kachel
+    auf deren Ausschnitt zugeschnitten, es entsteht also nie ein Gesamtbild.
+    Kacheln ohne Geometrie bzw. nur mit Hintergrund werden übersprungen
+    (kacheln.leer = "ueberspringen") oder als Hardlink auf eine gemeinsame
+    leere Kachel angelegt ("verlinken"); inhaltsgleiche Kacheln (z. B. im
+    Landesinneren) werden per Hash erkannt und ebenfalls verlinkt.
+    Rückgabe: Zähler (gerendert, geschrieben, verlinkt, leer, bytes).
+    """
+    kcfg = config.get("kacheln", {})
+    tile_px = int(kcfg.get("kachel_px", 256))
+    leer_modus = kcfg.get("leer", "ueberspringen")
+    worker = worker or kcfg.get("worker") or os.cpu_count() or 1
+    max_kacheln = int(kcfg.get("max_kacheln", 100000))
+    background_cfg = config.get("background")
+    colors = config["farben"]
+    linien_cfg = config.get("linien") or {}
+    grenze_px = linien_cfg.get("grenze_px", 1)
+    highlight_px = linien_cfg.get("highlight_px", 1)
+    simpl_cfg = config.get("vereinfachung", {})
+    vereinfachen = simpl_cfg.get("aktiv", True)
+    toleranz_px = simpl_cfg.get("toleranz_px", 0.5)
+    min_flaeche_px = simpl_cfg.get("min_flaeche_px", 0.25)
+    dpi = 72
+    pad_px = max(grenze_px, highlight_px) + 2
+
+    ziel = os.path.join(output_dir, region)
+    os.makedirs(ziel, exist_ok=True)
+
+    # Ausschnitt wie bei den Einzelkarten (Hauptland + 5 % Rand)
+    haupt_merc = reproject(_clip_mercator(gdf_haupt), "EPSG:3857", cache=reproj_cache, variante="merc")
+    minx, miny, maxx, maxy = haupt_merc.total_bounds
+    bbox = compute_bbox(haupt_merc, (maxx - minx) / (maxy - miny))
+
+    ranges = {z: tile_range(bbox, z) for z in zooms}
+    gesamt = sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, x1, y0, y1 in ranges.values())
+    if gesamt > max_kacheln:
+        raise ValueError(
+            f"{gesamt} Kacheln für Zoom {zooms[0]}–{zooms[-1]} überschreiten "
+            f"kacheln.max_kacheln={max_kacheln}"
+        )
+    logger.info(f"Kacheln für {region}: Zoom {zooms[0]}–{zooms[-1]}, bis zu {gesamt} Kacheln, {worker} Worker")
+
+    stats = {"gerendert": 0, "geschrieben": 0, "verlinkt": 0, "leer": 0, "bytes": 0}
+    hashes: Dict[str, str] = {}
+    leer_pfad = os.path.join(ziel, "leer.png")
+    leer_geschrieben = False  # je Lauf neu, der Hintergrund kann sich geändert haben
+    profiler = get_profiler()
+
+    for z in zooms:
+        start = time.perf_counter()
+        upp = units_per_pixel(z, tile_px)
+        x0, x1, y0, y1 = ranges[z]
+        w_px = max(1, int(round((bbox[1] - bbox[0]) / upp)))
+        h_px = max(1, int(round((bbox[3] - bbox[2]) / upp)))
+
+        with profiler.stage("kacheln", region=region, zoom=z) as st:
+            haupt_z = haupt_merc
+            if vereinfachen:
+                haupt_z = simplify_for_output(haupt_merc, upp, toleranz_px, min_flaeche_px)
+
+            neben_z = []
+            for g in neben_gdfs:
+                if vereinfachen and simpl_cfg.get("pyramide", True):
+                    g = select_lod(g, bbox, "EPSG:3857", w_px, h_px, toleranz_px, simpl_cfg.get("stufen", 5))
+                sichtbar = _clip_mercator(cull_to_extent(g, bbox, "EPSG:3857"))
+                if sichtbar.empty:
+                    continue
+                stufe = sichtbar.attrs.get("lod", 0)
+                proj = reproject(
+                    sichtbar, "EPSG:3857", cache=reproj_cache,
+                    variante=f"merc-lod{stufe}" if stufe else "merc",
+                )
+                if vereinfachen:
+                    proj = simplify_for_output(proj, upp, toleranz_px, min_flaeche_px)
+                neben_z.append(proj)
+
+            face, widths, order = feature_styles(
+                haupt_z, highlight_cfg, colors, pixel_to_pt(grenze_px, dpi),
+                pixel_to_pt(highlight_px, dpi), config.get("choropleth"),
+            )
+            haupt_geoms = np.asarray(haupt_z.geometry.array)
+            if order is not None:
+                haupt_geoms, face, widths = haupt_geoms[order], face[order], widths[order]
+            gruppen = [
+                _gruppe("nebenland", _geometrien(neben_z), colors["nebenland"], colors["grenze"],
+                        pixel_to_pt(grenze_px, dpi)),
+                _gruppe("hauptland", haupt_geoms, face, colors["grenze"], widths),
+            ]
+            st.geo([haupt_z, *neben_z])
+
+            # Zeilenweise Aufträge; kleine Zoomstufen ohne Prozesspool
+            auftraege = [[(x, y) for x in range(x0, x1 + 1)] for y in range(y0, y1 + 1)]
+            n_tiles = sum(len(a) for a in auftraege)
+            if worker <= 1 or n_tiles <= 4:
+                _init_worker(gruppen, tile_px, background_cfg, pad_px)
+                ergebnisse = (_render_batch(z, a) for a in auftraege)
+                pool = None
+            else:
+                pool = ProcessPoolExecutor(
+                    max_workers=min(worker, len(auftraege)),
+                    initializer=_init_worker,
+                    initargs=(gruppen, tile_px, background_cfg, pad_px),
+                )
+                ergebnisse = pool.map(_render_batch, [z] * len(auftraege), auftraege)
+
+            try:
+                bytes_vorher = stats["bytes"]
+                for batch in ergebnisse:
+                    for x, y, art, digest, png in batch:
+                        pfad = os.path.join(ziel, str(z), str(x), f"{y}.png")
+                        if art == "leer":
+                            stats["leer"] += 1
+                            if leer_modus == "verlinken":
+                                if not leer_geschrieben:
+                                    _write_empty(leer_pfad, tile_px, background_cfg)
+                                    leer_geschrieben = True
+                                os.makedirs(os.path.dirname(pfad), exist_ok=True)
+                                link_or_copy(leer_pfad, pfad)
+                                stats["verlinkt"] += 1
+                            continue
+
+                        stats["gerendert"] += 1
+                        os.makedirs(os.path.dirname(pfad), exist_ok=True)
+                        if digest in hashes:
+                            link_or_copy(hashes[digest], pfad)
+                            stats["verlinkt"] += 1
+                            continue
+                        write_replace(pfad, png)
+                        hashes[digest] = pfad
+                        stats["geschrieben"] += 1
+                        stats["bytes"] += len(png)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            st.set(kacheln=n_tiles, bytes=stats["bytes"] - bytes_vorher)
+
+        logger.info(
+            "Zoom %d: %d Kacheln (%d×%d) in %.2f s",
+            z, n_tiles, x1 - x0 + 1, y1 - y0 + 1, time.perf_counter() - start,
+        )
+
+    logger.info(
+        f"Kacheln {region}: {stats['geschrieben']} geschrieben, {stats['verlinkt']} verlinkt, "
+        f"{stats['leer']} leer, {stats['bytes'] / 1e6:.1f} MB → {ziel}"
+    )
+    return stats
+
+
+def _write_empty(path: str, tile_px: int, background_cfg: Optional[dict]):
+    """Leere Kachel (nur Hintergrund) für den Modus "verlinken"."""
+    from PIL import Image
+    if background_cfg and not background_cfg.get("transparent", False):
+        from matplotlib.colors import to_rgba
+        color = tuple(int(round(c * 255)) for c in to_rgba(background_cfg.get("color", "#2896BA")))
+    else:
+        color = (0, 0, 0, 0)
+    buf = io.BytesIO()
+    Image.new("RGBA", (tile_px, tile_px), color).save(buf, "PNG")
+    write_replace(path, buf.getvalue())
+
+
+def run_tiles(
+    config: dict,
+    region: str,
+    zooms: List[int],
+    hauptland_dir: str,
+    nebenlaender_dir: str,
+    output_dir: str,
+    reproj_cache=None,
+    worker: Optional[int] = None,
+) -> Dict[str, int]:
+    """Lädt die Daten wie der Batch-Modus (Layer, Ausblenden, Hervorhebung aus der Konfiguration) und rendert die Kacheln."""
+    from io_utils import find_gpkg_files
+    from data_processing.layers import merge_hauptland_layers, filter_ausgeblendet
+
+    if region not in config.get("regionen", {}):
+        raise ValueError(f"Ungültige Region: {region}")
+    if "EPSG:3857" not in config["regionen"][region]:
+        logger.warning(f"Region {region} hat kein EPSG:3857 – Kacheln werden trotzdem in Web Mercator erzeugt.")
+
+    haupt_gpkg_path, neben_gdfs = find_gpkg_files(
+        hauptland_dir, nebenlaender_dir, config.get("nebenlaender", []),
+    )
+    gdf_haupt = merge_hauptland_layers(haupt_gpkg_path, config.get("hauptland", []), attribut_spalten(config))
+    gdf_haupt, ausgeblendet = filter_ausgeblendet(gdf_haupt, config.get("ausblenden", {}))
+
+    highlight_cfg = dict(config.get("hervorhebung", {"aktiv": False, "namen": []}))
+    highlight_cfg["namen"] = [n for n in highlight_cfg.get("namen", []) if n not in ausgeblendet]
+
+    kachel_dir = os.path.join(output_dir, config.get("kacheln", {}).get("verzeichnis", "tiles"))
+    return render_tiles(
+        gdf_haupt, neben_gdfs, region, config, zooms, kachel_dir, highlight_cfg,
+        reproj_cache=reproj_cache, worker=worker,
+    )